@@ -0,0 +1,330 @@
+import time
+from types import TracebackType
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple, Type, Union
+
+from pyfreedb.base import InvalidOperationError
+from pyfreedb.kv.gsheet import GoogleSheetKVStore
+from pyfreedb.providers.google.sheet.base import _A1Range, _BatchAppendRowsRequest, _BatchUpdateRowsRequest
+from pyfreedb.providers.google.sheet.wrapper import _GoogleSheetWrapper
+from pyfreedb.row.gsheet import GoogleSheetRowStore
+from pyfreedb.row.models import Model, NotSet
+from pyfreedb.row.stmt import InsertStmt
+
+_Store = Union[GoogleSheetRowStore[Any], GoogleSheetKVStore]
+
+# The batched requests sent for each spreadsheet, the unbatched operations are identified by their own callable.
+_UPDATES_REQUEST = 0
+_CLEARS_REQUEST = 1
+_APPENDS_REQUEST = 2
+
+
+class BatchOperation:
+    """The handle of an operation added to a `WriteBatch`, its result is available once the batch is flushed."""
+
+    def __init__(self) -> None:
+        self._done = False
+        self._result: Any = None
+        self._error: Optional[BaseException] = None
+
+    @property
+    def done(self) -> bool:
+        """Whether the operation has been sent, or has failed because one of its requests failed."""
+        return self._done
+
+    @property
+    def error(self) -> Optional[BaseException]:
+        """The error of the request that failed to send the operation, None if it hasn't failed."""
+        return self._error
+
+    @property
+    def result(self) -> Any:
+        """The result of the operation, the same value as the respective store method returns.
+
+        Raises:
+            InvalidOperationError: The operation hasn't been sent yet, e.g. the batch hasn't been flushed or it failed
+                before getting to the operation.
+            Exception: The error of the request that failed to send the operation.
+        """
+        if not self._done:
+            raise InvalidOperationError("the operation has not been sent yet")
+        if self._error is not None:
+            raise self._error
+
+        return self._result
+
+    def _set_result(self, result: Any) -> None:
+        self._result = result
+        self._done = True
+
+    def _set_error(self, error: BaseException) -> None:
+        self._error = error
+        self._done = True
+
+
+class _Flush:
+    """The write requests of a single spreadsheet, collected from all operations of the batch."""
+
+    def __init__(self, wrapper: _GoogleSheetWrapper) -> None:
+        self.wrapper = wrapper
+        self.updates: List[_BatchUpdateRowsRequest] = []
+        self.clears: List[_A1Range] = []
+        self.appends: List[Tuple[_Store, List[List[Any]]]] = []
+        # Operations that can't be batched, they are executed one by one after the batched requests.
+        self.unbatched: List[Callable[[], Any]] = []
+        # Callbacks that keep the caches of the stores in sync. A request that fails might still have been applied, so
+        # they run whether the requests succeed or not.
+        self.invalidations: List[Callable[[], None]] = []
+        # (operation, the requests it's part of, the callback to run once all of them are sent)
+        self.completions: List[Tuple[BatchOperation, List[object], Callable[[], None]]] = []
+
+
+class WriteBatch:
+    """A unit of work that collects writes to row and KV stores and flushes them together.
+
+    All writes to the same spreadsheet are sent with at most one `values.batchUpdate` (rid targeted updates and saves),
+    one `values.batchClear` (deletes) and one `spreadsheets.batchUpdate` (inserts and append only KV sets) request,
+    in that order. KV sets in the default mode need to look up the key first, so they are still executed one by one
+    after the batched requests. The batch is flushed when the `with` block exits without an exception. If a request
+    fails, the operations sent before it still get their results, the ones of the failed request get its error and
+    the rest are not sent.
+
+    >>> with WriteBatch() as batch:
+    ...     inserted = batch.insert(person_store, [Person(name="cat")])
+    ...     batch.update_by_rids(person_store, [2, 3], {"age": 10})
+    ...     batch.set(kv_store, "k1", b"v1")
+    >>> inserted.result
+    1
+    """
+
+    def __init__(self) -> None:
+        self._operations: List[Tuple[_Store, BatchOperation, Callable[[_Flush], None]]] = []
+        self._flushed = False
+
+    def __enter__(self) -> "WriteBatch":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        tb: Optional[TracebackType],
+    ) -> None:
+        if exc_type is None:
+            self.flush()
+
+    def insert(self, store: GoogleSheetRowStore[Any], rows: List[Model]) -> BatchOperation:
+        """Append the given rows into the row store.
+
+        The rows are always appended after the last row, regardless of the store insert strategy. Unlike
+        `store.insert(...)`, the rows don't know the row they are written to afterwards, so they can't be saved.
+        Inserts into stores with secondary indexes need to know the rows to update the indexes, so they are executed
+        one by one after the batched requests instead.
+
+        Args:
+            store: The row store that we want to insert into.
+            rows: List of rows to be inserted.
+
+        Returns:
+            BatchOperation: The operation, its result is the number of inserted rows.
+        """
+        stmt = InsertStmt(store, rows)
+        raw_values = stmt._get_raw_values()
+
+        def add(flush: _Flush) -> None:
+            flush.invalidations.append(store._notify_write)
+            if store._indexes:
+                run = stmt.execute
+                flush.unbatched.append(run)
+                flush.completions.append((operation, [run], lambda: operation._set_result(len(rows))))
+                return
+
+            values = [[None if value is NotSet else value for value in row] for row in raw_values]
+            flush.appends.append((store, values))
+            flush.completions.append((operation, [_APPENDS_REQUEST], lambda: operation._set_result(len(rows))))
+
+        operation = self._add(store, add)
+        return operation
+
+    def update_by_rids(
+        self, store: GoogleSheetRowStore[Any], rids: List[int], update_value: Dict[str, Any]
+    ) -> BatchOperation:
+        """Update the rows with the given `_rid`, see `GoogleSheetRowStore.update_by_rids`.
+
+        Args:
+            store: The row store that we want to update.
+            rids: The `_rid` of the rows that we want to update.
+            update_value: Map of value by the field name.
+
+        Returns:
+            BatchOperation: The operation, its result is the number of updated rows.
+        """
+        stmt = store.update(update_value)
+        indices = store._validate_rids(rids)
+
+        def add(flush: _Flush) -> None:
+            flush.updates.extend(stmt._update_requests(indices))
+            flush.invalidations.append(store._notify_write)
+            flush.completions.append((operation, [_UPDATES_REQUEST], lambda: operation._set_result(len(indices))))
+
+        operation = self._add(store, add)
+        return operation
+
+    def save(self, store: GoogleSheetRowStore[Any], rows: List[Model]) -> BatchOperation:
+        """Write the changed fields of the given rows, see `GoogleSheetRowStore.save`.
+
+        Args:
+            store: The row store that the rows belong to.
+            rows: The rows to be saved.
+
+        Returns:
+            BatchOperation: The operation, its result is the number of rows that had changes to save.
+        """
+
+        def add(flush: _Flush) -> None:
+            requests, saved_rows = store._save_requests(rows)
+            flush.updates.extend(requests)
+            flush.invalidations.append(store._notify_write)
+
+            def done() -> None:
+                for row in saved_rows:
+                    row._dirty = None
+                operation._set_result(len(saved_rows))
+
+            flush.completions.append((operation, [_UPDATES_REQUEST] if requests else [], done))
+
+        operation = self._add(store, add)
+        return operation
+
+    def delete_by_rids(self, store: GoogleSheetRowStore[Any], rids: List[int]) -> BatchOperation:
+        """Delete the rows with the given `_rid`, see `GoogleSheetRowStore.delete_by_rids`.
+
+        Args:
+            store: The row store that we want to delete from.
+            rids: The `_rid` of the rows that we want to delete.
+
+        Returns:
+            BatchOperation: The operation, its result is the number of deleted rows.
+        """
+        indices = store._validate_rids(rids)
+
+        def add(flush: _Flush) -> None:
+            tracking_requests = store._tracking_requests(indices, deleted=True)
+            flush.updates.extend(tracking_requests)
+            flush.clears.extend(store.delete()._delete_ranges(indices))
+            flush.invalidations.append(store._notify_write)
+
+            def done() -> None:
+                store._release_rows(indices)
+                operation._set_result(len(indices))
+
+            requests: List[object] = [_CLEARS_REQUEST]
+            if tracking_requests:
+                requests.append(_UPDATES_REQUEST)
+            flush.completions.append((operation, requests, done))
+
+        operation = self._add(store, add)
+        return operation
+
+    def set(self, store: GoogleSheetKVStore, key: str, value: bytes) -> BatchOperation:
+        """Set the value of the given `key` in the KV store, see `GoogleSheetKVStore.set`.
+
+        Args:
+            store: The KV store that we want to write to.
+            key: The key of the entry that we want to set.
+            value: The value that we want to store.
+
+        Returns:
+            BatchOperation: The operation, its result is None.
+        """
+        store._ensure_initialised()
+
+        def add(flush: _Flush) -> None:
+            if store._mode != store.APPEND_ONLY_MODE:
+
+                def run() -> None:
+                    store.set(key, value)
+
+                flush.unbatched.append(run)
+                flush.completions.append((operation, [run], lambda: operation._set_result(None)))
+                return
+
+            ts = int(time.time() * 1000)
+            flush.appends.append((store, [[key, store._codec.encode(value), ts]]))
+            flush.invalidations.append(lambda: store._cache_discard(key))
+
+            def done() -> None:
+                store._cache_put(key, value)
+                operation._set_result(None)
+
+            flush.completions.append((operation, [_APPENDS_REQUEST], done))
+
+        operation = self._add(store, add)
+        return operation
+
+    def _add(self, store: _Store, add: Callable[[_Flush], None]) -> BatchOperation:
+        if self._flushed:
+            raise InvalidOperationError("the batch has already been flushed")
+
+        operation = BatchOperation()
+        self._operations.append((store, operation, add))
+        return operation
+
+    def flush(self) -> None:
+        """Send all of the collected writes.
+
+        This is called automatically when the `with` block exits, a batch can only be flushed once.
+        """
+        if self._flushed:
+            raise InvalidOperationError("the batch has already been flushed")
+        self._flushed = True
+
+        flushes: Dict[str, _Flush] = {}
+        for store, _, add in self._operations:
+            flush = flushes.get(store._spreadsheet_id)
+            if flush is None:
+                flush = flushes[store._spreadsheet_id] = _Flush(store._wrapper)
+            add(flush)
+
+        for spreadsheet_id, flush in flushes.items():
+            self._send(spreadsheet_id, flush)
+
+    def _send(self, spreadsheet_id: str, flush: _Flush) -> None:
+        sent: Set[object] = set()
+        failed: Optional[Tuple[object, BaseException]] = None
+        try:
+            for request, send in self._requests(spreadsheet_id, flush):
+                try:
+                    send()
+                except BaseException as e:
+                    failed = (request, e)
+                    raise
+                sent.add(request)
+        finally:
+            for invalidate in flush.invalidations:
+                invalidate()
+
+            # The operations whose requests haven't been attempted are left as they are.
+            for operation, requests, done in flush.completions:
+                if all(request in sent for request in requests):
+                    done()
+                elif failed is not None and failed[0] in requests:
+                    operation._set_error(failed[1])
+
+    def _requests(self, spreadsheet_id: str, flush: _Flush) -> Iterator[Tuple[object, Callable[[], Any]]]:
+        if flush.updates:
+            yield _UPDATES_REQUEST, lambda: flush.wrapper.batch_update_rows(spreadsheet_id, flush.updates)
+
+        if flush.clears:
+            yield _CLEARS_REQUEST, lambda: flush.wrapper.clear(spreadsheet_id, flush.clears)
+
+        if flush.appends:
+
+            def append() -> None:
+                # The stores remember the ID of their sheet, so it's only fetched by the first batch.
+                requests = [_BatchAppendRowsRequest(store._get_sheet_id(), values) for store, values in flush.appends]
+                flush.wrapper.batch_append_rows(spreadsheet_id, requests)
+
+            yield _APPENDS_REQUEST, append
+
+        for run in flush.unbatched:
+            yield run, run
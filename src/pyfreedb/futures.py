@@ -0,0 +1,117 @@
+"""Helpers to run the store operations concurrently.
+
+The `execute_async` methods of the statements and `GoogleSheetKVStore.get_async` run the operation on a thread pool
+shared by all stores and return a `concurrent.futures.Future`. Use `gather` to wait for many of them at once.
+
+>>> people = store.select().execute_async()
+>>> total = store.count().execute_async()
+>>> rows, count = gather(people, total)
+"""
+
+import concurrent.futures
+import functools
+import threading
+from concurrent.futures import FIRST_EXCEPTION, Executor, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, List, Optional, Sequence, TypeVar
+
+R = TypeVar("R")
+T = TypeVar("T")
+
+DEFAULT_MAX_WORKERS = 8
+"""The default number of operations the shared thread pool runs at the same time."""
+
+_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+_max_workers = DEFAULT_MAX_WORKERS
+
+
+def set_max_workers(max_workers: int) -> None:
+    """Change the number of operations the shared thread pool runs at the same time.
+
+    The operations that are already submitted still run on the previous pool.
+
+    Args:
+        max_workers: Maximum number of threads of the shared thread pool.
+    """
+    global _executor, _max_workers
+
+    if max_workers <= 0:
+        raise ValueError("max_workers must be greater than 0")
+
+    with _lock:
+        previous, _executor, _max_workers = _executor, None, max_workers
+
+    if previous is not None:
+        previous.shutdown(wait=False)
+
+
+def gather(*futures: "Future[Any]", timeout: Optional[float] = None) -> List[Any]:
+    """Wait for all of the given futures and return their results.
+
+    Args:
+        *futures: The futures that we want to wait for.
+        timeout: Maximum number of seconds to wait, waits forever if it's None.
+
+    Returns:
+        list: The results of the futures, in the same order as the given futures.
+
+    Raises:
+        concurrent.futures.TimeoutError: Some of the futures are not done before the timeout.
+        Exception: The exception of the first failed future, without waiting for the rest of the futures.
+    """
+    done, not_done = wait(futures, timeout=timeout, return_when=FIRST_EXCEPTION)
+    for future in futures:
+        error = future.exception() if future in done else None
+        if error is not None:
+            raise error
+
+    if not_done:
+        raise concurrent.futures.TimeoutError(f"{len(not_done)} of the futures are not done")
+
+    return [future.result() for future in futures]
+
+
+def _submit(fn: Callable[[], R], executor: Optional[Executor] = None) -> "Future[R]":
+    if executor is None:
+        executor = _shared_executor()
+    return executor.submit(fn)
+
+
+def _map(fn: Callable[[T], R], items: Sequence[T], max_workers: int) -> List[R]:
+    """Call `fn` with every item on the shared thread pool, with at most `max_workers` calls at the same time.
+
+    The items are split into `max_workers` lanes that are run one after another. The calling thread runs the lanes
+    that haven't been picked up by the pool yet itself, so this can be used by the operations that already run on the
+    shared pool without waiting for a thread that never frees up. All lanes are finished before an error is raised.
+    """
+    if len(items) <= 1:
+        return [fn(item) for item in items]
+
+    def run_lane(lane: Sequence[T]) -> List[R]:
+        return [fn(item) for item in lane]
+
+    workers = min(len(items), max_workers)
+    lanes = [items[i::workers] for i in range(workers)]
+    futures = [_submit(functools.partial(run_lane, lane)) for lane in lanes]
+
+    results: List[Any] = [None] * len(items)
+    error: Optional[Exception] = None
+    for i, (future, lane) in enumerate(zip(futures, lanes)):
+        try:
+            results[i::workers] = run_lane(lane) if future.cancel() else future.result()
+        except Exception as e:
+            error = error or e
+
+    if error is not None:
+        raise error
+
+    return results
+
+
+def _shared_executor() -> ThreadPoolExecutor:
+    global _executor
+
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=_max_workers, thread_name_prefix="pyfreedb")
+        return _executor
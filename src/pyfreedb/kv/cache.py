@@ -0,0 +1,77 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional, Tuple
+
+
+class _PersistentKVCache:
+    """A cache of the KV store values kept in a SQLite file, so that it survives restarts.
+
+    The file can be shared by the processes on the same host (and by several stores, the entries are scoped by the
+    spreadsheet and the sheet). Each entry remembers when its value was fetched or written, and entries older than
+    `max_age` seconds are ignored. Keys that don't exist are cached as well, so that looking them up again doesn't hit
+    Google Sheets either.
+    """
+
+    _BUSY_TIMEOUT = 30.0
+
+    def __init__(self, path: str, scope: str, max_age: float) -> None:
+        if max_age < 0:
+            raise ValueError("cache_max_age can't be less than 0")
+
+        self._path = path
+        self._scope = scope
+        self._max_age = max_age
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid = 0
+        self._connect()
+
+    def get(self, key: str) -> Tuple[bool, Optional[bytes]]:
+        """Returns whether the key is cached and fresh, and its value (None if the key doesn't exist)."""
+        with self._lock:
+            row = (
+                self._connect()
+                .execute("SELECT value, updated_at FROM kv_cache WHERE scope = ? AND key = ?", (self._scope, key))
+                .fetchone()
+            )
+
+        if row is None or time.time() - row[1] > self._max_age:
+            return False, None
+        return True, row[0]
+
+    def put(self, key: str, value: Optional[bytes]) -> None:
+        """Cache the value of the key, None if the key doesn't exist."""
+        with self._lock:
+            self._connect().execute(
+                "INSERT OR REPLACE INTO kv_cache (scope, key, value, updated_at) VALUES (?, ?, ?, ?)",
+                (self._scope, key, value, time.time()),
+            )
+
+    def discard(self, key: str) -> None:
+        """Forget the cached value of the key, e.g. when it's unknown whether a write has been applied."""
+        with self._lock:
+            self._connect().execute("DELETE FROM kv_cache WHERE scope = ? AND key = ?", (self._scope, key))
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _connect(self) -> sqlite3.Connection:
+        # SQLite connections must not be used across a fork, the child process opens its own.
+        if self._conn is not None and self._pid == os.getpid():
+            return self._conn
+
+        conn = sqlite3.connect(self._path, timeout=self._BUSY_TIMEOUT, check_same_thread=False, isolation_level=None)
+        # WAL lets the readers of the other processes carry on while one of them writes.
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS kv_cache ("
+            "scope TEXT NOT NULL, key TEXT NOT NULL, value BLOB, updated_at REAL NOT NULL, PRIMARY KEY (scope, key))"
+        )
+
+        self._conn, self._pid = conn, os.getpid()
+        return conn
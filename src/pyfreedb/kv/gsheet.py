@@ -1,13 +1,28 @@
+import os
 import time
-from typing import Any, Callable, List
+from concurrent.futures import Executor, Future
+from typing import Any, Callable, Dict, Iterator, List, Optional
 
 from pyfreedb.base import Codec, InvalidOperationError
 from pyfreedb.codec import BasicCodec
+from pyfreedb.futures import _submit
 from pyfreedb.providers.google.auth.base import GoogleAuthClient
 from pyfreedb.providers.google.sheet.base import _A1CellSelector, _A1Range
 from pyfreedb.providers.google.sheet.wrapper import _GoogleSheetWrapper
+from pyfreedb.row.transfer import (
+    CSV_FILE_FORMAT,
+    JSONL_FILE_FORMAT,
+    PARQUET_FILE_FORMAT,
+    _export_rows,
+    _import_chunks,
+    _ImportCheckpoint,
+    _iter_chunks,
+    _iter_file_rows,
+    _validate_file_format,
+)
 
 from .base import KeyNotFoundError
+from .cache import _PersistentKVCache
 
 AUTH_SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
 
@@ -21,9 +36,22 @@ class GoogleSheetKVStore:
     APPEND_ONLY_MODE = 1
     """Use the KV Store with the append only mode."""
 
+    JSONL_FILE_FORMAT = JSONL_FILE_FORMAT
+    """Export and import the entries as JSON lines, one object per entry."""
+
+    CSV_FILE_FORMAT = CSV_FILE_FORMAT
+    """Export and import the entries as CSV, with the column names in the first row."""
+
+    PARQUET_FILE_FORMAT = PARQUET_FILE_FORMAT
+    """Export and import the entries as a parquet file, requires `pyarrow`."""
+
     _SCRATCHPAD_SUFFIX = "_scratch"
     _SCRATCHPAD_BOOKED_VALUE = "BOOKED"
     _NA_VALUE = "#N/A"
+    # The columns of the exported entries, the value is kept encoded by the codec.
+    _TRANSFER_TYPES: Dict[str, type] = {"key": str, "value": str, "ts": int}
+    # Number of sheet rows read by each request of an export.
+    _EXPORT_PAGE_ROWS = 10000
 
     def __init__(
         self,
@@ -32,6 +60,8 @@ class GoogleSheetKVStore:
         sheet_name: str,
         codec: Codec = BasicCodec(),
         mode: int = DEFAULT_MODE,
+        cache_file: Optional[str] = None,
+        cache_max_age: float = 60.0,
     ):
         """Initialise the KV store that operates on the given `sheet_name` inside the given `spreadsheet_id`.
 
@@ -43,6 +73,10 @@ class GoogleSheetKVStore:
             sheet_name: The sheet name that we're going to operate on.
             codec: The codec that will be used to serialize/deserialize the value.
             mode: The KV storage strategy.
+            cache_file: If set, the values are cached in this SQLite file and `get` returns the cached value if it's
+                        not older than `cache_max_age`. The file survives restarts and can be shared by the processes
+                        on the same host, the values written by other hosts are only seen once the cached ones expire.
+            cache_max_age: The number of seconds a cached value can be returned for.
         """
 
         self._auth_client = auth_client
@@ -52,10 +86,17 @@ class GoogleSheetKVStore:
         self._codec: Codec = codec
         self._mode = mode
 
+        self._cache: Optional[_PersistentKVCache] = None
+        if cache_file is not None:
+            self._cache = _PersistentKVCache(cache_file, f"{spreadsheet_id}/{sheet_name}", cache_max_age)
+
         self._wrapper = _GoogleSheetWrapper(auth_client)
         self._ensure_sheet()
         self._book_scratchpad_cell()
         self._closed = False
+        # The ID of the sheet, only needed by the requests that refer to the sheet by ID. None means we haven't fetched it
+        # yet.
+        self._sheet_id: Optional[int] = None
 
     def _ensure_sheet(self) -> None:
         try:
@@ -91,11 +132,45 @@ class GoogleSheetKVStore:
         """
         self._ensure_initialised()
 
+        if self._cache is not None:
+            cached, value = self._cache.get(key)
+            if cached:
+                if value is None:
+                    raise KeyNotFoundError
+                return value
+
         formula = self._get_formula(key)
 
         resp = self._wrapper.update_rows(self._spreadsheet_id, self._scratchpad_cell, [[formula]])
-        value = self._ensure_values(resp.updated_values)
-        return self._codec.decode(value)
+        try:
+            decoded = self._codec.decode(self._ensure_values(resp.updated_values))
+        except KeyNotFoundError:
+            self._cache_put(key, None)
+            raise
+
+        self._cache_put(key, decoded)
+        return decoded
+
+    def _cache_put(self, key: str, value: Optional[bytes]) -> None:
+        if self._cache is not None:
+            self._cache.put(key, value)
+
+    def _cache_discard(self, key: str) -> None:
+        if self._cache is not None:
+            self._cache.discard(key)
+
+    def get_async(self, key: str, executor: Optional[Executor] = None) -> "Future[bytes]":
+        """Returns the value associated with the given `key` on a background thread, see `get`.
+
+        Args:
+            key: The key of the item that we want to get.
+            executor: The executor that runs the lookup, the thread pool shared by all stores is used by default
+                      (see `pyfreedb.futures`).
+
+        Returns:
+            concurrent.futures.Future: The future of the value, it raises `KeyNotFoundError` if the key doesn't exist.
+        """
+        return _submit(lambda: self.get(key), executor)
 
     def _get_formula(self, key: str) -> str:
         if self._mode == self.DEFAULT_MODE:
@@ -121,7 +196,14 @@ class GoogleSheetKVStore:
 
         value_enc = self._codec.encode(value)
         ts = int(time.time() * 1000)
-        strategy(key, value_enc, ts)
+        try:
+            strategy(key, value_enc, ts)
+        except Exception:
+            # The write may have been applied anyway (e.g. on a timeout), so the cached value can't be trusted.
+            self._cache_discard(key)
+            raise
+
+        self._cache_put(key, value)
 
     def _get_set_strategy(self) -> Callable[[str, str, int], None]:
         if self._mode == self.DEFAULT_MODE:
@@ -169,11 +251,17 @@ class GoogleSheetKVStore:
         """
         self._ensure_initialised()
 
-        if self._mode == self.DEFAULT_MODE:
-            self._default_delete(key)
+        try:
+            if self._mode == self.DEFAULT_MODE:
+                self._default_delete(key)
 
-        if self._mode == self.APPEND_ONLY_MODE:
-            self._append_only_delete(key)
+            if self._mode == self.APPEND_ONLY_MODE:
+                self._append_only_delete(key)
+        except Exception:
+            self._cache_discard(key)
+            raise
+
+        self._cache_put(key, None)
 
     def _default_delete(self, key: str) -> None:
         try:
@@ -187,6 +275,88 @@ class GoogleSheetKVStore:
         ts = int(time.time() * 1000)
         self._append_only_set(key, "", ts)
 
+    def export_to(self, path: str, file_format: int = JSONL_FILE_FORMAT) -> int:
+        """Write all entries of the sheet into a local file, e.g. to back the sheet up.
+
+        The sheet is read in pages of rows, so the memory usage doesn't grow with the number of entries. The entries
+        are written as they are stored: the values stay encoded by the codec, and the append only mode entries include
+        the overwritten values and the deletions. The file is only replaced once all entries are written.
+
+        Args:
+            path: The path of the file that we want to write.
+            file_format: The format of the file, see `JSONL_FILE_FORMAT`, `CSV_FILE_FORMAT` and `PARQUET_FILE_FORMAT`.
+
+        Returns:
+            int: The number of exported entries.
+        """
+        self._ensure_initialised()
+        _validate_file_format(file_format)
+
+        return _export_rows(path, file_format, self._TRANSFER_TYPES, self._iter_entries())
+
+    def _iter_entries(self) -> Iterator[List[Any]]:
+        row_count = self._wrapper.get_row_count(self._spreadsheet_id, self._sheet_name)
+        for first_row in range(1, row_count + 1, self._EXPORT_PAGE_ROWS):
+            last_row = min(first_row + self._EXPORT_PAGE_ROWS - 1, row_count)
+            page = _A1Range(self._sheet_name, _A1CellSelector("A", first_row), _A1CellSelector("C", last_row))
+            for row in self._wrapper.get_rows(self._spreadsheet_id, page):
+                # The rows of the deleted keys are cleared in the default mode.
+                if not row or row[0] == "":
+                    continue
+
+                row = row + [""] * (3 - len(row))
+                # Keys that look like numbers are stored as numbers by Google Sheets.
+                yield [str(row[0]), str(row[1]), int(row[2]) if row[2] != "" else None]
+
+    def import_from(
+        self,
+        path: str,
+        file_format: int = JSONL_FILE_FORMAT,
+        chunk_bytes: int = 1000000,
+        max_workers: int = 4,
+        checkpoint_file: Optional[str] = None,
+    ) -> int:
+        """Append all entries of a local file written by `export_to` into the sheet.
+
+        The entries are appended as they are, so the file must be imported into an empty sheet of a store with the
+        same mode and codec as the exported one. The file is read and inserted in chunks like
+        `GoogleSheetRowStore.import_from`, see it for the details of the chunks and the checkpoint file.
+
+        Args:
+            path: The path of the file that we want to read.
+            file_format: The format of the file, see `JSONL_FILE_FORMAT`, `CSV_FILE_FORMAT` and `PARQUET_FILE_FORMAT`.
+            chunk_bytes: The approximate size of the entries inserted by each request.
+            max_workers: Maximum number of chunks that are inserted at the same time.
+            checkpoint_file: The path of the file that keeps track of the inserted chunks.
+
+        Returns:
+            int: The number of entries imported by this call, without the entries skipped thanks to the checkpoint.
+        """
+        self._ensure_initialised()
+        _validate_file_format(file_format)
+        if chunk_bytes <= 0 or max_workers <= 0:
+            raise ValueError("chunk_bytes and max_workers must be greater than 0.")
+
+        checkpoint = None
+        if checkpoint_file is not None:
+            source = {"path": os.path.abspath(path), "file_format": file_format, "chunk_bytes": chunk_bytes}
+            checkpoint = _ImportCheckpoint(checkpoint_file, source)
+
+        def insert(chunk: List[Dict[str, Any]]) -> None:
+            values = [[entry.get("key"), entry.get("value"), entry.get("ts")] for entry in chunk]
+            try:
+                self._wrapper.insert_rows(self._spreadsheet_id, _A1Range.from_notation(self._sheet_name), values)
+            finally:
+                for entry in chunk:
+                    self._cache_discard(str(entry.get("key")))
+
+        chunks = _iter_chunks(_iter_file_rows(path, file_format, self._TRANSFER_TYPES), chunk_bytes)
+        count = _import_chunks(chunks, insert, max_workers, checkpoint)
+
+        if checkpoint is not None:
+            checkpoint.remove()
+        return count
+
     def close(self) -> None:
         """Clean up the resources held by the current instance.
 
@@ -195,8 +365,15 @@ class GoogleSheetKVStore:
         self._ensure_initialised()
 
         self._wrapper.clear(self._spreadsheet_id, [self._scratchpad_cell])
+        if self._cache is not None:
+            self._cache.close()
         self._closed = True
 
+    def _get_sheet_id(self) -> int:
+        if self._sheet_id is None:
+            self._sheet_id = self._wrapper.get_sheet_ids(self._spreadsheet_id)[self._sheet_name]
+        return self._sheet_id
+
     def _ensure_initialised(self) -> None:
         if self._closed:
             raise InvalidOperationError
@@ -2,6 +2,12 @@ from typing import List
 
 from .base import GoogleAuthClient
 from .oauth import OAuth2GoogleAuthClient
+from .pooled import PooledGoogleAuthClient
 from .service_account import ServiceAccountGoogleAuthClient
 
-__all__: List[str] = ["GoogleAuthClient", "OAuth2GoogleAuthClient", "ServiceAccountGoogleAuthClient"]
+__all__: List[str] = [
+    "GoogleAuthClient",
+    "OAuth2GoogleAuthClient",
+    "PooledGoogleAuthClient",
+    "ServiceAccountGoogleAuthClient",
+]
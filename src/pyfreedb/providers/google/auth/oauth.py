@@ -6,16 +6,32 @@ from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 
 from .base import GoogleAuthClient
+from .refresh import _TokenRefresher
 
 
 class OAuth2GoogleAuthClient(GoogleAuthClient):
-    def __init__(self, creds: Credentials) -> None:
+    def __init__(
+        self,
+        creds: Credentials,
+        refresh_margin: Optional[float] = None,
+        token_cache_file: Optional[str] = None,
+    ) -> None:
         """Initialise auth client instance to perform authentication using OAuth2.
 
         Client is recommended to not instantiate this class directly, use `from_authorized_user_info` and
         `from_authorized_user_file` constructor instead.
+
+        Args:
+            creds: The OAuth2 credentials.
+            refresh_margin: If set, the access token is refreshed in the background this many seconds before it
+                            expires, instead of by the first request that finds it expired.
+            token_cache_file: If set, the access token is persisted in this file and reused by the other clients
+                              (including the ones in other processes) using the same file.
         """
-        if creds.expired and creds.refresh_token:
+        self._refresher: Optional[_TokenRefresher] = None
+        if refresh_margin is not None or token_cache_file is not None:
+            self._refresher = _TokenRefresher(creds, refresh_margin, token_cache_file)
+        elif creds.expired and creds.refresh_token:
             creds.refresh(Request())
 
         self._creds = creds
@@ -25,18 +41,22 @@ class OAuth2GoogleAuthClient(GoogleAuthClient):
         cls,
         authorized_user_info: Dict[str, str],
         scopes: Optional[List[str]] = None,
+        refresh_margin: Optional[float] = None,
+        token_cache_file: Optional[str] = None,
     ) -> "OAuth2GoogleAuthClient":
         """Initialise the auth client using the provided dict.
 
         Args:
             authorized_user_info: The user authentication info in dict form.
             scopes: List of permitted operation by the authentication info.
+            refresh_margin: See `OAuth2GoogleAuthClient.__init__`.
+            token_cache_file: See `OAuth2GoogleAuthClient.__init__`.
 
         Returns:
             OAuth2GoogleAuthClient: The auth client instance.
         """
         creds = Credentials.from_authorized_user_info(authorized_user_info, scopes=scopes)
-        return cls(creds)
+        return cls(creds, refresh_margin=refresh_margin, token_cache_file=token_cache_file)
 
     @classmethod
     def from_authorized_user_file(
@@ -44,6 +64,8 @@ class OAuth2GoogleAuthClient(GoogleAuthClient):
         authorized_user_file: str,
         client_secret_filename: Optional[str] = None,
         scopes: Optional[List[str]] = None,
+        refresh_margin: Optional[float] = None,
+        token_cache_file: Optional[str] = None,
     ) -> "OAuth2GoogleAuthClient":
         """Initialise the auth client by reading the authentication info from files.
 
@@ -54,13 +76,15 @@ class OAuth2GoogleAuthClient(GoogleAuthClient):
             authorized_user_file: The filename of the user authentication info.
             client_secret_filename: The service secret file (obtainable from the Google Credential dashboard).
             scopes: List of permitted operation by the authentication info.
+            refresh_margin: See `OAuth2GoogleAuthClient.__init__`.
+            token_cache_file: See `OAuth2GoogleAuthClient.__init__`.
 
         Returns:
             OAuth2GoogleAuthClient: The auth client instance.
         """
         if os.path.exists(authorized_user_file):
             creds = Credentials.from_authorized_user_file(authorized_user_file, scopes=scopes)
-            return cls(creds)
+            return cls(creds, refresh_margin=refresh_margin, token_cache_file=token_cache_file)
 
         if not client_secret_filename:
             raise ValueError("client_secret_filename must be set if authorized_user_file is not exists")
@@ -70,7 +94,7 @@ class OAuth2GoogleAuthClient(GoogleAuthClient):
         with open(authorized_user_file, "w") as user_file:
             user_file.write(creds.to_json())
 
-        return cls(creds)
+        return cls(creds, refresh_margin=refresh_margin, token_cache_file=token_cache_file)
 
     def credentials(self) -> Credentials:
         """Returns the authenticated Google credentials.
@@ -79,3 +103,8 @@ class OAuth2GoogleAuthClient(GoogleAuthClient):
             google.oauth2.credentials.Credentials: The authenticated Google credentials.
         """
         return self._creds
+
+    def close(self) -> None:
+        """Stop refreshing the access token in the background."""
+        if self._refresher is not None:
+            self._refresher.close()
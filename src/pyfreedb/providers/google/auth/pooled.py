@@ -0,0 +1,157 @@
+import collections
+import threading
+import time
+from typing import Any, Deque, List, Optional, Sequence
+
+from google.auth.credentials import Credentials
+
+from .base import GoogleAuthClient
+from .service_account import ServiceAccountGoogleAuthClient
+
+
+class PooledGoogleAuthClient(GoogleAuthClient):
+    """An auth client that spreads the requests across multiple credentials to scale past the per-user quota.
+
+    The Google Sheets API quota is per user (or service account) per minute, so spreading the requests across several
+    service accounts that can access the same spreadsheet multiplies the throughput. Each request picks one of the
+    credentials, and a credential that receives `429 Too Many Requests` is skipped for a while, with exponential
+    backoff on repeated 429 responses.
+
+    >>> auth_client = PooledGoogleAuthClient.from_service_account_files(["sa1.json", "sa2.json"], scopes=AUTH_SCOPES)
+    >>> store = GoogleSheetRowStore(auth_client, spreadsheet_id, "person", Person)
+    """
+
+    ROUND_ROBIN_STRATEGY = 0
+    """Use the credentials one after another."""
+
+    LEAST_LOADED_STRATEGY = 1
+    """Use the credential that has sent the fewest requests in the last minute."""
+
+    def __init__(self, auth_clients: Sequence[GoogleAuthClient], strategy: int = ROUND_ROBIN_STRATEGY) -> None:
+        """Initialise the auth client on top of the given auth clients.
+
+        Args:
+            auth_clients: The auth clients whose credentials are used in turn, they must all be able to access the
+                          spreadsheets.
+            strategy: How the credential of each request is picked, see `ROUND_ROBIN_STRATEGY` and
+                      `LEAST_LOADED_STRATEGY`.
+        """
+        if not auth_clients:
+            raise ValueError("at least one auth client is required.")
+        if strategy not in (self.ROUND_ROBIN_STRATEGY, self.LEAST_LOADED_STRATEGY):
+            raise ValueError("strategy must be ROUND_ROBIN_STRATEGY or LEAST_LOADED_STRATEGY.")
+
+        self._creds = _PooledCredentials([client.credentials() for client in auth_clients], strategy)
+
+    @classmethod
+    def from_service_account_files(
+        cls,
+        filenames: Sequence[str],
+        scopes: Optional[List[str]] = None,
+        strategy: int = ROUND_ROBIN_STRATEGY,
+    ) -> "PooledGoogleAuthClient":
+        """Initialise the auth client by reading the service account info from the given files.
+
+        Args:
+            filenames: The paths to the files that contain the service account info, one per service account.
+            scopes: List of permitted operation by the authentication info.
+            strategy: How the credential of each request is picked, see `ROUND_ROBIN_STRATEGY` and
+                      `LEAST_LOADED_STRATEGY`.
+
+        Returns:
+            PooledGoogleAuthClient: The auth client instance.
+        """
+        clients = [ServiceAccountGoogleAuthClient.from_service_account_file(name, scopes=scopes) for name in filenames]
+        return cls(clients, strategy=strategy)
+
+    def credentials(self) -> "_PooledCredentials":
+        """Returns the credentials that pick one of the pooled credentials for each request.
+
+        Returns:
+            google.auth.credentials.Credentials: The pooled credentials.
+        """
+        return self._creds
+
+
+class _Member:
+    def __init__(self, creds: Any) -> None:
+        self.creds = creds
+        self.sent: Deque[float] = collections.deque()
+        self.backoff_until = 0.0
+        self.throttled = 0
+
+
+class _PooledCredentials(Credentials):
+    """Credentials that apply the token of one of the pooled credentials to each request.
+
+    The transports call `before_request` and send the request on the same thread, so the credential picked for the
+    request is remembered per thread until its response is reported back through `report_response`.
+    """
+
+    _RATE_WINDOW = 60.0
+    _MIN_BACKOFF = 1.0
+    _MAX_BACKOFF = 60.0
+
+    def __init__(self, creds: List[Any], strategy: int) -> None:
+        super().__init__()
+        self._members = [_Member(c) for c in creds]
+        self._strategy = strategy
+        self._next = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @property
+    def valid(self) -> bool:
+        return True
+
+    def refresh(self, request: Any) -> None:
+        # Called by the transports after a 401, only the credential used by this thread needs to be refreshed.
+        member = getattr(self._local, "member", None)
+        if member is not None:
+            member.creds.refresh(request)
+
+    def before_request(self, request: Any, method: str, url: str, headers: Any) -> None:
+        member = self._pick(time.monotonic())
+        self._local.member = member
+        member.creds.before_request(request, method, url, headers)
+
+    def _pick(self, now: float) -> _Member:
+        with self._lock:
+            available = [m for m in self._members if m.backoff_until <= now]
+            if not available:
+                # All of them are throttled, use the one that recovers first rather than blocking the request.
+                available = [min(self._members, key=lambda m: m.backoff_until)]
+
+            for member in available:
+                while member.sent and member.sent[0] <= now - self._RATE_WINDOW:
+                    member.sent.popleft()
+
+            if self._strategy == PooledGoogleAuthClient.LEAST_LOADED_STRATEGY:
+                member = min(available, key=lambda m: len(m.sent))
+            else:
+                # Continue from the credential after the last used one, skipping the throttled ones.
+                count = len(self._members)
+                order = [self._members[(self._next + i) % count] for i in range(count)]
+                member = next(m for m in order if m in available)
+                self._next = (self._members.index(member) + 1) % count
+
+            member.sent.append(now)
+            return member
+
+    def report_response(self, status: int) -> None:
+        """Record the response status of the last request sent on this thread, to back off the throttled credentials.
+
+        Args:
+            status: The HTTP status code of the response.
+        """
+        member = getattr(self._local, "member", None)
+        if member is None:
+            return
+
+        with self._lock:
+            if status == 429:
+                backoff = min(self._MIN_BACKOFF * 2**member.throttled, self._MAX_BACKOFF)
+                member.throttled += 1
+                member.backoff_until = time.monotonic() + backoff
+            elif status < 400:
+                member.throttled = 0
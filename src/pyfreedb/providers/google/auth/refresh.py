@@ -0,0 +1,177 @@
+import contextlib
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import weakref
+from datetime import datetime, timezone
+from typing import Any, Iterator, Optional
+
+from google.auth.credentials import Credentials
+from google.auth.transport.requests import Request
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None  # type: ignore [assignment]
+
+
+class _TokenRefresher:
+    """Keeps the access token of the credentials fresh, so that the requests never wait for the token endpoint.
+
+    The token is refreshed `margin` seconds before it expires by a background thread (if `margin` is set). The token is
+    also persisted in `cache_file` (if set) and shared between the processes using the same file: a process only calls
+    the token endpoint if the cached token is about to expire, and only one process at a time does so. This applies to
+    the refreshes done by the requests themselves as well, so the cache works without the background thread too.
+    """
+
+    _RETRY_INTERVAL = 10.0
+
+    def __init__(self, creds: Credentials, margin: Optional[float], cache_file: Optional[str]) -> None:
+        if margin is not None and margin < 0:
+            raise ValueError("refresh_margin can't be less than 0")
+
+        self._creds = creds
+        self._margin = margin or 0.0
+        self._cache = _TokenCache(cache_file, _cache_key(creds)) if cache_file else None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+        self._refresh_token = creds.refresh
+        if self._cache is not None:
+            # google-auth refreshes the token by itself when a request finds it expired (or rejected by the API), those
+            # refreshes have to go through the cache as well.
+            setattr(creds, "refresh", self._refresh_on_request)
+
+        self.refresh_if_needed()
+        if margin is not None:
+            self._start()
+            if hasattr(os, "register_at_fork"):
+                # Threads don't survive a fork, the child needs its own refresh thread.
+                ref = weakref.ref(self)
+                os.register_at_fork(after_in_child=lambda: _restart(ref))
+
+    def refresh_if_needed(self) -> None:
+        with self._lock:
+            if not self._is_fresh():
+                self._refresh(Request(), None)
+
+    def _refresh_on_request(self, request: Any) -> None:
+        # The token we hold must not be reused, even if it doesn't look expired.
+        with self._lock:
+            self._refresh(request, self._creds.token)
+
+    def _refresh(self, request: Any, stale_token: Optional[str]) -> None:
+        if self._cache is None:
+            self._refresh_token(request)
+            return
+
+        with self._cache.locked():
+            # Another process might have refreshed the token while we were waiting for the lock.
+            if self._cache.load(self._creds) and self._creds.token != stale_token and self._is_fresh():
+                return
+
+            self._refresh_token(request)
+            self._cache.store(self._creds)
+
+    def close(self) -> None:
+        self._stop.set()
+
+    def _start(self) -> None:
+        thread = threading.Thread(target=self._run, name="pyfreedb-token-refresh", daemon=True)
+        thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._seconds_until_refresh()):
+            try:
+                self.refresh_if_needed()
+            except Exception:
+                # The requests will refresh the token themselves if it expires before we manage to.
+                if self._stop.wait(self._RETRY_INTERVAL):
+                    return
+
+    def _is_fresh(self) -> bool:
+        if not self._creds.valid:
+            return False
+
+        expiry = self._creds.expiry
+        return expiry is None or _seconds_until(expiry) > self._margin
+
+    def _seconds_until_refresh(self) -> float:
+        expiry = self._creds.expiry
+        if expiry is None:
+            # Tokens without expiry never need to be refreshed, check again every once in a while anyway.
+            return 3600.0
+        return max(_seconds_until(expiry) - self._margin, 0.0)
+
+
+class _TokenCache:
+    def __init__(self, path: str, key: str) -> None:
+        self._path = path
+        self._key = key
+
+    @contextlib.contextmanager
+    def locked(self) -> Iterator[None]:
+        if fcntl is None:
+            yield
+            return
+
+        with open(self._path + ".lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def load(self, creds: Any) -> bool:
+        try:
+            with open(self._path) as cache_file:
+                entry = json.load(cache_file)
+        except (OSError, ValueError):
+            return False
+
+        if not isinstance(entry, dict) or entry.get("key") != self._key or not entry.get("token"):
+            return False
+
+        creds.token = entry["token"]
+        creds.expiry = datetime.fromisoformat(entry["expiry"]) if entry.get("expiry") else None
+        return True
+
+    def store(self, creds: Any) -> None:
+        entry = {
+            "key": self._key,
+            "token": creds.token,
+            "expiry": creds.expiry.isoformat() if creds.expiry else None,
+        }
+
+        # Write into a temporary file first, so that the other processes never read a partially written cache.
+        directory = os.path.dirname(os.path.abspath(self._path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".pyfreedb-token-")
+        try:
+            with os.fdopen(fd, "w") as tmp_file:
+                json.dump(entry, tmp_file)
+            os.replace(tmp_path, self._path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(tmp_path)
+            raise
+
+
+def _cache_key(creds: Any) -> str:
+    # Makes sure that a cache file shared by mistake never hands out the token of other credentials.
+    identity = getattr(creds, "service_account_email", None) or getattr(creds, "client_id", None)
+    scopes = sorted(getattr(creds, "scopes", None) or [])
+    return hashlib.sha256(json.dumps([type(creds).__name__, identity, scopes]).encode("utf-8")).hexdigest()
+
+
+def _seconds_until(moment: datetime) -> float:
+    # google-auth keeps the expiry as a naive UTC datetime.
+    return (moment - datetime.now(timezone.utc).replace(tzinfo=None)).total_seconds()
+
+
+def _restart(ref: "weakref.ReferenceType[_TokenRefresher]") -> None:
+    refresher = ref()
+    if refresher is not None and not refresher._stop.is_set():
+        refresher._lock = threading.Lock()
+        refresher._start()
@@ -3,15 +3,32 @@ from typing import Dict, List, Optional
 from google.oauth2 import service_account
 
 from .base import GoogleAuthClient
+from .refresh import _TokenRefresher
 
 
 class ServiceAccountGoogleAuthClient(GoogleAuthClient):
-    def __init__(self, creds: service_account.Credentials) -> None:
+    def __init__(
+        self,
+        creds: service_account.Credentials,
+        refresh_margin: Optional[float] = None,
+        token_cache_file: Optional[str] = None,
+    ) -> None:
         """Initialise auth client instance to perform authentication using Service Account.
 
         Client is recommended to not instantiate this class directly, use `from_service_account_info` and
         `from_service_account_file` constructor instead.
+
+        Args:
+            creds: The service account credentials.
+            refresh_margin: If set, the access token is fetched upfront and refreshed in the background this many
+                            seconds before it expires, instead of by the first request that finds it expired.
+            token_cache_file: If set, the access token is persisted in this file and reused by the other clients
+                              (including the ones in other processes) using the same file.
         """
+        self._refresher: Optional[_TokenRefresher] = None
+        if refresh_margin is not None or token_cache_file is not None:
+            self._refresher = _TokenRefresher(creds, refresh_margin, token_cache_file)
+
         self._creds = creds
 
     @classmethod
@@ -19,36 +36,44 @@ class ServiceAccountGoogleAuthClient(GoogleAuthClient):
         cls,
         service_account_info: Dict[str, str],
         scopes: Optional[List[str]] = None,
+        refresh_margin: Optional[float] = None,
+        token_cache_file: Optional[str] = None,
     ) -> "ServiceAccountGoogleAuthClient":
         """Initialise the auth client using the provided service account dict.
 
         Args:
             service_account_info: The service account info in dict form.
             scopes: List of permitted operation by the authentication info.
+            refresh_margin: See `ServiceAccountGoogleAuthClient.__init__`.
+            token_cache_file: See `ServiceAccountGoogleAuthClient.__init__`.
 
         Returns:
             ServiceAccountGoogleAuthClient: The auth client instance.
         """
         creds = service_account.Credentials.from_service_account_info(service_account_info, scopes=scopes)
-        return cls(creds)
+        return cls(creds, refresh_margin=refresh_margin, token_cache_file=token_cache_file)
 
     @classmethod
     def from_service_account_file(
         cls,
         filename: str,
         scopes: Optional[List[str]] = None,
+        refresh_margin: Optional[float] = None,
+        token_cache_file: Optional[str] = None,
     ) -> "ServiceAccountGoogleAuthClient":
         """Initialise the auth client by reading the service account info from a file.
 
         Args:
             filename: The path to file that contains the service account info.
             scopes: List of permitted operation by the authentication info.
+            refresh_margin: See `ServiceAccountGoogleAuthClient.__init__`.
+            token_cache_file: See `ServiceAccountGoogleAuthClient.__init__`.
 
         Returns:
             ServiceAccountGoogleAuthClient: The auth client instance.
         """
         creds = service_account.Credentials.from_service_account_file(filename, scopes=scopes)
-        return cls(creds)
+        return cls(creds, refresh_margin=refresh_margin, token_cache_file=token_cache_file)
 
     def credentials(self) -> service_account.Credentials:
         """Returns the authenticated Google credentials.
@@ -57,3 +82,8 @@ class ServiceAccountGoogleAuthClient(GoogleAuthClient):
             google.oauth2.service_account.Credentials: The authenticated Google credentials.
         """
         return self._creds
+
+    def close(self) -> None:
+        """Stop refreshing the access token in the background."""
+        if self._refresher is not None:
+            self._refresher.close()
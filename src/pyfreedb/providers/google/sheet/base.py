@@ -113,3 +113,9 @@ class _UpdateRowsResult:
 class _BatchUpdateRowsRequest:
     range: _A1Range
     values: List[List[Any]]
+
+
+@dataclass
+class _BatchAppendRowsRequest:
+    sheet_id: int
+    values: List[List[Any]]
@@ -1,13 +1,27 @@
+import codecs
+import csv
 import json
-from typing import Any, Dict, List, Union
+import threading
+import urllib.parse
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
+import httplib2
 import requests
 from google.auth.transport.requests import AuthorizedSession
+from google_auth_httplib2 import AuthorizedHttp
 from googleapiclient.discovery import build
 
 from pyfreedb.providers.google.auth.base import GoogleAuthClient
+from pyfreedb.providers.google.auth.pooled import _PooledCredentials
 
-from .base import _A1Range, _BatchUpdateRowsRequest, _InsertRowsResult, _UpdateRowsResult
+from .base import _A1Range, _BatchAppendRowsRequest, _BatchUpdateRowsRequest, _InsertRowsResult, _UpdateRowsResult
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None  # type: ignore [assignment]
+
+_CellConverter = Callable[[Optional[Dict[str, Any]]], Any]
 
 
 class _GoogleSheetWrapper:
@@ -15,27 +29,77 @@ class _GoogleSheetWrapper:
     APPEND_MODE_INSERT = "INSERT_ROWS"
     MAJOR_DIMENSION_ROWS = "ROWS"
     VALUE_RENDER_FORMATTED_VALUE = "FORMATTED_VALUE"
+    VALUE_RENDER_UNFORMATTED_VALUE = "UNFORMATTED_VALUE"
     VALUE_INPUT_USER_ENTERED = "USER_ENTERED"
+    QUERY_CHUNK_SIZE = 64 * 1024
+    # Queries whose URL encoded parameters are longer than this are sent in the request body instead.
+    MAX_GET_QUERY_LENGTH = 4096
 
     def __init__(self, auth_client: GoogleAuthClient):
-        service = build("sheets", "v4", credentials=auth_client.credentials())
+        self._credentials = auth_client.credentials()
+        service = build("sheets", "v4", credentials=self._credentials)
         self._svc = service.spreadsheets()
-        self._authed_session: AuthorizedSession = AuthorizedSession(auth_client.credentials())
+        self._authed_session: AuthorizedSession = AuthorizedSession(self._credentials)
+        self._local = threading.local()
+
+        # Pooled credentials need the response status of each request to back off the throttled credentials.
+        self._report_status: Optional[Callable[[int], None]] = None
+        if isinstance(self._credentials, _PooledCredentials):
+            self._report_status = self._credentials.report_response
+        if self._report_status is not None:
+            self._authed_session.hooks["response"].append(self._on_response)
+
+    def _http(self) -> AuthorizedHttp:
+        # httplib2 connections can't be shared between threads, so each thread gets its own. The requests session is
+        # thread safe and pools its connections, so the queries share it.
+        http = getattr(self._local, "http", None)
+        if http is None:
+            if self._report_status is not None:
+                http = _ReportingHttp(self._credentials, self._report_status)
+            else:
+                http = AuthorizedHttp(self._credentials, http=httplib2.Http())
+            self._local.http = http
+        return http
+
+    def _on_response(self, response: requests.Response, *args: Any, **kwargs: Any) -> None:
+        if self._report_status is not None:
+            self._report_status(response.status_code)
 
     def create_spreadsheet(self, title: str) -> str:
-        resp = self._svc.create(body={"properties": {"title": title}}).execute()
+        resp = self._svc.create(body={"properties": {"title": title}}).execute(http=self._http())
         return str(resp["spreadsheetId"])
 
-    def create_sheet(self, spreadsheet_id: str, sheet_name: str) -> str:
+    def create_sheet(self, spreadsheet_id: str, sheet_name: str, hidden: bool = False) -> str:
+        properties = {"title": sheet_name, "hidden": hidden}
         resp = self._svc.batchUpdate(
-            spreadsheetId=spreadsheet_id, body={"requests": {"addSheet": {"properties": {"title": sheet_name}}}}
-        ).execute()
+            spreadsheetId=spreadsheet_id, body={"requests": {"addSheet": {"properties": properties}}}
+        ).execute(http=self._http())
         return str(resp["replies"][0]["addSheet"]["properties"]["sheetId"])
 
+    def get_sheet_ids(self, spreadsheet_id: str) -> Dict[str, int]:
+        resp = self._svc.get(spreadsheetId=spreadsheet_id, fields="sheets.properties(sheetId,title)").execute(
+            http=self._http()
+        )
+        return {sheet["properties"]["title"]: sheet["properties"]["sheetId"] for sheet in resp.get("sheets", [])}
+
+    def get_row_count(self, spreadsheet_id: str, sheet_name: str) -> int:
+        resp = self._svc.get(
+            spreadsheetId=spreadsheet_id, fields="sheets.properties(title,gridProperties.rowCount)"
+        ).execute(http=self._http())
+        for sheet in resp.get("sheets", []):
+            if sheet["properties"]["title"] == sheet_name:
+                return int(sheet["properties"]["gridProperties"]["rowCount"])
+
+        raise ValueError(f"sheet {sheet_name} is not found")
+
     def delete_sheet(self, spreadsheet_id: str, sheet_id: str) -> None:
         self._svc.batchUpdate(
             spreadsheetId=spreadsheet_id, body={"requests": {"deleteSheet": {"sheetId": sheet_id}}}
-        ).execute()
+        ).execute(http=self._http())
+
+    def delete_sheets(self, spreadsheet_id: str, sheet_ids: List[int]) -> None:
+        requests = [{"deleteSheet": {"sheetId": sheet_id}} for sheet_id in sheet_ids]
+        self._svc.batchUpdate(spreadsheetId=spreadsheet_id, body={"requests": requests}).execute(http=self._http())
 
     def insert_rows(self, spreadsheet_id: str, range: _A1Range, values: List[List[Any]]) -> _InsertRowsResult:
         return self._insert_rows(spreadsheet_id, range, values, self.APPEND_MODE_INSERT)
@@ -57,7 +121,7 @@ class _GoogleSheetWrapper:
                 valueInputOption=self.VALUE_INPUT_USER_ENTERED,
                 body={"values": values},
             )
-            .execute()
+            .execute(http=self._http())
         )
 
         return _InsertRowsResult(
@@ -65,11 +129,62 @@ class _GoogleSheetWrapper:
             updated_rows=resp["updates"]["updatedRows"],
             updated_columns=resp["updates"]["updatedColumns"],
             updated_cells=resp["updates"]["updatedCells"],
-            inserted_values=resp["updates"]["updatedData"]["values"],
+            # The values are left out when all of the written cells are empty, e.g. a formula that returns "".
+            inserted_values=resp["updates"]["updatedData"].get("values", []),
+        )
+
+    def batch_append_rows(self, spreadsheet_id: str, requests: List[_BatchAppendRowsRequest]) -> None:
+        """Append the rows of each request after the last row of its sheet, all within a single request.
+
+        The values follow the USER_ENTERED convention of the other methods: strings starting with "'" are literal
+        strings and strings starting with "=" are formulas.
+        """
+        self._svc.batchUpdate(
+            spreadsheetId=spreadsheet_id,
+            body={
+                "requests": [
+                    {
+                        "appendCells": {
+                            "sheetId": req.sheet_id,
+                            "rows": [{"values": [_cell_data(value) for value in row]} for row in req.values],
+                            "fields": "userEnteredValue",
+                        }
+                    }
+                    for req in requests
+                ]
+            },
+        ).execute(http=self._http())
+
+    def get_rows(self, spreadsheet_id: str, a1_range: _A1Range) -> List[List[Any]]:
+        resp = (
+            self._svc.values()
+            .get(
+                spreadsheetId=spreadsheet_id,
+                range=str(a1_range),
+                majorDimension=self.MAJOR_DIMENSION_ROWS,
+                valueRenderOption=self.VALUE_RENDER_UNFORMATTED_VALUE,
+            )
+            .execute(http=self._http())
         )
+        return list(resp.get("values", []))
+
+    def batch_get_rows(self, spreadsheet_id: str, ranges: List[_A1Range]) -> List[List[List[Any]]]:
+        resp = (
+            self._svc.values()
+            .batchGet(
+                spreadsheetId=spreadsheet_id,
+                ranges=[str(r) for r in ranges],
+                majorDimension=self.MAJOR_DIMENSION_ROWS,
+                valueRenderOption=self.VALUE_RENDER_UNFORMATTED_VALUE,
+            )
+            .execute(http=self._http())
+        )
+        return [list(value_range.get("values", [])) for value_range in resp.get("valueRanges", [])]
 
     def clear(self, spreadsheet_id: str, ranges: List[_A1Range]) -> None:
-        self._svc.values().batchClear(spreadsheetId=spreadsheet_id, body={"ranges": [str(r) for r in ranges]}).execute()
+        self._svc.values().batchClear(spreadsheetId=spreadsheet_id, body={"ranges": [str(r) for r in ranges]}).execute(
+            http=self._http()
+        )
 
     def update_rows(self, spreadsheet_id: str, a1_range: _A1Range, values: List[List[Any]]) -> _UpdateRowsResult:
         resp = (
@@ -81,7 +196,7 @@ class _GoogleSheetWrapper:
                 valueInputOption="USER_ENTERED",
                 body={"majorDimension": self.MAJOR_DIMENSION_ROWS, "range": str(a1_range), "values": values},
             )
-        ).execute()
+        ).execute(http=self._http())
 
         return _UpdateRowsResult(
             updated_range=_A1Range.from_notation(resp["updatedRange"]),
@@ -112,7 +227,7 @@ class _GoogleSheetWrapper:
                     ],
                 },
             )
-            .execute()
+            .execute(http=self._http())
         )
 
         results = []
@@ -130,60 +245,274 @@ class _GoogleSheetWrapper:
         return results
 
     def query(self, spreadsheet_id: str, sheet_name: str, query: str, has_header: bool = True) -> List[List[Any]]:
-        params: Dict[str, Union[str, int]] = {
+        params = self._query_params(sheet_name, query, has_header, "responseHandler:freeleh")
+        response = self._query_request(spreadsheet_id, params)
+        return self._convert_query_result(response.content)
+
+    def query_table(
+        self, spreadsheet_id: str, sheet_name: str, query: str, has_header: bool = True
+    ) -> Tuple[List[str], List[List[Any]]]:
+        """Same as `query`, but the column labels are returned as well."""
+        params = self._query_params(sheet_name, query, has_header, "responseHandler:freeleh")
+        response = self._query_request(spreadsheet_id, params)
+        return self._convert_query_table(response.content)
+
+    def iter_query(
+        self, spreadsheet_id: str, sheet_name: str, query: str, has_header: bool = True
+    ) -> Iterator[List[Any]]:
+        """Same as `query`, but the rows are decoded and yielded while the response body is being downloaded."""
+        params = self._query_params(sheet_name, query, has_header, "responseHandler:freeleh")
+        response = self._query_request(spreadsheet_id, params, stream=True)
+        with response:
+            # JSON is always encoded in UTF-8.
+            chunks = codecs.iterdecode(response.iter_content(self.QUERY_CHUNK_SIZE), "utf-8")
+            yield from self._iter_query_result(chunks)
+
+    def iter_query_csv(
+        self,
+        spreadsheet_id: str,
+        sheet_name: str,
+        query: str,
+        converters: List[Callable[[str], Any]],
+        has_header: bool = True,
+    ) -> Iterator[List[Any]]:
+        """Same as `iter_query`, but the result is fetched in CSV format and streamed through the csv module.
+
+        CSV cells are untyped formatted values, so each column is converted with the respective `converters` item.
+        Empty cells are returned as None, as CSV doesn't tell empty strings and NULL apart.
+        """
+        params = self._query_params(sheet_name, query, has_header, "out:csv")
+        response = self._query_request(spreadsheet_id, params, stream=True)
+        with response:
+            chunks = codecs.iterdecode(response.iter_content(self.QUERY_CHUNK_SIZE), response.encoding or "utf-8")
+            reader = csv.reader(_iter_lines_keepends(chunks))
+            # GViz always puts the column labels in the first row.
+            next(reader, None)
+            for row in reader:
+                if row:
+                    yield [None if text == "" else convert(text) for convert, text in zip(converters, row)]
+
+    def _query_params(self, sheet_name: str, query: str, has_header: bool, tqx: str) -> Dict[str, Union[str, int]]:
+        return {
             "sheet": sheet_name,
-            "tqx": "responseHandler:freeleh",
+            "tqx": tqx,
             "tq": query,
             "headers": 1 if has_header else 0,
         }
 
+    def _query_request(
+        self, spreadsheet_id: str, params: Dict[str, Union[str, int]], stream: bool = False
+    ) -> requests.Response:
         url = "https://docs.google.com/spreadsheets/d/{}/gviz/tq".format(spreadsheet_id)
-        response: requests.Response = self._authed_session.request(
-            "GET",
-            url,
-            headers={"Content-Type": "application/json"},
-            params=params,
-        )
+        if len(urllib.parse.urlencode(params)) > self.MAX_GET_QUERY_LENGTH:
+            response: requests.Response = self._authed_session.request("POST", url, data=params, stream=stream)
+        else:
+            response = self._authed_session.request(
+                "GET",
+                url,
+                headers={"Content-Type": "application/json"},
+                params=params,
+                stream=stream,
+            )
         response.raise_for_status()
-        return self._convert_query_result(response.text)
+        return response
+
+    def _convert_query_result(self, response: bytes) -> List[List[Any]]:
+        return self._convert_query_table(response)[1]
 
-    def _convert_query_result(self, response: str) -> List[List[Any]]:
+    def _convert_query_table(self, response: bytes) -> Tuple[List[str], List[List[Any]]]:
         # Remove the schema header -> freeleh({...}).
         # We only care about the JSON inside the bracket.
-        start, end = response.index("{"), response.rindex("}")
-        resp = json.loads(response[start : end + 1])
+        start, end = response.index(b"{"), response.rindex(b"}")
+        resp = _json_loads(response[start : end + 1])
         cols = resp["table"]["cols"]
         rows = resp["table"]["rows"]
 
-        results = []
-        for row in rows:
-            result_row = []
-            for cell_idx, cell in enumerate(row["c"]):
-                if not cell:
-                    continue
-
-                col = cols[cell_idx]
-                result_row.append(self._parse_cell(cell, col))
-            results.append(result_row)
-        return results
+        labels = [col.get("label", "") for col in cols]
+        converters = [self._cell_converter(col) for col in cols]
+
+        # Most of the time all columns are boolean, number or string, so we can take the value as is.
+        if all(converter is _cell_value for converter in converters):
+            return labels, [[cell["v"] if cell else None for cell in row["c"]] for row in rows]
+
+        # Empty cells are returned as null, so we keep them as None to keep the cells in their column position.
+        return labels, [[convert(cell) for convert, cell in zip(converters, row["c"])] for row in rows]
+
+    def _iter_query_result(self, chunks: Iterable[str]) -> Iterator[List[Any]]:
+        # GViz puts "cols" before "rows" inside the table object, so we can decode the columns first and then decode
+        # the rows one by one without keeping the whole response in memory.
+        reader = _JSONStreamReader(chunks)
+        if not reader.seek('"cols":'):
+            raise ValueError("unexpected GViz response: {}".format(reader.remaining()))
 
-    def _parse_cell(self, cell: Dict[str, str], col: Dict[str, str]) -> Any:
-        # We might get null if the current cell is empty.
-        if not cell or cell["v"] is None:
-            return None
+        converters = [self._cell_converter(col) for col in reader.decode()]
 
+        if not reader.seek('"rows":') or reader.peek() != "[":
+            raise ValueError("unexpected GViz response: {}".format(reader.remaining()))
+        reader.advance()
+
+        while True:
+            c = reader.peek()
+            if c == "]":
+                return
+            if c == ",":
+                reader.advance()
+                continue
+            if c is None:
+                raise ValueError("unexpected end of GViz response")
+
+            row = reader.decode()
+            yield [convert(cell) for convert, cell in zip(converters, row["c"])]
+
+    def _cell_converter(self, col: Dict[str, str]) -> _CellConverter:
         typ = col["type"]
-        if typ == "boolean":
-            return cell["v"]
-        elif typ == "number":
+        if typ in ["boolean", "number", "string"]:
             # Internally, google sheet represent number according to IEEE-754.
             # If the actual value is outside the supported range it will be truncated.
-            return cell["v"]
-        elif typ == "string":
-            return cell["v"]
+            return _cell_value
         elif typ in ["date", "datetime", "timeofday"]:
             # By right we will not reach this case because it's impossible for data created by this library
             # to be typecasted to Date/Datetime/Timeofday.
-            return cell["f"]
+            return _cell_formatted_value
+
+        def unsupported(cell: Optional[Dict[str, Any]]) -> Any:
+            # We might get null if the current cell is empty.
+            if not cell or cell["v"] is None:
+                return None
+
+            raise ValueError("cell type {} is not supported".format(typ))
+
+        return unsupported
+
+
+class _ReportingHttp(AuthorizedHttp):
+    def __init__(self, credentials: Any, report_status: Callable[[int], None]) -> None:
+        super().__init__(credentials, http=httplib2.Http())
+        self._report_status = report_status
+
+    def request(self, *args: Any, **kwargs: Any) -> Any:
+        response, content = super().request(*args, **kwargs)
+        self._report_status(response.status)
+        return response, content
+
+
+def _cell_data(value: Any) -> Dict[str, Any]:
+    if value is None:
+        return {}
+    if isinstance(value, bool):
+        return {"userEnteredValue": {"boolValue": value}}
+    if isinstance(value, (int, float)):
+        return {"userEnteredValue": {"numberValue": value}}
+
+    text = str(value)
+    if text.startswith("'"):
+        return {"userEnteredValue": {"stringValue": text[1:]}}
+    if text.startswith("="):
+        return {"userEnteredValue": {"formulaValue": text}}
+    return {"userEnteredValue": {"stringValue": text}}
+
+
+def _cell_value(cell: Optional[Dict[str, Any]]) -> Any:
+    # We might get null if the current cell is empty.
+    if not cell:
+        return None
+
+    return cell["v"]
+
+
+def _cell_formatted_value(cell: Optional[Dict[str, Any]]) -> Any:
+    if not cell or cell["v"] is None:
+        return None
+
+    return cell["f"]
+
+
+def _json_loads(data: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+
+    return json.loads(data)
+
+
+class _JSONStreamReader:
+    """Decodes JSON values one at a time from a stream of text chunks.
+
+    Only the text that hasn't been decoded yet is kept in memory.
+    """
+
+    _DECODER = json.JSONDecoder()
+
+    def __init__(self, chunks: Iterable[str]) -> None:
+        self._chunks = iter(chunks)
+        self._buf = ""
+        self._pos = 0
+
+    def _read_more(self) -> bool:
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            return False
+
+        self._buf = self._buf[self._pos :] + chunk
+        self._pos = 0
+        return True
+
+    def remaining(self) -> str:
+        return self._buf[self._pos :]
+
+    def seek(self, token: str) -> bool:
+        """Move right after the next occurrence of `token`, returns False if the stream ends before that."""
+        while True:
+            idx = self._buf.find(token, self._pos)
+            if idx >= 0:
+                self._pos = idx + len(token)
+                return True
+
+            if not self._read_more():
+                return False
+
+    def peek(self) -> Optional[str]:
+        """Returns the next non whitespace character without consuming it, None if the stream has ended."""
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos].isspace():
+                self._pos += 1
+
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+
+            if not self._read_more():
+                return None
+
+    def advance(self) -> None:
+        self._pos += 1
+
+    def decode(self) -> Any:
+        """Decode the JSON object or array that starts at the next non whitespace character."""
+        self.peek()
+        while True:
+            try:
+                value, self._pos = self._DECODER.raw_decode(self._buf, self._pos)
+                return value
+            except json.JSONDecodeError:
+                # The value might be cut in the middle by the chunk boundary.
+                if not self._read_more():
+                    raise
+
+
+def _iter_lines_keepends(chunks: Iterable[str]) -> Iterator[str]:
+    # Unlike Response.iter_lines, keep the line endings so that csv can parse quoted cells that contain newlines.
+    pending = ""
+    for chunk in chunks:
+        pending += chunk
+        start = 0
+        while True:
+            end = pending.find("\n", start)
+            if end < 0:
+                break
+
+            yield pending[start : end + 1]
+            start = end + 1
+
+        pending = pending[start:]
 
-        raise ValueError("cell type {} is not supported".format(typ))
+    if pending:
+        yield pending
@@ -1,7 +1,22 @@
 from typing import List
 
 from . import models
-from .base import Ordering
+from .base import Aggregate, Ordering
+from .changes import Change, ChangeFeed
 from .gsheet import AUTH_SCOPES, GoogleSheetRowStore
+from .partitioned import PartitionedRowStore
+from .sharded import ShardedRowStore
+from .snapshot import RowSnapshot
 
-__all__: List[str] = ["GoogleSheetRowStore", "Ordering", "models", "AUTH_SCOPES"]
+__all__: List[str] = [
+    "GoogleSheetRowStore",
+    "ShardedRowStore",
+    "PartitionedRowStore",
+    "RowSnapshot",
+    "Ordering",
+    "Aggregate",
+    "Change",
+    "ChangeFeed",
+    "models",
+    "AUTH_SCOPES",
+]
@@ -41,5 +41,89 @@ class Ordering:
         return obj
 
 
+class Aggregate:
+    """A class to specify the aggregation of a column, to be used with `store.aggregate(...)`."""
+
+    _function: str
+    _field_name: str
+    _alias: str
+
+    @classmethod
+    def COUNT(cls, field_name: str, alias: str = "") -> "Aggregate":
+        """Count the non empty values of the column.
+
+        Args:
+            field_name: The column name.
+            alias: The key of the aggregated value in the result, defaults to `"count_<field_name>"`.
+
+        Returns:
+            Aggregate: The column aggregation object.
+        """
+        return cls._new("COUNT", field_name, alias)
+
+    @classmethod
+    def SUM(cls, field_name: str, alias: str = "") -> "Aggregate":
+        """Sum the values of the column.
+
+        Args:
+            field_name: The column name.
+            alias: The key of the aggregated value in the result, defaults to `"sum_<field_name>"`.
+
+        Returns:
+            Aggregate: The column aggregation object.
+        """
+        return cls._new("SUM", field_name, alias)
+
+    @classmethod
+    def AVG(cls, field_name: str, alias: str = "") -> "Aggregate":
+        """Average the values of the column.
+
+        Args:
+            field_name: The column name.
+            alias: The key of the aggregated value in the result, defaults to `"avg_<field_name>"`.
+
+        Returns:
+            Aggregate: The column aggregation object.
+        """
+        return cls._new("AVG", field_name, alias)
+
+    @classmethod
+    def MIN(cls, field_name: str, alias: str = "") -> "Aggregate":
+        """Get the minimum value of the column.
+
+        Args:
+            field_name: The column name.
+            alias: The key of the aggregated value in the result, defaults to `"min_<field_name>"`.
+
+        Returns:
+            Aggregate: The column aggregation object.
+        """
+        return cls._new("MIN", field_name, alias)
+
+    @classmethod
+    def MAX(cls, field_name: str, alias: str = "") -> "Aggregate":
+        """Get the maximum value of the column.
+
+        Args:
+            field_name: The column name.
+            alias: The key of the aggregated value in the result, defaults to `"max_<field_name>"`.
+
+        Returns:
+            Aggregate: The column aggregation object.
+        """
+        return cls._new("MAX", field_name, alias)
+
+    @classmethod
+    def _new(cls, function: str, field_name: str, alias: str) -> "Aggregate":
+        obj = cls()
+        obj._function = function
+        obj._field_name = field_name
+        obj._alias = alias or f"{function.lower()}_{field_name}"
+        return obj
+
+    def _expr(self) -> str:
+        return f"{self._function}({self._field_name})"
+
+
 class InvalidQuery(Exception):
     """Invalid query operation"""
@@ -0,0 +1,87 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Generic, Hashable, Optional, Tuple, TypeVar
+
+V = TypeVar("V")
+
+
+class _InFlight:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class _QueryResultCache(Generic[V]):
+    """LRU cache with TTL for query results.
+
+    Concurrent misses on the same key are coalesced: only the first caller runs the loader while the others wait for
+    its result. Results loaded before the latest `invalidate` call are returned to the callers but never cached.
+    """
+
+    def __init__(self, ttl: float, max_size: int) -> None:
+        if ttl <= 0:
+            raise ValueError("ttl must be greater than 0")
+        if max_size <= 0:
+            raise ValueError("max_size must be greater than 0")
+
+        self._ttl = ttl
+        self._max_size = max_size
+        self._entries: "OrderedDict[Hashable, Tuple[float, V]]" = OrderedDict()
+        self._in_flight: Dict[Hashable, _InFlight] = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], V]) -> V:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() < entry[0]:
+                self._entries.move_to_end(key)
+                return entry[1]
+
+            in_flight = self._in_flight.get(key)
+            is_leader = in_flight is None
+            if in_flight is None:
+                in_flight = _InFlight()
+                self._in_flight[key] = in_flight
+            generation = self._generation
+
+        if not is_leader:
+            in_flight.done.wait()
+            if in_flight.error is not None:
+                raise in_flight.error
+            return in_flight.value  # type: ignore [no-any-return]
+
+        try:
+            value = loader()
+        except BaseException as e:
+            in_flight.error = e
+            raise
+        else:
+            in_flight.value = value
+            self._put(key, value, generation)
+            return value
+        finally:
+            with self._lock:
+                if self._in_flight.get(key) is in_flight:
+                    del self._in_flight[key]
+            in_flight.done.set()
+
+    def _put(self, key: Hashable, value: V, generation: int) -> None:
+        with self._lock:
+            # The cache was invalidated while we were loading, the value might not reflect the latest write.
+            if generation != self._generation:
+                return
+
+            self._entries[key] = (time.monotonic() + self._ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            # Callers that arrive after the invalidation must not join the loads that started before it.
+            self._in_flight.clear()
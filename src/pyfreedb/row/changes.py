@@ -0,0 +1,105 @@
+import time
+from typing import Any, Callable, Generic, Iterator, List, Optional, Sequence, TypeVar
+
+from pyfreedb.base import InvalidOperationError
+from pyfreedb.row.models import Model
+
+T = TypeVar("T", bound=Model)
+
+
+class Change(Generic[T]):
+    """A row that has been inserted, updated or deleted, as returned by `store.changes(...)`."""
+
+    def __init__(self, rid: int, row: Optional[T], version: int) -> None:
+        """Initialise the change of the row.
+
+        Client should not instantiate this class directly, it's created by `ChangeFeed`.
+        """
+        self.rid = rid
+        """The `_rid` of the changed row."""
+
+        self.row = row
+        """The current content of the row, None if the row has been deleted."""
+
+        self.version = version
+        """When the row was last written, in milliseconds since the epoch."""
+
+    @property
+    def deleted(self) -> bool:
+        """Whether the row has been deleted."""
+        return self.row is None
+
+    def __repr__(self) -> str:
+        return f"Change(rid={self.rid}, row={self.row}, version={self.version})"
+
+
+class ChangeFeed(Generic[T]):
+    """The rows changed since a token, streamed in the order they were written.
+
+    Iterate over the feed to get the changes, then keep `token` to get the next changes with `store.changes(token)`.
+    """
+
+    def __init__(
+        self,
+        rows: Iterator[List[Any]],
+        decode: Callable[[Sequence[Any]], T],
+        width: int,
+        since: int,
+        settle_ms: int,
+    ) -> None:
+        """Initialise the change feed.
+
+        Client should not instantiate this class directly, instead use `store.changes(...)` to instantiate it.
+        """
+        self._rows = rows
+        self._decode = decode
+        self._width = width
+        self._since = since
+        # Writes are versioned with the clock of the writing client before they reach Google Sheets, so a write that is
+        # still in flight, or done by a client whose clock is behind ours, might get a lower version than the rows we
+        # have already seen. The token never moves past this window, so such writes are picked up on the next call (and
+        # the rows written within the window are returned again).
+        self._settle_ms = settle_ms
+        self._latest = since
+        self._done = False
+
+    def __iter__(self) -> Iterator[Change[T]]:
+        if self._done:
+            raise InvalidOperationError("the change feed has already been consumed")
+
+        for raw in self._rows:
+            values = list(raw) + [None] * (self._width + 2 - len(raw))
+            version = int(values[self._width] or 0)
+            self._latest = max(self._latest, version)
+
+            if values[0] is None:
+                deleted_rid = values[self._width + 1]
+                if deleted_rid is not None and deleted_rid != "":
+                    yield Change(int(deleted_rid), None, version)
+                continue
+
+            yield Change(int(values[0]), self._decode(values[: self._width]), version)
+
+        self._done = True
+
+    @property
+    def token(self) -> int:
+        """The token to get the changes after the ones returned by this feed.
+
+        Raises:
+            InvalidOperationError: The feed hasn't been fully consumed yet.
+        """
+        if not self._done:
+            raise InvalidOperationError("the change feed has not been fully consumed yet")
+
+        return max(self._since, min(self._latest, _now_version() - self._settle_ms))
+
+
+def _now_version() -> int:
+    return int(time.time() * 1000)
+
+
+__pdoc__ = {
+    "Change": Change.__init__.__doc__,
+    "ChangeFeed": ChangeFeed.__init__.__doc__,
+}
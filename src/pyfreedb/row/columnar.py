@@ -0,0 +1,102 @@
+from array import array
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Tuple
+
+if TYPE_CHECKING:
+    import pandas
+    import pyarrow
+
+_NAN = float("nan")
+
+
+class ColumnarResult(Dict[str, Any]):
+    """The result of `SelectStmt.execute_columnar`, a map of field name to the column values in row order.
+
+    `IntegerField` and `FloatField` columns are `array.array("d")` with NaN for the empty cells, `BoolField` columns are
+    `array.array("b")` of 0 and 1 (or a list of `bool` and `None` if the column contains empty cells) and
+    `StringField` columns are lists of `str` and `None`.
+    """
+
+    def to_pandas(self) -> "pandas.DataFrame":
+        """Convert the result into a pandas DataFrame, the numeric columns are converted without copying.
+
+        Requires `pandas` to be installed.
+
+        Returns:
+            pandas.DataFrame: The result as a DataFrame with the same column order.
+        """
+        import numpy as np
+        import pandas as pd
+
+        data = {}
+        for name, column in self.items():
+            if isinstance(column, array) and column.typecode == "d":
+                data[name] = np.frombuffer(column, dtype=np.float64)
+            elif isinstance(column, array):
+                data[name] = np.frombuffer(column, dtype=np.int8).astype(bool)
+            else:
+                data[name] = column
+
+        return pd.DataFrame(data, columns=list(self.keys()))
+
+    def to_arrow(self) -> "pyarrow.Table":
+        """Convert the result into a pyarrow Table, the numeric columns are converted without copying.
+
+        Requires `pyarrow` to be installed.
+
+        Returns:
+            pyarrow.Table: The result as a Table with the same column order.
+        """
+        import pyarrow as pa
+
+        arrays = []
+        for column in self.values():
+            if isinstance(column, array) and column.typecode == "d":
+                arrays.append(pa.Array.from_buffers(pa.float64(), len(column), [None, pa.py_buffer(column)]))
+            elif isinstance(column, array):
+                arrays.append(pa.array([bool(v) for v in column], type=pa.bool_()))
+            else:
+                arrays.append(pa.array(column))
+
+        return pa.table(arrays, names=list(self.keys()))
+
+
+def _build_columns(columns: List[Tuple[str, type]], rows: Iterable[List[Any]]) -> ColumnarResult:
+    """Build the columns of the given (field name, field type) pairs straight from the raw result rows."""
+    values: List[Any] = []
+    appenders: List[Callable[[Any], None]] = []
+    for name, typ in columns:
+        if typ in (int, float):
+            column: Any = array("d")
+            appenders.append(_number_appender(name, column))
+        else:
+            column = []
+            appenders.append(column.append)
+        values.append(column)
+
+    for row in rows:
+        for append, value in zip(appenders, row):
+            append(value)
+
+    result = ColumnarResult()
+    for (name, typ), column in zip(columns, values):
+        if typ is bool and None not in column:
+            column = array("b", column)
+        result[name] = column
+
+    return result
+
+
+def _number_appender(name: str, column: "array[float]") -> Callable[[Any], None]:
+    append = column.append
+
+    def append_number(value: Any) -> None:
+        if value is None:
+            append(_NAN)
+            return
+
+        try:
+            append(value)
+        except TypeError:
+            raise TypeError(f"value of field {name} has the wrong type") from None
+
+    return append_number
@@ -0,0 +1,485 @@
+import functools
+import math
+import operator
+import re
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# The nodes are plain tuples whose first item is the node kind, e.g. ("cmp", "=", ("col", 1), ("arg", 0)).
+_Node = Tuple[Any, ...]
+_Row = Sequence[Any]
+_Evaluator = Callable[[_Row], Any]
+
+
+class _UnsupportedExpression(Exception):
+    """The expression uses GViz features that can't be evaluated locally."""
+
+
+@dataclass
+class _Token:
+    kind: str
+    text: str
+    start: int
+    end: int
+
+
+_TOKEN_RE = re.compile(
+    r"""
+    (?P<space>\s+)
+    |(?P<number>\d+(?:\.\d*)?|\.\d+)
+    |(?P<string>"[^"]*"|'[^']*')
+    |(?P<ident>[A-Za-z_][A-Za-z0-9_]*|`[^`]*`)
+    |(?P<placeholder>\?)
+    |(?P<op><=|>=|!=|<>|[=<>()+\-*/,])
+    """,
+    re.VERBOSE,
+)
+
+_KEYWORDS = {
+    "and",
+    "or",
+    "not",
+    "is",
+    "null",
+    "true",
+    "false",
+    "contains",
+    "starts",
+    "ends",
+    "with",
+    "matches",
+    "like",
+}
+
+_COMPARATORS: Dict[str, Callable[[Any, Any], bool]] = {
+    "=": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+_FLIPPED_COMPARATORS = {"=": "=", "!=": "!=", "<": ">", "<=": ">=", ">": "<", ">=": "<="}
+
+_ARITHMETICS: Dict[str, Callable[[Any, Any], Any]] = {
+    "+": operator.add,
+    "-": operator.sub,
+    "*": operator.mul,
+    "/": operator.truediv,
+}
+
+
+def _tokenize(expr: str) -> List[_Token]:
+    # Unknown characters are kept as "other" tokens so that callers that only rewrite some of the tokens (e.g. the
+    # column names) can pass them through untouched, the parser will reject them.
+    tokens = []
+    pos = 0
+    while pos < len(expr):
+        match = _TOKEN_RE.match(expr, pos)
+        if not match:
+            tokens.append(_Token("other", expr[pos], pos, pos + 1))
+            pos += 1
+            continue
+
+        kind = str(match.lastgroup)
+        if kind != "space":
+            tokens.append(_Token(kind, match.group(), match.start(), match.end()))
+        pos = match.end()
+
+    return tokens
+
+
+def _ident_name(token: _Token) -> str:
+    if token.text.startswith("`"):
+        return token.text[1:-1]
+
+    return token.text
+
+
+def _is_keyword(token: _Token, *keywords: str) -> bool:
+    return token.kind == "ident" and token.text.lower() in keywords
+
+
+class _Parser:
+    def __init__(self, expr: str, columns: Dict[str, int]) -> None:
+        self._tokens = _tokenize(expr)
+        self._columns = columns
+        self._pos = 0
+        self._n_args = 0
+
+    def parse(self) -> _Node:
+        node = self._parse_or()
+        if self._peek() is not None:
+            raise _UnsupportedExpression("unexpected token {}".format(self._peek()))
+
+        return node
+
+    def _peek(self) -> Optional[_Token]:
+        if self._pos < len(self._tokens):
+            return self._tokens[self._pos]
+
+        return None
+
+    def _next(self) -> _Token:
+        token = self._peek()
+        if token is None:
+            raise _UnsupportedExpression("unexpected end of expression")
+
+        self._pos += 1
+        return token
+
+    def _accept_keyword(self, *keywords: str) -> Optional[str]:
+        token = self._peek()
+        if token is None or not _is_keyword(token, *keywords):
+            return None
+
+        self._pos += 1
+        return token.text.lower()
+
+    def _accept_op(self, *ops: str) -> Optional[str]:
+        token = self._peek()
+        if token is None or token.kind != "op" or token.text not in ops:
+            return None
+
+        self._pos += 1
+        return token.text
+
+    def _parse_or(self) -> _Node:
+        nodes = [self._parse_and()]
+        while self._accept_keyword("or"):
+            nodes.append(self._parse_and())
+
+        if len(nodes) == 1:
+            return nodes[0]
+
+        return ("or", nodes)
+
+    def _parse_and(self) -> _Node:
+        nodes: List[_Node] = []
+        while True:
+            node = self._parse_not()
+            # Flatten nested conjunctions so that the planner can look at all of them at once.
+            if node[0] == "and":
+                nodes.extend(node[1])
+            else:
+                nodes.append(node)
+
+            if not self._accept_keyword("and"):
+                break
+
+        if len(nodes) == 1:
+            return nodes[0]
+
+        return ("and", nodes)
+
+    def _parse_not(self) -> _Node:
+        if self._accept_keyword("not"):
+            return ("not", self._parse_not())
+
+        return self._parse_comparison()
+
+    def _parse_comparison(self) -> _Node:
+        left = self._parse_additive()
+
+        op = self._accept_op("=", "!=", "<>", "<", "<=", ">", ">=")
+        if op:
+            op = "!=" if op == "<>" else op
+            return ("cmp", op, left, self._parse_additive())
+
+        if self._accept_keyword("is"):
+            negate = bool(self._accept_keyword("not"))
+            if not self._accept_keyword("null"):
+                raise _UnsupportedExpression("expecting NULL after IS")
+
+            return ("isnull", left, negate)
+
+        keyword = self._accept_keyword("contains", "matches", "like", "starts", "ends")
+        if keyword:
+            if keyword in ("starts", "ends") and not self._accept_keyword("with"):
+                raise _UnsupportedExpression("expecting WITH after {}".format(keyword.upper()))
+
+            return ("str", keyword, left, self._parse_additive())
+
+        return left
+
+    def _parse_additive(self) -> _Node:
+        node = self._parse_multiplicative()
+        while True:
+            op = self._accept_op("+", "-")
+            if not op:
+                return node
+
+            node = ("arith", op, node, self._parse_multiplicative())
+
+    def _parse_multiplicative(self) -> _Node:
+        node = self._parse_unary()
+        while True:
+            op = self._accept_op("*", "/")
+            if not op:
+                return node
+
+            node = ("arith", op, node, self._parse_unary())
+
+    def _parse_unary(self) -> _Node:
+        if self._accept_op("-"):
+            return ("neg", self._parse_unary())
+
+        return self._parse_primary()
+
+    def _parse_primary(self) -> _Node:
+        token = self._next()
+
+        if token.kind == "number":
+            if "." in token.text:
+                return ("lit", float(token.text))
+            return ("lit", int(token.text))
+
+        if token.kind == "string":
+            return ("lit", token.text[1:-1])
+
+        if token.kind == "placeholder":
+            self._n_args += 1
+            return ("arg", self._n_args - 1)
+
+        if token.kind == "op" and token.text == "(":
+            node = self._parse_or()
+            if not self._accept_op(")"):
+                raise _UnsupportedExpression("unbalanced parenthesis")
+            return node
+
+        if _is_keyword(token, "true", "false"):
+            return ("lit", token.text.lower() == "true")
+
+        if _is_keyword(token, "null"):
+            return ("lit", None)
+
+        if token.kind == "ident" and _ident_name(token) in self._columns:
+            return ("col", self._columns[_ident_name(token)])
+
+        raise _UnsupportedExpression("unsupported token {}".format(token.text))
+
+
+@functools.lru_cache(maxsize=256)
+def _parse_cached(expr: str, columns: Tuple[Tuple[str, int], ...]) -> _Node:
+    return _Parser(expr, dict(columns)).parse()
+
+
+def _parse(expr: str, columns: Dict[str, int]) -> _Node:
+    """Parse the GViz WHERE condition into a tree of nodes, `columns` maps the column names into the row position."""
+    return _parse_cached(expr, tuple(columns.items()))
+
+
+def _kind(value: Any) -> str:
+    if isinstance(value, bool):
+        return "boolean"
+    if isinstance(value, (int, float)):
+        return "number"
+    if isinstance(value, str):
+        return "string"
+    return type(value).__name__
+
+
+def _value_of(node: _Node, args: Sequence[Any]) -> Any:
+    if node[0] == "arg":
+        return args[node[1]]
+
+    return node[1]
+
+
+def _compile(node: _Node, args: Sequence[Any]) -> _Evaluator:
+    """Compile the parsed node into a function that evaluates it against a row.
+
+    Comparisons involving NULL or values of different types evaluate to false, following GViz semantics.
+    """
+    kind = node[0]
+
+    if kind in ("lit", "arg"):
+        value = _value_of(node, args)
+        return lambda row: value
+
+    if kind == "col":
+        return operator.itemgetter(node[1])
+
+    if kind == "and":
+        conjuncts = [_compile(child, args) for child in node[1]]
+        return lambda row: all(f(row) for f in conjuncts)
+
+    if kind == "or":
+        disjuncts = [_compile(child, args) for child in node[1]]
+        return lambda row: any(f(row) for f in disjuncts)
+
+    if kind == "not":
+        inner = _compile(node[1], args)
+        return lambda row: not inner(row)
+
+    if kind == "isnull":
+        inner, negate = _compile(node[1], args), node[2]
+        return lambda row: (inner(row) is None) != negate
+
+    if kind == "cmp":
+        return _compile_comparison(_COMPARATORS[node[1]], _compile(node[2], args), _compile(node[3], args))
+
+    if kind == "str":
+        return _compile_string_op(node[1], _compile(node[2], args), _compile(node[3], args))
+
+    if kind == "arith":
+        return _compile_arithmetic(_ARITHMETICS[node[1]], _compile(node[2], args), _compile(node[3], args))
+
+    if kind == "neg":
+        inner = _compile(node[1], args)
+        return lambda row: _negate(inner(row))
+
+    raise _UnsupportedExpression("unknown node {}".format(kind))
+
+
+def _compile_comparison(cmp: Callable[[Any, Any], bool], left: _Evaluator, right: _Evaluator) -> _Evaluator:
+    def evaluate(row: _Row) -> bool:
+        lhs, rhs = left(row), right(row)
+        if lhs is None or rhs is None or _kind(lhs) != _kind(rhs):
+            return False
+
+        return cmp(lhs, rhs)
+
+    return evaluate
+
+
+def _compile_string_op(op: str, left: _Evaluator, right: _Evaluator) -> _Evaluator:
+    def evaluate(row: _Row) -> bool:
+        lhs, rhs = left(row), right(row)
+        if not isinstance(lhs, str) or not isinstance(rhs, str):
+            return False
+
+        if op == "contains":
+            return rhs in lhs
+        if op == "starts":
+            return lhs.startswith(rhs)
+        if op == "ends":
+            return lhs.endswith(rhs)
+        if op == "matches":
+            return _regex(rhs).fullmatch(lhs) is not None
+        return _like_regex(rhs).fullmatch(lhs) is not None
+
+    return evaluate
+
+
+def _compile_arithmetic(fn: Callable[[Any, Any], Any], left: _Evaluator, right: _Evaluator) -> _Evaluator:
+    def evaluate(row: _Row) -> Any:
+        lhs, rhs = left(row), right(row)
+        if _kind(lhs) != "number" or _kind(rhs) != "number":
+            return None
+
+        try:
+            return fn(lhs, rhs)
+        except ZeroDivisionError:
+            return None
+
+    return evaluate
+
+
+def _negate(value: Any) -> Any:
+    if _kind(value) != "number":
+        return None
+
+    return -value
+
+
+@functools.lru_cache(maxsize=256)
+def _regex(pattern: str) -> "re.Pattern[str]":
+    return re.compile(pattern)
+
+
+@functools.lru_cache(maxsize=256)
+def _like_regex(pattern: str) -> "re.Pattern[str]":
+    parts = []
+    for c in pattern:
+        if c == "%":
+            parts.append(".*")
+        elif c == "_":
+            parts.append(".")
+        else:
+            parts.append(re.escape(c))
+
+    return re.compile("".join(parts), re.DOTALL)
+
+
+def _indexable_predicates(node: _Node, args: Sequence[Any]) -> Iterator[Tuple[int, str, Any]]:
+    """Yields (column position, comparator, value) of the top level conjuncts that compare a column with a value.
+
+    Every row matching `node` must satisfy all of the yielded predicates, so any of them can be used to narrow down
+    the candidate rows before evaluating the full condition.
+    """
+    conjuncts = node[1] if node[0] == "and" else [node]
+    for conjunct in conjuncts:
+        if conjunct[0] != "cmp":
+            continue
+
+        op, left, right = conjunct[1:]
+        if left[0] == "col" and right[0] in ("lit", "arg"):
+            yield left[1], op, _value_of(right, args)
+        elif right[0] == "col" and left[0] in ("lit", "arg"):
+            yield right[1], _FLIPPED_COMPARATORS[op], _value_of(left, args)
+
+
+def _column_ranges(node: _Node, args: Sequence[Any], position: int) -> Optional[List[Tuple[float, float]]]:
+    """Returns the inclusive (low, high) ranges of the column values that can satisfy `node`.
+
+    The ranges may contain values that don't satisfy `node` (e.g. the ones excluded by a strict comparison), so the
+    rows must still be filtered with the full condition. None is returned if `node` depends on anything other than
+    comparisons of the column at `position` with numbers.
+    """
+    kind = node[0]
+
+    if kind == "and":
+        ranges = [(-math.inf, math.inf)]
+        for child in node[1]:
+            child_ranges = _column_ranges(child, args, position)
+            if child_ranges is None:
+                return None
+            ranges = _intersect_ranges(ranges, child_ranges)
+        return ranges
+
+    if kind == "or":
+        ranges = []
+        for child in node[1]:
+            child_ranges = _column_ranges(child, args, position)
+            if child_ranges is None:
+                return None
+            ranges.extend(child_ranges)
+        return ranges
+
+    if kind == "isnull" and node[1] == ("col", position):
+        # NULL never satisfies the other comparisons, so only "IS NOT NULL" can match anything.
+        return [(-math.inf, math.inf)] if node[2] else []
+
+    if kind != "cmp":
+        return None
+
+    op, left, right = node[1:]
+    if right == ("col", position) and left[0] in ("lit", "arg"):
+        op, left, right = _FLIPPED_COMPARATORS[op], right, left
+    if left != ("col", position) or right[0] not in ("lit", "arg"):
+        return None
+
+    value = _value_of(right, args)
+    if _kind(value) != "number":
+        return None
+
+    if op == "=":
+        return [(value, value)]
+    if op in ("<", "<="):
+        return [(-math.inf, value)]
+    if op in (">", ">="):
+        return [(value, math.inf)]
+    return None
+
+
+def _intersect_ranges(left: List[Tuple[float, float]], right: List[Tuple[float, float]]) -> List[Tuple[float, float]]:
+    result = []
+    for left_lo, left_hi in left:
+        for right_lo, right_hi in right:
+            lo, hi = max(left_lo, right_lo), min(left_hi, right_hi)
+            if lo <= hi:
+                result.append((lo, hi))
+
+    return result
@@ -0,0 +1,381 @@
+import abc
+import heapq
+from typing import Any, Callable, Dict, Generic, Iterable, List, Optional, Sequence, Tuple, Type, TypeVar
+
+from pyfreedb.futures import _map
+from pyfreedb.row.base import InvalidQuery, Ordering
+from pyfreedb.row.gsheet import GoogleSheetRowStore
+from pyfreedb.row.models import Model, NotSet
+from pyfreedb.row.query_builder import _GoogleSheetQueryBuilder, _split_placeholders
+from pyfreedb.row.replica import _sort_key
+
+T = TypeVar("T", bound=Model)
+R = TypeVar("R")
+S = TypeVar("S")
+
+_Where = Optional[Tuple[str, Tuple[Any, ...]]]
+
+
+class _FanOutStore(abc.ABC, Generic[T]):
+    """Base class of the stores that spread a table across multiple `GoogleSheetRowStore`.
+
+    Subclasses decide which stores a statement has to touch by implementing `_route`, the statements are then executed
+    on those stores concurrently and their results are merged. Each row belongs to the store picked by the value of
+    its `_routing_key` field, so that field must be set on insert and can't be updated.
+    """
+
+    _object_cls: Type[T]
+    _routing_key: str
+    _max_workers: int
+
+    def select(self, *columns: str) -> "FanOutSelectStmt[T]":
+        """Create the select statement that will fetch the selected columns from the underlying stores.
+
+        Args:
+            *columns: List of columns that we want to get, all columns are returned if it's empty.
+
+        Returns:
+            pyfreedb.row.fanout.FanOutSelectStmt: The select statement.
+        """
+        return FanOutSelectStmt(self, list(columns) or list(self._object_cls._fields))
+
+    def count(self) -> "FanOutCountStmt[T]":
+        """Create a count statement that sums up the number of rows of the underlying stores.
+
+        Returns:
+            pyfreedb.row.fanout.FanOutCountStmt: The count statement.
+        """
+        return FanOutCountStmt(self)
+
+    def insert(self, rows: List[T]) -> "FanOutInsertStmt[T]":
+        """Create the insert statement to insert the given rows into the stores they belong to.
+
+        Args:
+            rows: List of rows to be inserted, their routing key field must be set.
+
+        Returns:
+            pyfreedb.row.fanout.FanOutInsertStmt: The insert statement.
+        """
+        for row in rows:
+            value = getattr(row, self._routing_key)
+            if value is None or value is NotSet:
+                raise ValueError(f"{self._routing_key} field must be set.")
+
+        return FanOutInsertStmt(self, rows)
+
+    def update(self, update_value: Dict[str, Any]) -> "FanOutUpdateStmt[T]":
+        """Create the update statement to update rows on the underlying stores with the given value.
+
+        The routing key can't be updated, as it would leave the rows in the wrong store.
+
+        Args:
+            update_value: Map of value by the field name.
+
+        Returns:
+            pyfreedb.row.fanout.FanOutUpdateStmt: The update statement.
+        """
+        if self._routing_key in update_value:
+            raise ValueError(f"{self._routing_key} field can't be updated.")
+
+        dummy_object = self._object_cls()
+        for key, value in update_value.items():
+            if key not in self._object_cls._fields:
+                raise ValueError(f"{key} field is not recognised.")
+            setattr(dummy_object, key, value)
+
+        return FanOutUpdateStmt(self, update_value)
+
+    def delete(self) -> "FanOutDeleteStmt[T]":
+        """Create a delete statement to delete the affected rows of the underlying stores.
+
+        Returns:
+            pyfreedb.row.fanout.FanOutDeleteStmt: The delete statement.
+        """
+        return FanOutDeleteStmt(self)
+
+    @abc.abstractmethod
+    def _route(self, where: _Where) -> List[GoogleSheetRowStore[T]]:
+        pass
+
+    @abc.abstractmethod
+    def _insert(self, rows: List[T]) -> None:
+        pass
+
+    def _fan_out(self, fn: Callable[[S], R], items: List[S]) -> List[R]:
+        return _map(fn, items, self._max_workers)
+
+
+class _FanOutStmt(Generic[T]):
+    def __init__(self, store: _FanOutStore[T]):
+        self._store = store
+        self._where: _Where = None
+
+    def _set_where(self, condition: str, args: Tuple[Any, ...]) -> None:
+        # The condition is parsed to route the statement before any query is built, so its arguments are checked here.
+        if len(_split_placeholders(condition)) - 1 != len(args):
+            raise InvalidQuery("number of placeholder and argument is not equal")
+
+        self._where = (condition, args)
+
+    def _new_query(self, shard: GoogleSheetRowStore[T]) -> _GoogleSheetQueryBuilder:
+        query = shard._new_query_builder()
+        if self._where is not None:
+            condition, args = self._where
+            query.where(f"{shard._WHERE_DEFAULT_CLAUSE} AND {condition}", *args)
+
+        return query
+
+
+class FanOutSelectStmt(_FanOutStmt[T]):
+    def __init__(self, store: _FanOutStore[T], selected_columns: List[str]):
+        """Initialise statement for selecting rows from all of the underlying stores.
+
+        Client should not instantiate this class directly, instead use `store.select(...)` to instantiate it.
+        """
+        super().__init__(store)
+        self._selected_columns = selected_columns
+        self._orderings: List[Ordering] = []
+        self._limit = 0
+        self._offset = 0
+
+    def where(self, condition: str, *args: Any) -> "FanOutSelectStmt[T]":
+        """Filter the rows that we're going to get, see `SelectStmt.where`.
+
+        Args:
+            condition: Conditions of the data that we're going to get.
+            *args: List of arguments that will be used to fill in the placeholders in the given `condition`.
+
+        Returns:
+            FanOutSelectStmt: The select statement with the given WHERE condition applied.
+        """
+        self._set_where(condition, args)
+        return self
+
+    def limit(self, limit: int) -> "FanOutSelectStmt[T]":
+        """Defines the maximum number of rows that we're going to return.
+
+        Args:
+            limit: Limit that we want to apply.
+
+        Returns:
+            FanOutSelectStmt: Select statement with the limit applied.
+        """
+        if limit < 0:
+            raise InvalidQuery("limit can't be less than 0")
+
+        self._limit = limit
+        return self
+
+    def offset(self, offset: int) -> "FanOutSelectStmt[T]":
+        """Defines the offset of the returned rows.
+
+        Args:
+            offset: Offset that we want to apply.
+
+        Returns:
+            FanOutSelectStmt: Select statement with the offset applied.
+        """
+        if offset < 0:
+            raise InvalidQuery("offset can't be less than 0")
+
+        self._offset = offset
+        return self
+
+    def order_by(self, *orderings: Ordering) -> "FanOutSelectStmt[T]":
+        """Defines the column ordering of the returned rows.
+
+        Args:
+            *orderings: The column ordering that we want to apply.
+
+        Returns:
+            FanOutSelectStmt: Select statement with the column ordering applied.
+        """
+        for ordering in orderings:
+            if ordering._field_name not in self._store._object_cls._fields:
+                raise ValueError(f"{ordering._field_name} field is not recognised.")
+
+        self._orderings.extend(orderings)
+        return self
+
+    def execute(self) -> List[T]:
+        """Execute the select statement on the relevant stores and merge their results.
+
+        Each store returns its rows already ordered, so the results are merged with a k-way merge before the global
+        offset and limit are applied.
+
+        Returns:
+            list: List of rows that matched the given condition.
+        """
+        # The ordering columns are fetched as well, the merge needs them even if they are not selected.
+        rid_column = GoogleSheetRowStore._RID_COLUMN_NAME
+        order_columns = [o._field_name for o in self._orderings]
+        columns = [rid_column] + self._selected_columns + order_columns
+
+        def run(shard: GoogleSheetRowStore[T]) -> List[List[Any]]:
+            query = self._new_query(shard).order_by(*self._orderings)
+            if self._limit:
+                # Any of the stores might contain all of the rows before the offset.
+                query.limit(self._limit + self._offset)
+            return shard._select_rows(query, columns)
+
+        results = self._store._fan_out(run, self._store._route(self._where))
+
+        first_order_position = 1 + len(self._selected_columns)
+        merged: Iterable[List[Any]] = _merge(
+            results,
+            [(first_order_position + idx, o._value == "DESC") for idx, o in enumerate(self._orderings)],
+        )
+
+        rows = list(merged)[self._offset :]
+        if self._limit:
+            rows = rows[: self._limit]
+
+        decode = self._store._object_cls._row_decoder(tuple(self._selected_columns), with_rid=True)
+        return [decode(row) for row in rows]
+
+
+class FanOutInsertStmt(Generic[T]):
+    def __init__(self, store: _FanOutStore[T], rows: List[T]):
+        """Initialise statement for inserting rows into the underlying stores.
+
+        Client should not instantiate this class directly, instead use `store.insert(...)` to instantiate it.
+        """
+        self._store = store
+        self._rows = rows
+
+    def execute(self) -> None:
+        """Execute the insert statement, the underlying stores are written concurrently."""
+        self._store._insert(self._rows)
+
+
+class FanOutCountStmt(_FanOutStmt[T]):
+    def __init__(self, store: _FanOutStore[T]):
+        """Initialise statement for counting rows of all of the underlying stores.
+
+        Client should not instantiate this class directly, instead use `store.count()` to instantiate it.
+        """
+        super().__init__(store)
+
+    def where(self, condition: str, *args: Any) -> "FanOutCountStmt[T]":
+        """Filter the rows that we're going to count, see `CountStmt.where`.
+
+        Args:
+            condition: Conditions of the data that we're going to count.
+            *args: List of arguments that will be used to fill in the placeholders in the given `condition`.
+
+        Returns:
+            FanOutCountStmt: The count statement with the given WHERE condition applied.
+        """
+        self._set_where(condition, args)
+        return self
+
+    def execute(self) -> int:
+        """Execute the count statement on the relevant stores.
+
+        Returns:
+            int: Number of rows that matched with the given condition.
+        """
+        counts = self._store._fan_out(
+            lambda shard: shard._count_rows(self._new_query(shard)), self._store._route(self._where)
+        )
+        return sum(counts)
+
+
+class FanOutUpdateStmt(_FanOutStmt[T]):
+    def __init__(self, store: _FanOutStore[T], update_values: Dict[str, Any]):
+        """Initialise statement for updating rows of all of the underlying stores.
+
+        Client should not instantiate this class directly, instead use `store.update(...)` to instantiate it.
+        """
+        super().__init__(store)
+        self._update_values = update_values
+
+    def where(self, condition: str, *args: Any) -> "FanOutUpdateStmt[T]":
+        """Filter the rows that we're going to update, see `UpdateStmt.where`.
+
+        Args:
+            condition: Conditions of the data that we're going to update.
+            *args: List of arguments that will be used to fill in the placeholders in the given `condition`.
+
+        Returns:
+            FanOutUpdateStmt: The update statement with the given WHERE condition applied.
+        """
+        self._set_where(condition, args)
+        return self
+
+    def execute(self) -> int:
+        """Execute the update statement on the relevant stores.
+
+        Returns:
+            int: The number of updated rows.
+        """
+
+        def run(shard: GoogleSheetRowStore[T]) -> int:
+            stmt = shard.update(self._update_values)
+            stmt._query = self._new_query(shard)
+            return stmt.execute()
+
+        return sum(self._store._fan_out(run, self._store._route(self._where)))
+
+
+class FanOutDeleteStmt(_FanOutStmt[T]):
+    def __init__(self, store: _FanOutStore[T]):
+        """Initialise statement for deleting rows of all of the underlying stores.
+
+        Client should not instantiate this class directly, instead use `store.delete()` to instantiate it.
+        """
+        super().__init__(store)
+
+    def where(self, condition: str, *args: Any) -> "FanOutDeleteStmt[T]":
+        """Filter the rows that we're going to delete, see `DeleteStmt.where`.
+
+        Args:
+            condition: Conditions of the data that we're going to delete.
+            *args: List of arguments that will be used to fill in the placeholders in the given `condition`.
+
+        Returns:
+            FanOutDeleteStmt: The delete statement with the given WHERE condition applied.
+        """
+        self._set_where(condition, args)
+        return self
+
+    def execute(self) -> int:
+        """Execute the delete statement on the relevant stores.
+
+        Returns:
+            int: Number of rows deleted.
+        """
+
+        def run(shard: GoogleSheetRowStore[T]) -> int:
+            stmt = shard.delete()
+            stmt._query = self._new_query(shard)
+            return stmt.execute()
+
+        return sum(self._store._fan_out(run, self._store._route(self._where)))
+
+
+class _Descending:
+    __slots__ = ("key",)
+
+    def __init__(self, key: Any) -> None:
+        self.key = key
+
+    def __lt__(self, other: "_Descending") -> bool:
+        return bool(other.key < self.key)
+
+    def __eq__(self, other: Any) -> bool:
+        return bool(self.key == other.key)
+
+
+def _merge(results: List[List[List[Any]]], orderings: Sequence[Tuple[int, bool]]) -> Iterable[List[Any]]:
+    """Merge the (position, descending) ordered results, the rows without ordering are kept in the results order."""
+    if not orderings:
+        return [row for result in results for row in result]
+
+    def key(row: List[Any]) -> Tuple[Any, ...]:
+        return tuple(
+            _Descending(_sort_key(row[position])) if descending else _sort_key(row[position])
+            for position, descending in orderings
+        )
+
+    return heapq.merge(*results, key=key)
@@ -1,13 +1,63 @@
-from typing import Any, Dict, Generic, List, Type, TypeVar
+import copy
+import math
+import os
+import threading
+import urllib.parse
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generic,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    TypeVar,
+    cast,
+    overload,
+)
 
+from pyfreedb.base import InvalidOperationError
+from pyfreedb.futures import _map
 from pyfreedb.providers.google.auth.base import GoogleAuthClient
-from pyfreedb.providers.google.sheet.base import _A1Range
+from pyfreedb.providers.google.sheet.base import _A1CellSelector, _A1Range, _BatchUpdateRowsRequest, _to_a1_column
 from pyfreedb.providers.google.sheet.wrapper import _GoogleSheetWrapper
-from pyfreedb.row.models import Model
-from pyfreedb.row.query_builder import _ColumnReplacer, _GoogleSheetQueryBuilder
-from pyfreedb.row.stmt import CountStmt, DeleteStmt, InsertStmt, SelectStmt, UpdateStmt
+from pyfreedb.row.base import Aggregate, Ordering
+from pyfreedb.row.cache import _QueryResultCache
+from pyfreedb.row.changes import ChangeFeed, _now_version
+from pyfreedb.row.expr import _column_ranges, _compile, _indexable_predicates, _Node, _parse, _UnsupportedExpression
+from pyfreedb.row.index import _SecondaryIndex
+from pyfreedb.row.models import Model, NotSet
+from pyfreedb.row.query_builder import _ColumnReplacer, _convert_arg, _GoogleSheetQueryBuilder
+from pyfreedb.row.replica import _HASH_INDEX, _SORTED_INDEX, _order_and_project, _RowReplica, _sort_key, _to_row
+from pyfreedb.row.stmt import (
+    AggregateStmt,
+    CountStmt,
+    DeleteStmt,
+    InsertStmt,
+    PreparedStmt,
+    SelectStmt,
+    UpdateStmt,
+    UpsertStmt,
+    _escape_val,
+    _group_consecutive,
+)
+from pyfreedb.row.transfer import (
+    CSV_FILE_FORMAT,
+    JSONL_FILE_FORMAT,
+    PARQUET_FILE_FORMAT,
+    _export_rows,
+    _import_chunks,
+    _ImportCheckpoint,
+    _iter_chunks,
+    _iter_file_rows,
+    _validate_file_format,
+)
 
 T = TypeVar("T", bound=Model)
+R = TypeVar("R")
 
 
 AUTH_SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
@@ -17,7 +67,60 @@ class GoogleSheetRowStore(Generic[T]):
     """This class implements the FreeDB row store protocol."""
 
     _RID_COLUMN_NAME = "_rid"
+    _VERSION_COLUMN_NAME = "_version"
+    _DELETED_RID_COLUMN_NAME = "_deleted_rid"
     _WHERE_DEFAULT_CLAUSE = f"{_RID_COLUMN_NAME} IS NOT NULL"
+    _COUNT_COLUMNS = [f"COUNT({_RID_COLUMN_NAME})"]
+    _FIRST_DATA_ROW = 2
+    # Keeps the URL of the values.batchGet requests well below the URL length limit.
+    _MAX_RANGES_PER_READ = 200
+    # Queries that would read more rows than this with range reads go through GViz instead, which only returns the
+    # matching rows and the selected columns.
+    _MAX_DIRECT_READ_ROWS = 5000
+    # URL encoded length of each query that `where_in` is split into, it leaves room for the rest of the URL.
+    _MAX_IN_QUERY_LENGTH = 3072
+    _MAX_IN_QUERY_WORKERS = 4
+
+    APPEND_INSERT_STRATEGY = 0
+    """Always append the inserted rows after the last row of the sheet."""
+
+    REUSE_CLEARED_ROWS_INSERT_STRATEGY = 1
+    """Write the inserted rows into rows cleared by previous deletes first, then append the rest.
+
+    The cleared rows are read again right before they are written to, but the check and the write are separate requests,
+    so only use it when the store is the only writer of the sheet.
+    """
+
+    UPSERT_INSERTED = 0
+    """The upserted row didn't exist and has been inserted."""
+
+    UPSERT_UPDATED = 1
+    """The upserted row already existed and has been updated."""
+
+    HASH_INDEX = _HASH_INDEX
+    """Replica index that serves equality lookups."""
+
+    SORTED_INDEX = _SORTED_INDEX
+    """Replica index that serves equality and range lookups."""
+
+    JSON_QUERY_FORMAT = 0
+    """Fetch the query results as typed JSON values."""
+
+    CSV_QUERY_FORMAT = 1
+    """Fetch the query results as CSV, which is cheaper to decode for large results.
+
+    CSV cells contain the formatted values, so numbers are returned with the precision of the cell's number format. CSV
+    also can't tell empty strings and NULL apart, so string fields that are `""` with `JSON_QUERY_FORMAT` are `None`.
+    """
+
+    JSONL_FILE_FORMAT = JSONL_FILE_FORMAT
+    """Export and import the rows as JSON lines, one object per row."""
+
+    CSV_FILE_FORMAT = CSV_FILE_FORMAT
+    """Export and import the rows as CSV, with the field names in the first row."""
+
+    PARQUET_FILE_FORMAT = PARQUET_FILE_FORMAT
+    """Export and import the rows as a parquet file, requires `pyarrow`."""
 
     def __init__(
         self,
@@ -25,6 +128,14 @@ class GoogleSheetRowStore(Generic[T]):
         spreadsheet_id: str,
         sheet_name: str,
         object_cls: Type[T],
+        insert_strategy: int = APPEND_INSERT_STRATEGY,
+        replica_refresh_interval: Optional[float] = None,
+        replica_indexes: Optional[Dict[str, int]] = None,
+        query_cache_ttl: Optional[float] = None,
+        query_cache_size: int = 1024,
+        query_format: int = JSON_QUERY_FORMAT,
+        secondary_indexes: Optional[List[str]] = None,
+        change_tracking: bool = False,
     ):
         """Initialise the row store that operates on the given `sheet_name` inside the given `spreadsheet_id`.
 
@@ -36,6 +147,23 @@ class GoogleSheetRowStore(Generic[T]):
             spreadsheet_id: The spreadsheet id that we're going to operate on.
             sheet_name: The sheet name that we're going to operate on.
             object_cls: The row model definition that represents how the data inside the sheet looks like.
+            insert_strategy: Where the inserted rows are written to, see `APPEND_INSERT_STRATEGY` and
+                             `REUSE_CLEARED_ROWS_INSERT_STRATEGY`.
+            replica_refresh_interval: If set, the sheet is mirrored in memory and the select and count statements are
+                                      evaluated against the mirror. The mirror is reloaded once it's older than the
+                                      given number of seconds and after every write done through this store.
+            replica_indexes: Map of field name to `HASH_INDEX` or `SORTED_INDEX` to speed up the replica lookups.
+            query_cache_ttl: If set, the results of the select and count queries are cached for the given number of
+                             seconds. The cache is cleared after every write done through this store.
+            query_cache_size: Maximum number of query results kept in the cache.
+            query_format: The format used to fetch the select results, see `JSON_QUERY_FORMAT` and `CSV_QUERY_FORMAT`.
+            secondary_indexes: The fields to keep a secondary index of, in a hidden sheet per field. The select and
+                               count statements filtering an indexed field with `=` find the rows through the index
+                               instead of scanning the sheet. The indexes are only maintained by the writes done
+                               through stores that have them, see `rebuild_index`.
+            change_tracking: If set, every write done through the store records when each row was last written in
+                             hidden columns after the model fields, and deletes leave a tombstone behind, so that the
+                             changed rows can be fetched with `changes`.
         """
         if not issubclass(object_cls, Model):
             raise TypeError("object_cls must subclass Model.")
@@ -46,10 +174,36 @@ class GoogleSheetRowStore(Generic[T]):
         self._wrapper = _GoogleSheetWrapper(auth_client)
         self._spreadsheet_id = spreadsheet_id
         self._sheet_name = sheet_name
+        self._change_tracking = change_tracking
         self._ensure_sheet()
 
         self._replacer = _ColumnReplacer(self._RID_COLUMN_NAME, object_cls)
         self._columns = list(object_cls._fields.keys())
+        self._positions = {name: idx for idx, name in enumerate([self._RID_COLUMN_NAME] + self._columns)}
+
+        self._insert_strategy = insert_strategy
+        # Sorted indices of the rows that have been cleared by deletes. None means we haven't scanned the sheet yet.
+        self._free_rows: Optional[List[int]] = None
+        self._free_rows_lock = threading.Lock()
+        # Number of rows of the sheet's grid, the range reads must stay within it. None means we haven't fetched it yet.
+        self._grid_rows: Optional[int] = None
+        # The ID of the sheet, only needed by the requests that refer to the sheet by ID. None means we haven't fetched it
+        # yet.
+        self._sheet_id: Optional[int] = None
+
+        self._replica: Optional[_RowReplica] = None
+        if replica_refresh_interval is not None:
+            self._replica = self._new_replica(replica_refresh_interval, replica_indexes or {})
+
+        self._query_cache: Optional[_QueryResultCache[Any]] = None
+        if query_cache_ttl is not None:
+            self._query_cache = _QueryResultCache(query_cache_ttl, query_cache_size)
+
+        self._query_format = query_format
+
+        self._indexes: Dict[str, _SecondaryIndex] = {}
+        for field_name in secondary_indexes or []:
+            self._add_index(field_name)
 
     def _ensure_sheet(self) -> None:
         try:
@@ -60,6 +214,8 @@ class GoogleSheetRowStore(Generic[T]):
         column_headers = [self._RID_COLUMN_NAME]
         for field in self._object_cls._fields.values():
             column_headers.append(field._column_name)
+        if self._change_tracking:
+            column_headers.extend([self._VERSION_COLUMN_NAME, self._DELETED_RID_COLUMN_NAME])
 
         self._wrapper.update_rows(self._spreadsheet_id, _A1Range(self._sheet_name), [column_headers])
 
@@ -104,6 +260,106 @@ class GoogleSheetRowStore(Generic[T]):
         """
         return InsertStmt(self, rows)
 
+    def upsert(self, rows: List[T], key: str) -> UpsertStmt[T]:
+        """Create the upsert statement that updates the rows whose `key` field already exists and inserts the rest.
+
+        All of the keys are looked up at once, then the existing rows are updated with a single batch update and the
+        new rows are inserted with a single insert.
+
+        Args:
+            rows: List of rows to be upserted, their `key` field must be set and unique.
+            key: The field that identifies the rows.
+
+        Returns:
+            pyfreedb.row.stmt.UpsertStmt: The upsert statement that is configured to upsert the given rows.
+
+        Examples:
+            Upsert two rows, where only the first one exists in the DB:
+
+            >>> store.upsert([Person(name="cat", age=2), Person(name="dog", age=3)], key="name").execute()
+            [GoogleSheetRowStore.UPSERT_UPDATED, GoogleSheetRowStore.UPSERT_INSERTED]
+        """
+        if key not in self._object_cls._fields:
+            raise ValueError(f"{key} field is not recognised.")
+
+        seen = set()
+        for row in rows:
+            value = getattr(row, key)
+            if value is None or value is NotSet:
+                raise ValueError(f"{key} field of all upserted rows must be set.")
+
+            value_key = (isinstance(value, bool), value)
+            if value_key in seen:
+                raise ValueError(f"duplicate {key} {value!r} in the upserted rows.")
+            seen.add(value_key)
+
+        return UpsertStmt(self, rows, key)
+
+    def save(self, rows: List[T]) -> int:
+        """Write the fields that have been changed on the given rows since they were read, inserted or saved.
+
+        The rows must come from this store (e.g. returned by a select or passed to an insert). The changed cells of all
+        rows are written with a single batch update request without querying the rows first.
+
+        Args:
+            rows: The rows to be saved.
+
+        Returns:
+            int: The number of rows that had changes to save.
+
+        Examples:
+            To rename the rows returned by a select:
+
+            >>> rows = store.select().where("name = ?", "cat").execute()
+            >>> for row in rows:
+            ...     row.name = "dog"
+            >>> store.save(rows)
+            2
+        """
+        requests, saved_rows = self._save_requests(rows)
+        if requests:
+            self._wrapper.batch_update_rows(self._spreadsheet_id, requests)
+            self._notify_write()
+
+        for row in saved_rows:
+            row._dirty = None
+
+        return len(saved_rows)
+
+    def _save_requests(self, rows: List[T]) -> Tuple[List[_BatchUpdateRowsRequest], List[T]]:
+        for row in rows:
+            if row._rid is None:
+                raise ValueError("the row is not stored yet, insert it instead.")
+
+        encode = self._object_cls._row_encoder(_escape_val)
+        field_indices = {name: idx for idx, name in enumerate(self._columns)}
+
+        # Rows that changed the same columns are grouped, so that adjacent rows can be written as a single range.
+        values_by_columns: Dict[Tuple[int, int], Dict[int, List[Any]]] = {}
+        saved_rows = []
+        for row in rows:
+            if not row._dirty:
+                continue
+
+            values = encode(row)
+            for first, last in _group_consecutive(sorted(field_indices[name] for name in row._dirty)):
+                values_by_columns.setdefault((first, last), {})[cast(int, row._rid)] = values[first : last + 1]
+            saved_rows.append(row)
+
+        requests = self._index_requests({cast(int, row._rid): _dirty_values(row) for row in saved_rows})
+        requests.extend(self._tracking_requests([cast(int, row._rid) for row in saved_rows]))
+        for (first, last), values_by_rid in values_by_columns.items():
+            for first_rid, last_rid in _group_consecutive(sorted(values_by_rid)):
+                update_range = _A1Range(
+                    self._sheet_name,
+                    _A1CellSelector.from_rc(first + 2, first_rid),
+                    _A1CellSelector.from_rc(last + 2, last_rid),
+                )
+                values = [values_by_rid[rid] for rid in range(first_rid, last_rid + 1)]
+                requests.append(_BatchUpdateRowsRequest(update_range, values))
+
+        return requests, saved_rows
+
     def update(self, update_value: Dict[str, Any]) -> UpdateStmt[T]:
         """Create the update statement to update rows on the sheet with the given value.
 
@@ -159,5 +415,747 @@ class GoogleSheetRowStore(Generic[T]):
         """
         return CountStmt(self)
 
+    def aggregate(self, *aggregates: Aggregate) -> AggregateStmt[T]:
+        """Create an aggregate statement that computes the given aggregations on Google Sheets.
+
+        Only the aggregated rows are returned, so it's much cheaper than selecting all rows and aggregating them
+        locally.
+
+        Args:
+            *aggregates: The aggregations that we want to compute.
+
+        Returns:
+            pyfreedb.row.stmt.AggregateStmt: The aggregate statement.
+
+        Examples:
+            To get the total amount and average age per country:
+
+            >>> from pyfreedb.row import Aggregate
+            >>> store.aggregate(Aggregate.SUM("amount"), Aggregate.AVG("age")).group_by("country").execute()
+            [{"country": "ID", "sum_amount": 10, "avg_age": 20.5}]
+        """
+        if not aggregates:
+            raise ValueError("at least one aggregate is required.")
+
+        for aggregate in aggregates:
+            if aggregate._field_name == self._RID_COLUMN_NAME and aggregate._function == "COUNT":
+                continue
+
+            if aggregate._field_name not in self._object_cls._fields:
+                raise ValueError(f"{aggregate._field_name} field is not recognised.")
+
+        return AggregateStmt(self, list(aggregates))
+
+    def get_by_rids(self, rids: List[int]) -> List[Optional[T]]:
+        """Get the rows with the given `_rid` (the row number inside the sheet) directly from the sheet.
+
+        The rows are read with a single range read request instead of a query, which is faster and always returns the
+        latest data.
+
+        Args:
+            rids: The `_rid` of the rows that we want to get.
+
+        Returns:
+            list: The rows in the same order as the given `rids`, None for the `rids` without a row.
+
+        Examples:
+            To get the 2nd and the 3rd row of the sheet:
+
+            >>> store.get_by_rids([3, 4])
+            [Person(name="cat"), None]
+        """
+        rows = {int(row[0]): row for row in self._read_rows(_group_consecutive(self._validate_rids(rids)))}
+        decode = self._object_cls._row_decoder(tuple(self._columns), with_rid=True)
+        return [decode(rows[rid]) if rid in rows else None for rid in rids]
+
+    def update_by_rids(self, rids: List[int], update_value: Dict[str, Any]) -> int:
+        """Update the rows with the given `_rid` without querying the affected rows first.
+
+        The given `rids` must belong to existing rows (e.g. taken from a previous select), rows that have been deleted
+        are not checked and will be written anyway.
+
+        Args:
+            rids: The `_rid` of the rows that we want to update.
+            update_value: Map of value by the field name.
+
+        Returns:
+            int: The number of updated rows.
+
+        Examples:
+            To update the name of the 2nd and the 3rd row of the sheet:
+
+            >>> store.update_by_rids([3, 4], {"name": "cat"})
+            2
+        """
+        return self.update(update_value)._apply(self._validate_rids(rids))
+
+    def delete_by_rids(self, rids: List[int]) -> int:
+        """Delete the rows with the given `_rid` without querying the affected rows first.
+
+        Args:
+            rids: The `_rid` of the rows that we want to delete.
+
+        Returns:
+            int: The number of deleted rows.
+
+        Examples:
+            To delete the 2nd and the 3rd row of the sheet:
+
+            >>> store.delete_by_rids([3, 4])
+            2
+        """
+        return self.delete()._apply(self._validate_rids(rids))
+
+    def _validate_rids(self, rids: List[int]) -> List[int]:
+        for rid in rids:
+            if not isinstance(rid, int) or isinstance(rid, bool) or rid < self._FIRST_DATA_ROW:
+                raise ValueError(f"{rid!r} is not a valid _rid.")
+
+        return sorted(set(rids))
+
+    @overload
+    def prepare(self, stmt: SelectStmt[T]) -> PreparedStmt[List[T]]: ...
+
+    @overload
+    def prepare(self, stmt: CountStmt[T]) -> PreparedStmt[int]: ...
+
+    def prepare(self, stmt: Any) -> Any:
+        """Create a prepared statement from the given select or count statement.
+
+        The statement's WHERE condition is written with `"?"` placeholders but without the arguments, they are given
+        on each execution instead. The query is compiled once, so executing the same query shape many times only
+        costs the arguments binding.
+
+        Args:
+            stmt: The select or count statement to prepare.
+
+        Returns:
+            pyfreedb.row.stmt.PreparedStmt: The prepared statement.
+
+        Examples:
+            To get the rows with a given name and age:
+
+            >>> stmt = store.prepare(store.select().where("age > ? AND name = ?"))
+            >>> stmt.execute(10, "cat")
+            [Person(name="cat", age=11)]
+        """
+        if not isinstance(stmt, (SelectStmt, CountStmt)):
+            raise TypeError("only select and count statements can be prepared.")
+
+        if stmt._store is not self:
+            raise ValueError("the statement belongs to another store.")
+
+        return PreparedStmt(stmt)
+
+    def export_to(self, path: str, file_format: int = JSONL_FILE_FORMAT) -> int:
+        """Write all rows of the sheet into a local file, e.g. to back the sheet up.
+
+        The rows are streamed from Google Sheets into the file, so the memory usage doesn't grow with the number of
+        rows. The file is only replaced once all rows are written.
+
+        Args:
+            path: The path of the file that we want to write.
+            file_format: The format of the file, see `JSONL_FILE_FORMAT`, `CSV_FILE_FORMAT` and `PARQUET_FILE_FORMAT`.
+
+        Returns:
+            int: The number of exported rows.
+
+        Examples:
+            To back the sheet up into a parquet file:
+
+            >>> store.export_to("person.parquet", file_format=GoogleSheetRowStore.PARQUET_FILE_FORMAT)
+            1000
+        """
+        _validate_file_format(file_format)
+
+        fields = self._object_cls._fields
+        decoders = [fields[column]._decode for column in self._columns]
+        rows = (
+            [decode(value) for decode, value in zip(decoders, row)]
+            for row in self._iter_rows(self._new_query_builder(), self._columns)
+        )
+        types: Dict[str, type] = {column: fields[column]._typ for column in self._columns}
+        return _export_rows(path, file_format, types, rows)
+
+    def import_from(
+        self,
+        path: str,
+        file_format: int = JSONL_FILE_FORMAT,
+        chunk_bytes: int = 1000000,
+        max_workers: int = 4,
+        checkpoint_file: Optional[str] = None,
+    ) -> int:
+        """Insert all rows of a local file, e.g. one written by `export_to`, into the sheet.
+
+        The file is read in chunks of about `chunk_bytes` (measured as JSON) and each chunk is inserted with its own
+        request, with at most `max_workers` chunks in flight. The rows of different chunks might end up in the sheet
+        in a different order than in the file.
+
+        If `checkpoint_file` is set, the inserted chunks are recorded in it, and importing the same file with the same
+        checkpoint file after a failure skips them. The checkpoint file is removed once the import is done. A chunk
+        that was inserted right before the failure but not recorded yet is inserted again.
+
+        Args:
+            path: The path of the file that we want to read.
+            file_format: The format of the file, see `JSONL_FILE_FORMAT`, `CSV_FILE_FORMAT` and `PARQUET_FILE_FORMAT`.
+            chunk_bytes: The approximate size of the rows inserted by each request.
+            max_workers: Maximum number of chunks that are inserted at the same time.
+            checkpoint_file: The path of the file that keeps track of the inserted chunks.
+
+        Returns:
+            int: The number of rows imported by this call, without the rows skipped thanks to the checkpoint.
+
+        Examples:
+            To restore a backup, resuming from where the previous attempt failed:
+
+            >>> store.import_from("person.jsonl", checkpoint_file="person.jsonl.checkpoint")
+            1000
+        """
+        _validate_file_format(file_format)
+        if chunk_bytes <= 0 or max_workers <= 0:
+            raise ValueError("chunk_bytes and max_workers must be greater than 0.")
+
+        checkpoint = None
+        if checkpoint_file is not None:
+            source = {"path": os.path.abspath(path), "file_format": file_format, "chunk_bytes": chunk_bytes}
+            checkpoint = _ImportCheckpoint(checkpoint_file, source)
+
+        def insert(chunk: List[Dict[str, Any]]) -> None:
+            rows = [self._object_cls(**{column: row.get(column) for column in self._columns}) for row in chunk]
+            InsertStmt(self, rows).execute()
+
+        types: Dict[str, type] = {column: self._object_cls._fields[column]._typ for column in self._columns}
+        chunks = _iter_chunks(_iter_file_rows(path, file_format, types), chunk_bytes)
+        count = _import_chunks(chunks, insert, max_workers, checkpoint)
+
+        if checkpoint is not None:
+            checkpoint.remove()
+        return count
+
     def _new_query_builder(self) -> _GoogleSheetQueryBuilder:
         return _GoogleSheetQueryBuilder(self._replacer).where(self._WHERE_DEFAULT_CLAUSE)
+
+    def refresh_replica(self) -> None:
+        """Reload the in-memory replica of the sheet.
+
+        This is only needed if the sheet is modified by other clients and the changes must be visible before the
+        replica refresh interval passes.
+        """
+        if self._replica is None:
+            raise InvalidOperationError("replica mode is not enabled")
+
+        self._replica.refresh()
+
+    def changes(self, since: int = 0, settle_window: float = 10.0) -> ChangeFeed[T]:
+        """Get the rows that have been inserted, updated or deleted after the given token, see `change_tracking`.
+
+        Only the changed rows are queried, ordered by when they were last written. The returned feed gives the token
+        to pass to the next call once it's fully consumed. A row might be returned again by the next call if it was
+        written within the last `settle_window` seconds, so the changes must be applied idempotently (e.g. upserted by
+        `_rid`).
+
+        The rows are versioned with the clocks of the clients that write them, and the token never moves past
+        `settle_window` seconds before the clock of this client. A write is only guaranteed to be returned if the time
+        it takes to reach Google Sheets plus the clock difference between its writer and this client stays under
+        `settle_window`, so increase it if the clocks of the clients aren't kept in sync.
+
+        Rows that haven't been written since the change tracking was enabled are only returned when `since` is 0,
+        which returns all rows of the sheet but not the deleted ones.
+
+        Args:
+            since: The token returned by the previous feed, 0 to get all rows.
+            settle_window: How many seconds the token stays behind the clock of this client, to pick up the writes
+                           that were still in flight or versioned by a clock that is behind.
+
+        Returns:
+            pyfreedb.row.changes.ChangeFeed: The changed rows.
+
+        Examples:
+            To keep a local copy of the sheet in sync:
+
+            >>> feed = store.changes(token)
+            >>> for change in feed:
+            ...     if change.deleted:
+            ...         local.pop(change.rid, None)
+            ...     else:
+            ...         local[change.rid] = change.row
+            >>> token = feed.token
+        """
+        if not self._change_tracking:
+            raise InvalidOperationError("change tracking is not enabled")
+        if settle_window < 0:
+            raise ValueError("settle_window can't be negative.")
+
+        width = len(self._columns) + 1
+        version_column = _to_a1_column(width + 1)
+        columns = ",".join(_to_a1_column(idx) for idx in range(1, width + 3))
+
+        # Deletes before a full sync don't matter, the deleted rows are not part of it.
+        condition = "A IS NOT NULL" if since <= 0 else f"{version_column} > {int(since)}"
+        query = f"SELECT {columns} WHERE {condition} ORDER BY {version_column}"
+
+        rows = self._wrapper.iter_query(self._spreadsheet_id, self._sheet_name, query)
+        decode = self._object_cls._row_decoder(tuple(self._columns), with_rid=True)
+        return ChangeFeed(rows, decode, width, since, int(settle_window * 1000))
+
+    def _tracking_values(self) -> List[Any]:
+        """Returns the values of the change tracking columns of a written row.
+
+        `_deleted_rid` is left as it is, the rows that have a `_rid` are live whatever it holds.
+        """
+        return [_now_version(), None] if self._change_tracking else []
+
+    def _tracking_requests(self, rids: List[int], deleted: bool = False) -> List[_BatchUpdateRowsRequest]:
+        """Returns the requests recording that the given rows have been written, or deleted if `deleted` is set."""
+        if not self._change_tracking:
+            return []
+
+        version = _now_version()
+        column = len(self._columns) + 2
+
+        requests = []
+        for first, last in _group_consecutive(sorted(set(rids))):
+            update_range = _A1Range(
+                self._sheet_name, _A1CellSelector.from_rc(column, first), _A1CellSelector.from_rc(column + 1, last)
+            )
+            values = [[version, rid if deleted else None] for rid in range(first, last + 1)]
+            requests.append(_BatchUpdateRowsRequest(update_range, values))
+
+        return requests
+
+    def rebuild_index(self, field_name: str) -> None:
+        """Rewrite the secondary index of the given field from the current content of the sheet.
+
+        This is only needed if the sheet is modified by other clients that don't maintain the index (e.g. edited by
+        hand or written by stores without `secondary_indexes`). The index is rebuilt with a single column read and a
+        single write, the lookups keep using the previous content until it's replaced.
+
+        Args:
+            field_name: The indexed field.
+
+        Examples:
+            To repair the index of the `email` field after the sheet has been edited by hand:
+
+            >>> store.rebuild_index("email")
+        """
+        index = self._indexes.get(field_name)
+        if index is None:
+            raise InvalidOperationError(f"{field_name} field is not indexed")
+
+        column = _A1CellSelector.from_rc(self._positions[field_name] + 1)
+        start = _A1CellSelector(column.column, self._FIRST_DATA_ROW)
+        rows = self._wrapper.get_rows(self._spreadsheet_id, _A1Range(self._sheet_name, start, column))
+        index.rebuild([row[0] if row else None for row in rows])
+
+    def _add_index(self, field_name: str) -> None:
+        field = self._object_cls._fields.get(field_name)
+        if field is None:
+            raise ValueError(f"{field_name} field is not recognised.")
+        if field._is_formula:
+            raise ValueError(f"{field_name} field is a formula and can't be indexed.")
+
+        index = _SecondaryIndex(self._wrapper, self._spreadsheet_id, self._sheet_name, field_name, self._FIRST_DATA_ROW)
+        self._indexes[field_name] = index
+        if index.ensure_sheet():
+            # The sheet might already contain rows that the new index doesn't know about.
+            self.rebuild_index(field_name)
+
+    def _index_requests(self, values_by_rid: Dict[int, Dict[str, Any]]) -> List[_BatchUpdateRowsRequest]:
+        """Returns the requests writing the given field values of the rows into the secondary indexes."""
+        requests = []
+        for field_name, index in self._indexes.items():
+            values = {rid: values[field_name] for rid, values in values_by_rid.items() if field_name in values}
+            requests.extend(index.update_requests(values))
+
+        return requests
+
+    def _index_clear_ranges(self, rids: List[int]) -> List[_A1Range]:
+        return [a1_range for index in self._indexes.values() for a1_range in index.clear_ranges(rids)]
+
+    def _new_replica(self, refresh_interval: float, indexes: Dict[str, int]) -> _RowReplica:
+        for key in indexes:
+            if key not in self._object_cls._fields:
+                raise ValueError(f"{key} field is not recognised.")
+
+        return _RowReplica(
+            self._wrapper,
+            self._spreadsheet_id,
+            self._sheet_name,
+            [self._RID_COLUMN_NAME] + self._columns,
+            self._FIRST_DATA_ROW,
+            refresh_interval,
+            indexes,
+        )
+
+    def _select_rows(self, query: _GoogleSheetQueryBuilder, columns: List[str]) -> List[List[Any]]:
+        if self._replica is not None:
+            try:
+                return self._replica.select(query, columns)
+            except _UnsupportedExpression:
+                # The condition uses GViz features that the replica can't evaluate, let GViz handle it.
+                pass
+
+        rows = self._find_directly(query)
+        if rows is not None:
+            return _order_and_project(rows, query, self._positions, columns)
+
+        if self._query_format == self.CSV_QUERY_FORMAT:
+            converters = [self._csv_converter(column) for column in columns]
+            return self._query(query.build_select(columns), converters)
+
+        return self._query(query.build_select(columns))
+
+    def _iter_rows(self, query: _GoogleSheetQueryBuilder, columns: List[str]) -> Iterator[List[Any]]:
+        if self._replica is not None:
+            try:
+                return iter(self._replica.select(query, columns))
+            except _UnsupportedExpression:
+                pass
+
+        rows = self._find_directly(query)
+        if rows is not None:
+            return iter(_order_and_project(rows, query, self._positions, columns))
+
+        # The query result cache is skipped on purpose, caching the rows would defeat the purpose of streaming them.
+        if self._query_format == self.CSV_QUERY_FORMAT:
+            converters = [self._csv_converter(column) for column in columns]
+            return self._wrapper.iter_query_csv(
+                self._spreadsheet_id, self._sheet_name, query.build_select(columns), converters
+            )
+
+        return self._wrapper.iter_query(self._spreadsheet_id, self._sheet_name, query.build_select(columns))
+
+    def _count_rows(self, query: _GoogleSheetQueryBuilder) -> int:
+        if self._replica is not None:
+            try:
+                return self._replica.count(query)
+            except _UnsupportedExpression:
+                pass
+
+        rid_rows = self._find_directly(query)
+        if rid_rows is not None:
+            return len(rid_rows)
+
+        rows = self._query(query.build_select(self._COUNT_COLUMNS))
+
+        # If the spreadsheet is empty, GViz will return empty rows instead.
+        if len(rows) == 0:
+            return 0
+
+        return int(rows[0][0])
+
+    def _validate_in(self, field_name: str, values: Sequence[Any]) -> Tuple[str, List[Any]]:
+        if field_name != self._RID_COLUMN_NAME and field_name not in self._object_cls._fields:
+            raise ValueError(f"{field_name} field is not recognised.")
+
+        # A row matches at most one of the values, so the results of the chunks never overlap once the values are
+        # unique. 1 and True are different values in GViz even though they are equal in Python.
+        unique: Dict[Tuple[bool, Any], Any] = {}
+        for value in values:
+            if value is None:
+                raise ValueError("values can't contain None.")
+            unique.setdefault((isinstance(value, bool), value), value)
+
+        return field_name, list(unique.values())
+
+    def _select_rows_in(
+        self,
+        query: _GoogleSheetQueryBuilder,
+        columns: List[str],
+        field_name: str,
+        values: List[Any],
+        fresh: bool = False,
+    ) -> List[List[Any]]:
+        for ordering in query._orderings:
+            if ordering._field_name not in self._positions:
+                raise ValueError(f"{ordering._field_name} field is not recognised.")
+
+        if not values:
+            return []
+
+        # The chunks are merged locally, so we also need the ordering columns and the _rid to keep the sheet order.
+        order_columns = [o._field_name for o in query._orderings]
+        select_columns = list(dict.fromkeys([self._RID_COLUMN_NAME] + columns + order_columns))
+
+        base = copy.copy(query).offset(0)
+        if query._limit:
+            # Any of the chunks might contain all of the rows before the offset.
+            base.limit(query._limit + query._offset)
+
+        chunks = self._split_in_values(base, select_columns, field_name, values)
+        select = self._select_fresh_rows if fresh else self._select_rows
+        results = self._run_concurrently(lambda chunk: select(base._with_in(field_name, chunk), select_columns), chunks)
+
+        rows = [tuple(row) for result in results for row in result]
+        rows.sort(key=lambda row: _sort_key(row[0]))
+
+        positions = {column: idx for idx, column in enumerate(select_columns)}
+        return _order_and_project(rows, query, positions, columns)
+
+    def _count_rows_in(self, query: _GoogleSheetQueryBuilder, field_name: str, values: List[Any]) -> int:
+        if not values:
+            return 0
+
+        chunks = self._split_in_values(query, self._COUNT_COLUMNS, field_name, values)
+        counts = self._run_concurrently(lambda chunk: self._count_rows(query._with_in(field_name, chunk)), chunks)
+        return sum(counts)
+
+    def _split_in_values(
+        self, query: _GoogleSheetQueryBuilder, columns: List[str], field_name: str, values: List[Any]
+    ) -> List[List[Any]]:
+        # Split the values into as few chunks as possible while keeping each query under the length limit.
+        column = self._replacer.replace(field_name)
+        base_length = len(urllib.parse.quote_plus(query.build_select(columns) + " AND ()"))
+        separator_length = len(urllib.parse.quote_plus(" OR "))
+
+        chunks: List[List[Any]] = [[]]
+        length = base_length
+        for value in values:
+            value_length = len(urllib.parse.quote_plus(f"{column} = {_convert_arg(value)}")) + separator_length
+            if chunks[-1] and length + value_length > self._MAX_IN_QUERY_LENGTH:
+                chunks.append([])
+                length = base_length
+
+            chunks[-1].append(value)
+            length += value_length
+
+        return chunks
+
+    def _run_concurrently(self, fn: Callable[[List[Any]], R], chunks: List[List[Any]]) -> List[R]:
+        return _map(fn, chunks, self._MAX_IN_QUERY_WORKERS)
+
+    def _find_rids(self, query: _GoogleSheetQueryBuilder) -> List[int]:
+        return [int(row[0]) for row in self._select_fresh_rows(query, [self._RID_COLUMN_NAME])]
+
+    def _select_fresh_rows(self, query: _GoogleSheetQueryBuilder, columns: List[str]) -> List[List[Any]]:
+        # Writes never go through the replica or the query result cache, the affected rows must be up to date.
+        rows = self._find_by_rid(query)
+        if rows is not None:
+            return _order_and_project(rows, query, self._positions, columns)
+
+        return self._wrapper.query(self._spreadsheet_id, self._sheet_name, query.build_select(columns))
+
+    def _find_by_rid(self, query: _GoogleSheetQueryBuilder) -> Optional[List[Tuple[Any, ...]]]:
+        """Find the rows matching the query with range reads if its WHERE condition only filters on `_rid`.
+
+        The rows are returned in the sheet order with all of their columns, None is returned if the query can't be
+        served this way (e.g. it filters on other columns or it doesn't bound `_rid` from above).
+        """
+        parsed = self._parse_where(query)
+        if parsed is None:
+            return None
+
+        node, args = parsed
+        ranges = _column_ranges(node, args, self._positions[self._RID_COLUMN_NAME])
+        if ranges is None:
+            return None
+
+        row_ranges = _to_row_ranges(ranges, self._FIRST_DATA_ROW)
+        if row_ranges is None or sum(last - first + 1 for first, last in row_ranges) > self._MAX_DIRECT_READ_ROWS:
+            return None
+
+        # The ranges are a superset of the matching rows, e.g. "_rid > 2" reads the 2nd row as well.
+        predicate = _compile(node, args)
+        return [row for row in self._read_rows(row_ranges) if predicate(row)]
+
+    def _find_by_index(self, query: _GoogleSheetQueryBuilder) -> Optional[List[Tuple[Any, ...]]]:
+        """Find the rows matching the query through a secondary index if its WHERE condition requires an indexed field
+        to be equal to a value.
+
+        The rows are returned in the sheet order with all of their columns, None is returned if the query can't be
+        served this way.
+        """
+        if not self._indexes:
+            return None
+
+        parsed = self._parse_where(query)
+        if parsed is None:
+            return None
+
+        node, args = parsed
+        for position, op, value in _indexable_predicates(node, args):
+            index = self._indexes.get(self._columns[position - 1]) if position > 0 else None
+            if index is None or op != "=" or value is None:
+                continue
+
+            rids = index.lookup(value)
+            if rids is None:
+                return None
+
+            # The index might be stale if the sheet is written by other clients, so the rows are checked again.
+            predicate = _compile(node, args)
+            return [row for row in self._read_rows(_group_consecutive(rids)) if predicate(row)]
+
+        return None
+
+    def _find_directly(self, query: _GoogleSheetQueryBuilder) -> Optional[List[Tuple[Any, ...]]]:
+        rows = self._find_by_rid(query)
+        if rows is None:
+            rows = self._find_by_index(query)
+        return rows
+
+    def _parse_where(self, query: _GoogleSheetQueryBuilder) -> Optional[Tuple[_Node, Sequence[Any]]]:
+        where = query._bound_where()
+        if not where or any(o._field_name not in self._positions for o in query._orderings):
+            return None
+
+        condition, args = where
+        try:
+            return _parse(condition, self._positions), args
+        except _UnsupportedExpression:
+            return None
+
+    def _read_rows(self, row_ranges: List[Tuple[int, int]]) -> List[Tuple[Any, ...]]:
+        row_ranges = self._clamp_to_grid(row_ranges)
+        width = len(self._positions)
+        rows = []
+        for i in range(0, len(row_ranges), self._MAX_RANGES_PER_READ):
+            a1_ranges = [
+                _A1Range(self._sheet_name, _A1CellSelector.from_rc(1, first), _A1CellSelector.from_rc(width, last))
+                for first, last in row_ranges[i : i + self._MAX_RANGES_PER_READ]
+            ]
+            for values in self._wrapper.batch_get_rows(self._spreadsheet_id, a1_ranges):
+                for raw in values:
+                    row = _to_row(raw, width)
+                    # Rows that are cleared by deletes don't have _rid.
+                    if row[0] is not None:
+                        rows.append(row)
+
+        return rows
+
+    def _clamp_to_grid(self, row_ranges: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+        # Reading past the end of the grid is an error. The grid grows as rows are appended, so its size is only fetched
+        # again when a range goes past the size we know about.
+        last_row = max((last for _, last in row_ranges), default=0)
+        if self._grid_rows is None or last_row > self._grid_rows:
+            self._grid_rows = self._wrapper.get_row_count(self._spreadsheet_id, self._sheet_name)
+
+        grid_rows = self._grid_rows
+        return [(first, min(last, grid_rows)) for first, last in row_ranges if first <= grid_rows]
+
+    def _get_sheet_id(self) -> int:
+        if self._sheet_id is None:
+            self._sheet_id = self._wrapper.get_sheet_ids(self._spreadsheet_id)[self._sheet_name]
+        return self._sheet_id
+
+    def _query(self, query: str, csv_converters: Optional[List[Callable[[str], Any]]] = None) -> List[List[Any]]:
+        def run() -> List[List[Any]]:
+            if csv_converters is not None:
+                return list(self._wrapper.iter_query_csv(self._spreadsheet_id, self._sheet_name, query, csv_converters))
+
+            return self._wrapper.query(self._spreadsheet_id, self._sheet_name, query)
+
+        if self._query_cache is None:
+            return run()
+
+        rows: List[List[Any]] = self._query_cache.get_or_load((self._spreadsheet_id, self._sheet_name, query), run)
+        return rows
+
+    def _query_table(self, query: str) -> Tuple[List[str], List[List[Any]]]:
+        def run() -> Tuple[List[str], List[List[Any]]]:
+            return self._wrapper.query_table(self._spreadsheet_id, self._sheet_name, query)
+
+        if self._query_cache is None:
+            return run()
+
+        # The labels are part of the cached value, so the key must not collide with the plain query results.
+        table: Tuple[List[str], List[List[Any]]] = self._query_cache.get_or_load(
+            ("table", self._spreadsheet_id, self._sheet_name, query), run
+        )
+        return table
+
+    def _csv_converter(self, column: str) -> Callable[[str], Any]:
+        if column == self._RID_COLUMN_NAME:
+            return _parse_csv_number
+
+        typ = self._object_cls._fields[column]._typ
+        if typ is bool:
+            return _parse_csv_bool
+        if typ in (int, float):
+            return _parse_csv_number
+
+        return str
+
+    def _notify_write(self) -> None:
+        if self._replica is not None:
+            self._replica.invalidate()
+        if self._query_cache is not None:
+            self._query_cache.invalidate()
+
+    def _take_free_rows(self, n: int) -> List[int]:
+        with self._free_rows_lock:
+            if self._free_rows is None:
+                self._free_rows = self._find_free_rows()
+
+            taken, self._free_rows = self._free_rows[:n], self._free_rows[n:]
+
+        if not taken:
+            return taken
+
+        # The scan goes through GViz, which can lag behind, and other clients may have written to the rows since then.
+        # The rows that are not empty anymore are skipped, so the values meant for them are appended instead.
+        used = {int(row[0]) for row in self._read_rows(_group_consecutive(taken))}
+        return [row for row in taken if row not in used]
+
+    def _release_rows(self, indices: List[int]) -> None:
+        with self._free_rows_lock:
+            # If we haven't scanned the sheet yet, the next scan will pick up the released rows anyway.
+            if self._free_rows is None:
+                return
+
+            self._free_rows = sorted(set(self._free_rows).union(indices))
+
+    def _find_free_rows(self) -> List[int]:
+        # GViz doesn't return anything for the cleared rows (they don't have the row number in the _rid column), so we
+        # derive them from the gaps between the _rid of the rows that are still alive.
+        query = (
+            self._new_query_builder()
+            .order_by(Ordering.ASC(self._RID_COLUMN_NAME))
+            .build_select([self._RID_COLUMN_NAME])
+        )
+        rows = self._wrapper.query(self._spreadsheet_id, self._sheet_name, query)
+        return _find_row_gaps([int(row[0]) for row in rows], self._FIRST_DATA_ROW)
+
+
+def _dirty_values(row: Model) -> Dict[str, Any]:
+    return {name: getattr(row, name) for name in row._dirty or ()}
+
+
+def _find_row_gaps(used_rows: List[int], first_row: int) -> List[int]:
+    gaps: List[int] = []
+    expected = first_row
+    for row in used_rows:
+        gaps.extend(range(expected, row))
+        expected = row + 1
+
+    return gaps
+
+
+def _to_row_ranges(ranges: List[Tuple[float, float]], first_row: int) -> Optional[List[Tuple[int, int]]]:
+    # Convert the value ranges of _rid into sorted and non-overlapping (first, last) row ranges.
+    row_ranges = []
+    for lo, hi in ranges:
+        if hi == math.inf:
+            return None
+
+        first, last = math.ceil(max(lo, first_row)), math.floor(hi)
+        if first <= last:
+            row_ranges.append((first, last))
+
+    merged: List[Tuple[int, int]] = []
+    for first, last in sorted(row_ranges):
+        if merged and first <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], last))
+        else:
+            merged.append((first, last))
+
+    return merged
+
+
+def _parse_csv_number(text: str) -> float:
+    # Remove the thousands separator that might be added by the cell's number format.
+    return float(text.replace(",", ""))
+
+
+def _parse_csv_bool(text: str) -> bool:
+    return text.upper() == "TRUE"
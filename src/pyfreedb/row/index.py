@@ -0,0 +1,113 @@
+from typing import Any, Dict, List, Optional
+
+from pyfreedb.providers.google.sheet.base import _A1CellSelector, _A1Range, _BatchUpdateRowsRequest
+from pyfreedb.providers.google.sheet.wrapper import _GoogleSheetWrapper
+from pyfreedb.row.models import NotSet
+from pyfreedb.row.stmt import _escape_val, _group_consecutive
+
+
+class _SecondaryIndex:
+    """A hidden sheet that mirrors one column of a row store, row for row, to find the rows holding a value.
+
+    The value of row `rid` in the row store is kept in the row `rid` of the index sheet, so the index is maintained
+    with plain cell writes and the rows it finds can be read directly with range reads. Each lookup appends its formula
+    into a free cell of the second column of the index sheet and clears it afterwards, so Google Sheets evaluates it
+    and only the numbers of the matching rows are transferred. Concurrent lookups get their own cells, and no formula
+    is left behind to be recalculated on every write.
+    """
+
+    _SUFFIX = "_idx_"
+
+    def __init__(
+        self, wrapper: _GoogleSheetWrapper, spreadsheet_id: str, sheet_name: str, field_name: str, first_row: int
+    ) -> None:
+        self._wrapper = wrapper
+        self._spreadsheet_id = spreadsheet_id
+        self._sheet_name = sheet_name + self._SUFFIX + field_name
+        self._field_name = field_name
+        self._first_row = first_row
+
+    def ensure_sheet(self) -> bool:
+        """Create the index sheet if it doesn't exist yet, returns whether it has been created."""
+        try:
+            self._wrapper.create_sheet(self._spreadsheet_id, self._sheet_name, hidden=True)
+        except Exception:
+            return False
+
+        self._wrapper.update_rows(self._spreadsheet_id, _A1Range(self._sheet_name), [[self._field_name]])
+        return True
+
+    def lookup(self, value: Any) -> Optional[List[int]]:
+        """Returns the sorted rows holding the given value, None if Google Sheets can't list all of them."""
+        if value == "":
+            # Empty strings can't be told apart from the blank cells down to the end of the grid.
+            return None
+
+        column = f"A{self._first_row}:A"
+        formula = f'=TEXTJOIN(",", TRUE, IFNA(FILTER(ROW({column}), {_match_formula(column, value)}), ""))'
+        resp = self._wrapper.overwrite_rows(
+            self._spreadsheet_id, _A1Range.from_notation(f"{self._sheet_name}!B:B"), [[formula]]
+        )
+        self._wrapper.clear(self._spreadsheet_id, [resp.updated_range])
+
+        text = str(resp.inserted_values[0][0]) if resp.inserted_values and resp.inserted_values[0] else ""
+        if not text:
+            return []
+
+        try:
+            return sorted(int(float(rid)) for rid in text.split(","))
+        except ValueError:
+            # The joined row numbers don't fit into a single cell.
+            return None
+
+    def update_requests(self, values_by_rid: Dict[int, Any]) -> List[_BatchUpdateRowsRequest]:
+        requests = []
+        for first_rid, last_rid in _group_consecutive(sorted(values_by_rid)):
+            update_range = _A1Range(
+                self._sheet_name, _A1CellSelector.from_rc(1, first_rid), _A1CellSelector.from_rc(1, last_rid)
+            )
+            values = [[_index_value(values_by_rid[rid])] for rid in range(first_rid, last_rid + 1)]
+            requests.append(_BatchUpdateRowsRequest(update_range, values))
+
+        return requests
+
+    def clear_ranges(self, rids: List[int]) -> List[_A1Range]:
+        # Only the first column is cleared, the second one holds the cells of the lookups in flight.
+        return [
+            _A1Range(self._sheet_name, _A1CellSelector.from_rc(1, first), _A1CellSelector.from_rc(1, last))
+            for first, last in _group_consecutive(rids)
+        ]
+
+    def rebuild(self, values: List[Any]) -> None:
+        """Replace the index content with the given values of the rows, starting from the first data row."""
+        last_row = self._first_row + len(values) - 1
+        if values:
+            update_range = _A1Range(
+                self._sheet_name, _A1CellSelector.from_rc(1, self._first_row), _A1CellSelector.from_rc(1, last_row)
+            )
+            self._wrapper.batch_update_rows(
+                self._spreadsheet_id, [_BatchUpdateRowsRequest(update_range, [[_index_value(v)] for v in values])]
+            )
+
+        # The stale entries are only cleared afterwards, so the lookups never see an empty index in the meantime.
+        stale_range = _A1Range(self._sheet_name, _A1CellSelector.from_rc(1, last_row + 1), _A1CellSelector("A"))
+        self._wrapper.clear(self._spreadsheet_id, [stale_range])
+
+
+def _match_formula(column: str, value: Any) -> str:
+    # Blank cells are equal to both 0 and FALSE, they must not match all of the empty rows of the grid.
+    if isinstance(value, bool):
+        return f"({column} = {str(value).upper()}) * (LEN({column}) > 0)"
+    if isinstance(value, (int, float)):
+        return f"({column} = {value!r}) * (LEN({column}) > 0)"
+
+    # "=" ignores the case of the strings.
+    text = str(value).replace('"', '""')
+    return f'EXACT({column}, "{text}")'
+
+
+def _index_value(value: Any) -> Any:
+    # Empty strings clear the cell, None would leave the previous value in place.
+    if value is None or value is NotSet:
+        return ""
+    return _escape_val(value)
@@ -1,5 +1,5 @@
 import dataclasses
-from typing import Any, Dict, Generic, Optional, Type, TypeVar, Union, cast
+from typing import Any, Callable, Dict, Generic, List, Optional, Sequence, Set, Tuple, Type, TypeVar, Union, cast
 
 
 class NotSet:
@@ -47,14 +47,32 @@ class _Field(Generic[T]):
         return cast(Optional[T], value)
 
     def __set__(self, obj: Any, value: Optional[T]) -> None:
+        value = self._validate(value)
+        self._ensure_is_formula()
+        setattr(obj._data, self._field_name, value)
+
+        # Remember the changed fields so that saving the object only writes them.
+        if obj._dirty is None:
+            obj._dirty = {self._field_name}
+        else:
+            obj._dirty.add(self._field_name)
+
+    def _validate(self, value: Any) -> Any:
         self._ensure_type(value)
-        if value is not NotSet:
+        if value is not NotSet and value is not None:
             # We need to typecast the value to field's _typ because for number types the value will be returned
             # as float by Google Sheet's API.
             value = self._typ(value)  # type: ignore [call-arg]
 
-        self._ensure_is_formula()
-        return setattr(obj._data, self._field_name, value)
+        return value
+
+    def _decode(self, value: Any) -> Any:
+        # Values coming from Google Sheets almost always have the right type already, so we only go through the full
+        # validation when they don't.
+        if value is None or type(value) is self._typ:
+            return value
+
+        return self._validate(value)
 
     def _ensure_is_formula(self) -> None:
         if self._is_formula and self._typ is not str:
@@ -81,6 +99,13 @@ class _NumberField(_Field[T]):
         if isinstance(value, int) and not _is_ieee754_safe_integer(value):
             raise ValueError("f{value} can't be exactly stored as number. Use string instead to avoid precision loss.")
 
+    def _decode(self, value: Any) -> Any:
+        typ = type(value)
+        if typ is int or typ is float:
+            return self._typ(value)  # type: ignore [call-arg]
+
+        return super()._decode(value)
+
 
 class IntegerField(_NumberField[int]):
     """A field for integer number values."""
@@ -106,6 +131,21 @@ class StringField(_Field[str]):
     _typ = str
 
 
+def _make_slotted_dataclass(name: str, fields: List[Tuple[str, type, Any]]) -> type:
+    data_cls = dataclasses.make_dataclass(name, fields)
+
+    # This is what dataclass(slots=True) does since Python 3.10: recreate the class with __slots__. The field
+    # defaults are already captured by the generated __init__, so we can drop them from the class namespace.
+    namespace = dict(data_cls.__dict__)
+    for field_name, _, _ in fields:
+        namespace.pop(field_name, None)
+    namespace.pop("__dict__", None)
+    namespace.pop("__weakref__", None)
+    namespace["__slots__"] = tuple(field_name for field_name, _, _ in fields)
+
+    return type(data_cls.__name__, data_cls.__bases__, namespace)
+
+
 class _Meta(type):
     def __new__(cls, name: str, bases: Any, dct: Any) -> "_Meta":
         new_cls = super().__new__(cls, name, bases, dct)
@@ -133,13 +173,16 @@ class _Meta(type):
             value = dataclasses.field(default=NotSet)
             dataclasses_fields.append((field_name, cast(type, Union[field._typ, NotSet]), value))
 
-        data_cls = dataclasses.make_dataclass(name, dataclasses_fields)
+        data_cls = _make_slotted_dataclass(name, dataclasses_fields)
 
         # Ideally we should make make the __init__ annotation is the same as dataclasses' __init__
         # annotation to improve the developer experience.
         def init(self: Any, *args: Any, **kwargs: Any) -> None:
             self._data = data_cls(*args, **kwargs)
+            self._rid = None
+            self._dirty = None
             self._validate_type()
+            self._dirty = None
 
         def repr(self: Any) -> str:
             return str(self._data)
@@ -150,6 +193,11 @@ class _Meta(type):
         setattr(new_cls, "__init__", init)
         setattr(new_cls, "__repr__", repr)
         setattr(new_cls, "__eq__", eq)
+        setattr(new_cls, "_data_cls", data_cls)
+
+        # Generated lazily by _row_decoder and _row_encoder. Each class needs its own cache, we can't inherit them.
+        setattr(new_cls, "_row_decoders", {})
+        setattr(new_cls, "_row_encoders", {})
 
         return new_cls
 
@@ -164,13 +212,107 @@ class Model(metaclass=_Meta):
     ...     age = IntegerField()
     """
 
+    # _rid is the row number of the object inside the sheet (None if it's not stored yet) and _dirty is the set of
+    # fields changed since the object was read or saved (None if nothing has changed).
+    __slots__ = ("_data", "_rid", "_dirty")
+
     _fields: Dict[str, Union[IntegerField, FloatField, BoolField, StringField]]
+    _data_cls: type
+    _rid: Optional[int]
+    _dirty: Optional[Set[str]]
+    _row_decoders: Dict[Tuple[Tuple[str, ...], bool], Callable[[Sequence[Any]], Any]]
+    _row_encoders: Dict[Callable[[Any], Any], Callable[[Any], List[Any]]]
 
     def _validate_type(self) -> None:
         for field in self._fields:
             # Trigger the validation by reassigning the value to itself.
             setattr(self, field, getattr(self, field))
 
+    @classmethod
+    def _row_decoder(cls, columns: Tuple[str, ...], with_rid: bool = False) -> Callable[[Sequence[Any]], Any]:
+        """Returns a function that builds the model object from a row that contains the given `columns` in order.
+
+        If `with_rid` is set, the row starts with the `_rid` of the object followed by the given `columns`. The row is
+        trusted to come from Google Sheets, so the values that already have the right type are assigned directly
+        without going through the field descriptors.
+        """
+        decoder = cls._row_decoders.get((columns, with_rid))
+        if decoder is None:
+            decoder = _make_row_decoder(cls, columns, with_rid)
+            cls._row_decoders[(columns, with_rid)] = decoder
+
+        return decoder
+
+    @classmethod
+    def _row_encoder(cls, escape: Callable[[Any], Any]) -> Callable[[Any], List[Any]]:
+        """Returns a function that converts the model object into the list of its field values in column order.
+
+        The values of the non formula fields are passed through the given `escape` function.
+        """
+        encoder = cls._row_encoders.get(escape)
+        if encoder is None:
+            encoder = _make_row_encoder(cls, escape)
+            cls._row_encoders[escape] = encoder
+
+        return encoder
+
+
+def _make_row_decoder(
+    model_cls: Type[Model], columns: Tuple[str, ...], with_rid: bool
+) -> Callable[[Sequence[Any]], Any]:
+    # Similar to what dataclasses does, we generate the code so that the per row work is reduced to a single call of
+    # each field's decoder. If a column is selected more than once, the last one wins.
+    offset = 1 if with_rid else 0
+    positions = {}
+    for idx, column in enumerate(columns):
+        if column not in model_cls._fields:
+            raise ValueError(f"{column} field is not recognised.")
+
+        positions[column] = idx + offset
+
+    scope: Dict[str, Any] = {
+        "_new": object.__new__,
+        "_cls": model_cls,
+        "_data_cls": model_cls._data_cls,
+        "_to_rid": _to_rid,
+    }
+    kwargs = []
+    for column, idx in positions.items():
+        field = model_cls._fields[column]
+        field._ensure_is_formula()
+        scope[f"_decode_{column}"] = field._decode
+        kwargs.append(f"{column}=_decode_{column}(row[{idx}])")
+
+    src = (
+        "def decode(row):\n"
+        "    obj = _new(_cls)\n"
+        "    obj._data = _data_cls({})\n"
+        "    obj._rid = {}\n"
+        "    obj._dirty = None\n"
+        "    return obj\n".format(", ".join(kwargs), "_to_rid(row[0])" if with_rid else "None")
+    )
+    exec(src, scope)
+    return cast(Callable[[Sequence[Any]], Any], scope["decode"])
+
+
+def _make_row_encoder(model_cls: Type[Model], escape: Callable[[Any], Any]) -> Callable[[Any], List[Any]]:
+    scope: Dict[str, Any] = {"_escape": escape}
+    values = []
+    for field_name, field in model_cls._fields.items():
+        if field._is_formula:
+            values.append(f"data.{field_name}")
+        else:
+            values.append(f"_escape(data.{field_name})")
+
+    src = "def encode(obj):\n" "    data = obj._data\n" "    return [{}]\n".format(", ".join(values))
+    exec(src, scope)
+    return cast(Callable[[Any], List[Any]], scope["encode"])
+
+
+def _to_rid(value: Any) -> Optional[int]:
+    # GViz returns the _rid as float.
+    return None if value is None else int(value)
+
 
 def _is_ieee754_safe_integer(value: int) -> bool:
     return value == int(float(value))
@@ -0,0 +1,223 @@
+import re
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+from pyfreedb.providers.google.auth.base import GoogleAuthClient
+from pyfreedb.providers.google.sheet.wrapper import _GoogleSheetWrapper
+from pyfreedb.row.expr import _indexable_predicates, _parse, _UnsupportedExpression
+from pyfreedb.row.fanout import T, _FanOutStore, _Where
+from pyfreedb.row.gsheet import GoogleSheetRowStore
+from pyfreedb.row.models import FloatField, IntegerField
+
+
+class PartitionedRowStore(_FanOutStore[T]):
+    """A row store that spreads the rows of a table across one sheet per time period.
+
+    Each row is written into the partition sheet of the period its partition key falls in, e.g. `events_2026_10` for
+    the monthly partitions of the `events` table. The partition key must be an `IntegerField` or `FloatField` holding
+    a Unix timestamp in seconds, and the periods are in UTC. Partition sheets are created on the first insert into
+    their period.
+
+    Statements whose WHERE condition bounds the partition key (e.g. `ts >= ? AND ts < ?`) only touch the partitions
+    that overlap with the bounds, the other statements are executed on all partitions concurrently.
+
+    >>> store = PartitionedRowStore(auth_client, spreadsheet_id, "events", Event, partition_key="ts")
+    >>> store.insert([Event(ts=time.time(), name="login")]).execute()
+    >>> store.select().where("ts >= ?", time.time() - 86400).execute()  # Only queries the latest partitions.
+    [Event(ts=1792396800, name="login")]
+    """
+
+    MONTHLY_PARTITION = 0
+    """Create a partition sheet per calendar month, named `<table>_<yyyy>_<mm>`."""
+
+    DAILY_PARTITION = 1
+    """Create a partition sheet per day, named `<table>_<yyyy>_<mm>_<dd>`."""
+
+    def __init__(
+        self,
+        auth_client: GoogleAuthClient,
+        spreadsheet_id: str,
+        table_name: str,
+        object_cls: Type[T],
+        partition_key: str,
+        partition_period: int = MONTHLY_PARTITION,
+        max_workers: int = 8,
+    ):
+        """Initialise the partitioned row store and discover the existing partitions of the table.
+
+        Args:
+            auth_client: The credential that we're going to use to call the Google Sheet APIs.
+            spreadsheet_id: The spreadsheet id that holds the partition sheets.
+            table_name: The prefix of the partition sheet names.
+            object_cls: The row model definition of the table.
+            partition_key: The timestamp field used to pick the partition of each row.
+            partition_period: The period covered by each partition, see `MONTHLY_PARTITION` and `DAILY_PARTITION`.
+            max_workers: Maximum number of partitions that are queried at the same time.
+        """
+        field = object_cls._fields.get(partition_key)
+        if field is None:
+            raise ValueError(f"{partition_key} field is not recognised.")
+        if not isinstance(field, (IntegerField, FloatField)):
+            raise TypeError(f"{partition_key} field must be an IntegerField or a FloatField.")
+        if partition_period not in (self.MONTHLY_PARTITION, self.DAILY_PARTITION):
+            raise ValueError("partition_period must be MONTHLY_PARTITION or DAILY_PARTITION.")
+
+        self._auth_client = auth_client
+        self._spreadsheet_id = spreadsheet_id
+        self._table_name = table_name
+        self._object_cls = object_cls
+        self._routing_key = partition_key
+        self._partition_period = partition_period
+        self._max_workers = max_workers
+        self._positions = {
+            name: idx for idx, name in enumerate([GoogleSheetRowStore._RID_COLUMN_NAME] + list(object_cls._fields))
+        }
+
+        suffix = r"_(\d{4})_(\d{2})" if partition_period == self.MONTHLY_PARTITION else r"_(\d{4})_(\d{2})_(\d{2})"
+        self._name_pattern = re.compile(re.escape(table_name) + suffix)
+        self._wrapper = _GoogleSheetWrapper(auth_client)
+
+        # Map of partition start to its sheet name. The stores are only created once a partition is touched, since
+        # creating one writes the column headers.
+        self._partitions: Dict[datetime, str] = {}
+        self._stores: Dict[str, GoogleSheetRowStore[T]] = {}
+        self._lock = threading.Lock()
+        self.refresh_partitions()
+
+    def refresh_partitions(self) -> List[str]:
+        """Reload the list of partition sheets, e.g. to see the partitions created by other clients.
+
+        Returns:
+            list: The partition sheet names, from the oldest to the latest period.
+        """
+        partitions = {}
+        for sheet_name in self._wrapper.get_sheet_ids(self._spreadsheet_id):
+            match = self._name_pattern.fullmatch(sheet_name)
+            if match is not None:
+                day = int(match.group(3)) if self._partition_period == self.DAILY_PARTITION else 1
+                partitions[datetime(int(match.group(1)), int(match.group(2)), day, tzinfo=timezone.utc)] = sheet_name
+
+        with self._lock:
+            self._partitions = partitions
+            self._stores = {name: store for name, store in self._stores.items() if name in partitions.values()}
+            return [partitions[start] for start in sorted(partitions)]
+
+    def drop_partitions_before(self, timestamp: float) -> List[str]:
+        """Delete the partition sheets whose whole period is before the given timestamp.
+
+        All of the partition sheets are deleted with a single request.
+
+        Args:
+            timestamp: Unix timestamp in seconds, the partitions that end before or at this time are deleted.
+
+        Returns:
+            list: The names of the deleted partition sheets, from the oldest to the latest period.
+
+        Examples:
+            To keep the last 90 days of events:
+
+            >>> store.drop_partitions_before(time.time() - 90 * 86400)
+            ["events_2026_06"]
+        """
+        cutoff = datetime.fromtimestamp(timestamp, timezone.utc)
+        with self._lock:
+            starts = [start for start in sorted(self._partitions) if self._period_end(start) <= cutoff]
+            if not starts:
+                return []
+
+            names = [self._partitions[start] for start in starts]
+            sheet_ids = self._wrapper.get_sheet_ids(self._spreadsheet_id)
+            self._wrapper.delete_sheets(self._spreadsheet_id, [sheet_ids[name] for name in names if name in sheet_ids])
+
+            for start, name in zip(starts, names):
+                del self._partitions[start]
+                self._stores.pop(name, None)
+
+        return names
+
+    def _insert(self, rows: List[T]) -> None:
+        rows_by_partition: Dict[datetime, List[T]] = {}
+        for row in rows:
+            start = self._period_start(getattr(row, self._routing_key))
+            rows_by_partition.setdefault(start, []).append(row)
+
+        stores = {start: self._partition_store(start, create=True) for start in rows_by_partition}
+        self._fan_out(lambda start: stores[start].insert(rows_by_partition[start]).execute(), list(stores))
+
+    def _route(self, where: _Where) -> List[GoogleSheetRowStore[T]]:
+        low, high, high_inclusive = self._key_bounds(where)
+        with self._lock:
+            starts = sorted(self._partitions)
+
+        stores = []
+        for start in starts:
+            if low is not None and self._period_end(start).timestamp() <= low:
+                continue
+            if high is not None and (start.timestamp() > high or (start.timestamp() == high and not high_inclusive)):
+                continue
+            stores.append(self._partition_store(start))
+        return stores
+
+    def _key_bounds(self, where: _Where) -> Tuple[Optional[float], Optional[float], bool]:
+        """Returns the (low, high, whether high is inclusive) bounds of the partition key, None if unbounded."""
+        if where is None:
+            return None, None, True
+
+        condition, args = where
+        try:
+            node = _parse(condition, self._positions)
+        except _UnsupportedExpression:
+            return None, None, True
+
+        low: Optional[float] = None
+        high: Optional[float] = None
+        high_inclusive = True
+        for position, op, value in _indexable_predicates(node, args):
+            if position != self._positions[self._routing_key]:
+                continue
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+
+            if op in (">", ">=", "=") and (low is None or value > low):
+                low = value
+            if op in ("<", "<=", "=") and (high is None or value < high or (value == high and op == "<")):
+                high = value
+                high_inclusive = op != "<"
+
+        return low, high, high_inclusive
+
+    def _partition_store(self, start: datetime, create: bool = False) -> GoogleSheetRowStore[T]:
+        with self._lock:
+            name = self._partitions.get(start)
+            if name is None:
+                if not create:
+                    raise KeyError(start)
+                name = self._partition_name(start)
+
+            store = self._stores.get(name)
+            if store is None:
+                # Creates the partition sheet if it doesn't exist yet.
+                store = GoogleSheetRowStore(self._auth_client, self._spreadsheet_id, name, self._object_cls)
+                self._stores[name] = store
+                self._partitions[start] = name
+
+            return store
+
+    def _partition_name(self, start: datetime) -> str:
+        if self._partition_period == self.DAILY_PARTITION:
+            return f"{self._table_name}_{start.year:04d}_{start.month:02d}_{start.day:02d}"
+        return f"{self._table_name}_{start.year:04d}_{start.month:02d}"
+
+    def _period_start(self, timestamp: Any) -> datetime:
+        moment = datetime.fromtimestamp(timestamp, timezone.utc)
+        if self._partition_period == self.DAILY_PARTITION:
+            return datetime(moment.year, moment.month, moment.day, tzinfo=timezone.utc)
+        return datetime(moment.year, moment.month, 1, tzinfo=timezone.utc)
+
+    def _period_end(self, start: datetime) -> datetime:
+        if self._partition_period == self.DAILY_PARTITION:
+            return start + timedelta(days=1)
+        if start.month == 12:
+            return start.replace(year=start.year + 1, month=1)
+        return start.replace(month=start.month + 1)
@@ -1,15 +1,21 @@
-from typing import Any, Dict, List, Optional, Tuple, Type
+import copy
+import functools
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Type
 
 from pyfreedb.providers.google.sheet.base import _A1CellSelector
 
 from .base import InvalidQuery, Ordering
+from .expr import _ident_name, _tokenize
 from .models import Model
 
 
 class _ColumnReplacer:
+    _MAX_CACHE_SIZE = 1024
+
     def __init__(self, rid_column_name: str, model: Type[Model]):
         self._rid_column_name = rid_column_name
         self._replace_map = self._get_col_name_mapping(model)
+        self._cache: Dict[str, str] = {}
 
     def _get_col_name_mapping(self, model: Type[Model]) -> Dict[str, str]:
         result = {self._rid_column_name: "A"}
@@ -18,10 +24,77 @@ class _ColumnReplacer:
         return result
 
     def replace(self, value: str) -> str:
-        for repl_from, repl_to in self._replace_map.items():
-            value = value.replace(repl_from, repl_to)
+        """Replace the field names inside the given value with their column.
+
+        The value is tokenized so that only whole identifiers are replaced in a single pass and string literals are
+        left untouched.
+        """
+        result = self._cache.get(value)
+        if result is not None:
+            return result
+
+        parts = []
+        pos = 0
+        for token in _tokenize(value):
+            if token.kind == "ident" and _ident_name(token) in self._replace_map:
+                parts.append(value[pos : token.start])
+                parts.append(self._replace_map[_ident_name(token)])
+                pos = token.end
+        parts.append(value[pos:])
+        result = "".join(parts)
+
+        if len(self._cache) >= self._MAX_CACHE_SIZE:
+            self._cache.clear()
+        self._cache[value] = result
+        return result
+
+
+@functools.lru_cache(maxsize=1024)
+def _split_placeholders(value: str) -> Tuple[str, ...]:
+    # Unlike str.split, "?" inside string literals is not a placeholder.
+    segments = []
+    pos = 0
+    for token in _tokenize(value):
+        if token.kind == "placeholder":
+            segments.append(value[pos : token.start])
+            pos = token.end
+    segments.append(value[pos:])
+    return tuple(segments)
+
+
+class _QueryTemplate:
+    """A compiled query whose placeholders are filled in by `bind`."""
+
+    def __init__(self, segments: Sequence[str]) -> None:
+        # There is one more segment than the number of placeholders.
+        self._segments = segments
+
+    def bind(self, args: Sequence[Any]) -> str:
+        if len(args) != len(self._segments) - 1:
+            raise InvalidQuery("number of placeholder and argument is not equal")
+
+        parts = [self._segments[0]]
+        for arg, segment in zip(args, self._segments[1:]):
+            parts.append(_convert_arg(arg))
+            parts.append(segment)
+
+        return "".join(parts)
+
+
+def _convert_arg(arg: Any) -> str:
+    # GViz doesn't support escaping inside string literals, but a literal can be quoted by either double or single
+    # quotes.
+    if isinstance(arg, str):
+        if '"' not in arg:
+            return '"{}"'.format(arg)
+        if "'" not in arg:
+            return "'{}'".format(arg)
+        raise InvalidQuery("string argument can't contain both single and double quotes")
 
-        return value
+    if isinstance(arg, bool):
+        return "true" if arg else "false"
+
+    return str(arg)
 
 
 class _GoogleSheetQueryBuilder:
@@ -31,41 +104,111 @@ class _GoogleSheetQueryBuilder:
         self._limit: int = 0
         self._offset: int = 0
         self._replacer = replacer
+        self._group_by: List[str] = []
+        self._pivot: List[str] = []
+        self._labels: List[Tuple[str, str]] = []
+        self._template: Optional[Tuple[Tuple[str, ...], _QueryTemplate]] = None
 
     def where(self, condition: str, *args: Any) -> "_GoogleSheetQueryBuilder":
         self._validate_where(condition, args)
         self._where = (condition, args)
+        self._template = None
         return self
 
     def _validate_where(self, cond: str, args: Any) -> None:
-        if cond.count("?") != len(args):
+        # The arguments of a condition without any arguments can be bound later (e.g. by prepared statements), so
+        # we can only validate the number of arguments once they are given.
+        if args and len(_split_placeholders(cond)) - 1 != len(args):
+            raise InvalidQuery("number of placeholder and argument is not equal")
+
+    def _bound_where(self) -> Optional[Tuple[str, Tuple[Any, ...]]]:
+        """Returns the WHERE condition and its arguments, checking that all of its placeholders are bound.
+
+        Everything that evaluates the condition without building the GViz query (e.g. the replica) must go through this.
+        """
+        if self._where is not None and self._placeholder_count() != len(self._where[1]):
             raise InvalidQuery("number of placeholder and argument is not equal")
 
-    def _build_where(self) -> str:
+        return self._where
+
+    def _placeholder_count(self) -> int:
+        if self._where is None:
+            return 0
+        return len(_split_placeholders(self._where[0])) - 1
+
+    def _with_args(self, args: Tuple[Any, ...]) -> "_GoogleSheetQueryBuilder":
+        """Returns a copy of the builder with the given arguments bound to the WHERE condition placeholders.
+
+        The copy shares the compiled query template, so building it only costs the arguments binding.
+        """
+        if not self._where:
+            if args:
+                raise InvalidQuery("number of placeholder and argument is not equal")
+            return self
+
+        obj = copy.copy(self)
+        obj._where = (self._where[0], tuple(args))
+        return obj
+
+    def _with_in(self, column: str, values: Sequence[Any]) -> "_GoogleSheetQueryBuilder":
+        """Returns a copy of the builder that only matches the rows whose `column` equals to one of `values`."""
+        condition, args = self._where or ("", ())
+        in_condition = "(" + " OR ".join([f"{column} = ?"] * len(values)) + ")"
+
+        obj = copy.copy(self)
+        obj.where(f"({condition}) AND {in_condition}" if condition else in_condition, *args, *values)
+        return obj
+
+    def _build_where(self) -> List[str]:
         where = self._where
         if not where:
+            return []
+
+        segments = list(_split_placeholders(self._replacer.replace(where[0])))
+        segments[0] = "WHERE " + segments[0]
+        return segments
+
+    def group_by(self, *columns: str) -> "_GoogleSheetQueryBuilder":
+        self._group_by.extend(columns)
+        self._template = None
+        return self
+
+    def _build_group_by(self) -> str:
+        if not self._group_by:
             return ""
 
-        stmt, args = where
-        stmt = self._replacer.replace(stmt)
-        query = "WHERE " + stmt
+        return "GROUP BY " + ",".join(map(self._replacer.replace, self._group_by))
 
-        query_parts = query.split("?")
-        parts = query_parts + list(args)
-        parts[::2] = query_parts
-        parts[1::2] = map(self._convert_arg, list(args))
-        return "".join(map(str, parts))
+    def pivot(self, *columns: str) -> "_GoogleSheetQueryBuilder":
+        self._pivot.extend(columns)
+        self._template = None
+        return self
 
-    def _convert_arg(self, arg: Any) -> Any:
-        if isinstance(arg, str):
-            return '"{}"'.format(arg)
+    def _build_pivot(self) -> str:
+        if not self._pivot:
+            return ""
 
-        return arg
+        return "PIVOT " + ",".join(map(self._replacer.replace, self._pivot))
+
+    def label(self, column: str, label: str) -> "_GoogleSheetQueryBuilder":
+        if "'" in label:
+            raise InvalidQuery("label can't contain single quote")
+
+        self._labels.append((column, label))
+        self._template = None
+        return self
+
+    def _build_label(self) -> str:
+        if not self._labels:
+            return ""
+
+        return "LABEL " + ", ".join(f"{self._replacer.replace(column)} '{label}'" for column, label in self._labels)
 
     def order_by(self, *args: Ordering) -> "_GoogleSheetQueryBuilder":
         for order in args:
             self._orderings.append(order)
 
+        self._template = None
         return self
 
     def _build_order_by(self) -> str:
@@ -81,6 +224,7 @@ class _GoogleSheetQueryBuilder:
     def limit(self, limit: int) -> "_GoogleSheetQueryBuilder":
         self._validate_limit(limit)
         self._limit = limit
+        self._template = None
         return self
 
     def _validate_limit(self, limit: int) -> None:
@@ -96,6 +240,7 @@ class _GoogleSheetQueryBuilder:
     def offset(self, offset: int) -> "_GoogleSheetQueryBuilder":
         self._validate_offset(offset)
         self._offset = offset
+        self._template = None
         return self
 
     def _validate_offset(self, offset: int) -> None:
@@ -109,11 +254,36 @@ class _GoogleSheetQueryBuilder:
         return "OFFSET {}".format(self._offset)
 
     def build_select(self, columns: List[str]) -> str:
-        parts = ["SELECT " + ",".join(map(self._replacer.replace, columns))]
-        parts.append(self._build_where())
-        parts.append(self._build_order_by())
-        parts.append(self._build_limit())
-        parts.append(self._build_offset())
-
-        parts = [part for part in parts if part]
-        return " ".join(parts)
+        args = self._where[1] if self._where else ()
+        return self.build_select_template(columns).bind(args)
+
+    def build_select_template(self, columns: List[str]) -> _QueryTemplate:
+        key = tuple(columns)
+        if self._template is not None and self._template[0] == key:
+            return self._template[1]
+
+        # The WHERE clause is the only part that contains placeholders, so the parts before it are merged into its
+        # first segment and the parts after it are merged into its last segment.
+        select = "SELECT " + ",".join(map(self._replacer.replace, columns))
+        clauses = [
+            self._build_group_by(),
+            self._build_pivot(),
+            self._build_order_by(),
+            self._build_limit(),
+            self._build_offset(),
+            self._build_label(),
+        ]
+        suffix = " ".join(part for part in clauses if part)
+
+        segments = self._build_where()
+        if segments:
+            segments[0] = select + " " + segments[0]
+        else:
+            segments = [select]
+
+        if suffix:
+            segments[-1] = segments[-1] + " " + suffix
+
+        template = _QueryTemplate(segments)
+        self._template = (key, template)
+        return template
@@ -0,0 +1,234 @@
+import bisect
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from pyfreedb.providers.google.sheet.base import _A1CellSelector, _A1Range
+from pyfreedb.providers.google.sheet.wrapper import _GoogleSheetWrapper
+
+from .expr import _compile, _indexable_predicates, _kind, _Node, _parse, _UnsupportedExpression
+from .query_builder import _GoogleSheetQueryBuilder
+
+_HASH_INDEX = 0
+_SORTED_INDEX = 1
+
+
+class _HashIndex:
+    def __init__(self, rows: List[Tuple[Any, ...]], position: int) -> None:
+        self._entries: Dict[Tuple[str, Any], List[int]] = {}
+        for row_idx, row in enumerate(rows):
+            value = row[position]
+            if value is not None:
+                self._entries.setdefault((_kind(value), value), []).append(row_idx)
+
+    def lookup(self, op: str, value: Any) -> Optional[List[int]]:
+        if op != "=":
+            return None
+
+        return self._entries.get((_kind(value), value), [])
+
+
+class _SortedIndex:
+    def __init__(self, rows: List[Tuple[Any, ...]], position: int) -> None:
+        # Values of different types never compare equal in GViz, so we keep one sorted list per value type.
+        entries: Dict[str, List[Tuple[Any, int]]] = {}
+        for row_idx, row in enumerate(rows):
+            value = row[position]
+            if value is not None:
+                entries.setdefault(_kind(value), []).append((value, row_idx))
+
+        self._keys: Dict[str, List[Any]] = {}
+        self._row_indices: Dict[str, List[int]] = {}
+        for kind, pairs in entries.items():
+            pairs.sort(key=lambda pair: pair[0])
+            self._keys[kind] = [pair[0] for pair in pairs]
+            self._row_indices[kind] = [pair[1] for pair in pairs]
+
+    def lookup(self, op: str, value: Any) -> Optional[List[int]]:
+        kind = _kind(value)
+        keys, row_indices = self._keys.get(kind, []), self._row_indices.get(kind, [])
+
+        if op == "=":
+            lo, hi = bisect.bisect_left(keys, value), bisect.bisect_right(keys, value)
+        elif op == "<":
+            lo, hi = 0, bisect.bisect_left(keys, value)
+        elif op == "<=":
+            lo, hi = 0, bisect.bisect_right(keys, value)
+        elif op == ">":
+            lo, hi = bisect.bisect_right(keys, value), len(keys)
+        elif op == ">=":
+            lo, hi = bisect.bisect_left(keys, value), len(keys)
+        else:
+            return None
+
+        # Keep the sheet ordering, it's the ordering GViz returns when there is no ORDER BY.
+        return sorted(row_indices[lo:hi])
+
+
+@dataclass
+class _ReplicaSnapshot:
+    rows: List[Tuple[Any, ...]]
+    loaded_at: float
+    indexes: Dict[int, Any] = field(default_factory=dict)
+
+
+class _RowReplica:
+    """In-memory mirror of a row sheet that evaluates the queries locally.
+
+    The mirror is loaded with a single range read and reloaded once it's older than `refresh_interval` seconds or
+    once `invalidate` is called.
+    """
+
+    def __init__(
+        self,
+        wrapper: _GoogleSheetWrapper,
+        spreadsheet_id: str,
+        sheet_name: str,
+        columns: List[str],
+        first_row: int,
+        refresh_interval: float,
+        indexes: Dict[str, int],
+    ) -> None:
+        self._wrapper = wrapper
+        self._spreadsheet_id = spreadsheet_id
+        self._sheet_name = sheet_name
+        self._positions = {column: idx for idx, column in enumerate(columns)}
+        self._first_row = first_row
+        self._refresh_interval = refresh_interval
+        self._indexes = {self._positions[column]: typ for column, typ in indexes.items()}
+
+        self._snapshot: Optional[_ReplicaSnapshot] = None
+        self._lock = threading.Lock()
+
+    def invalidate(self) -> None:
+        self._snapshot = None
+
+    def refresh(self) -> None:
+        with self._lock:
+            self._snapshot = self._load()
+
+    def select(self, query: _GoogleSheetQueryBuilder, columns: Sequence[str]) -> List[List[Any]]:
+        # Resolve the columns first so that unsupported queries fail before we filter anything.
+        for column in list(columns) + [o._field_name for o in query._orderings]:
+            self._position(column)
+
+        node, args = self._parse_where(query)
+        rows = self._filter(self._get_snapshot(), node, args)
+        return _order_and_project(rows, query, self._positions, columns)
+
+    def count(self, query: _GoogleSheetQueryBuilder) -> int:
+        node, args = self._parse_where(query)
+        return len(self._filter(self._get_snapshot(), node, args))
+
+    def _position(self, column: str) -> int:
+        if column not in self._positions:
+            raise _UnsupportedExpression("unknown column {}".format(column))
+
+        return self._positions[column]
+
+    def _parse_where(self, query: _GoogleSheetQueryBuilder) -> Tuple[Optional[_Node], Tuple[Any, ...]]:
+        where = query._bound_where()
+        if not where:
+            return None, ()
+
+        condition, args = where
+        return _parse(condition, self._positions), args
+
+    def _filter(
+        self, snapshot: _ReplicaSnapshot, node: Optional[_Node], args: Tuple[Any, ...]
+    ) -> List[Tuple[Any, ...]]:
+        if node is None:
+            return list(snapshot.rows)
+
+        candidates = self._index_lookup(snapshot, node, args)
+        rows = snapshot.rows if candidates is None else [snapshot.rows[idx] for idx in candidates]
+
+        predicate = _compile(node, args)
+        return [row for row in rows if predicate(row)]
+
+    def _index_lookup(self, snapshot: _ReplicaSnapshot, node: _Node, args: Tuple[Any, ...]) -> Optional[List[int]]:
+        best: Optional[List[int]] = None
+        for position, op, value in _indexable_predicates(node, args):
+            index = snapshot.indexes.get(position)
+            if index is None or value is None:
+                continue
+
+            candidates = index.lookup(op, value)
+            if candidates is not None and (best is None or len(candidates) < len(best)):
+                best = candidates
+
+        return best
+
+    def _get_snapshot(self) -> _ReplicaSnapshot:
+        snapshot = self._snapshot
+        if snapshot is not None and not self._is_stale(snapshot):
+            return snapshot
+
+        with self._lock:
+            # Another thread might have reloaded the snapshot while we were waiting for the lock.
+            snapshot = self._snapshot
+            if snapshot is None or self._is_stale(snapshot):
+                snapshot = self._load()
+                self._snapshot = snapshot
+
+            return snapshot
+
+    def _is_stale(self, snapshot: _ReplicaSnapshot) -> bool:
+        return time.monotonic() - snapshot.loaded_at >= self._refresh_interval
+
+    def _load(self) -> _ReplicaSnapshot:
+        width = len(self._positions)
+        a1_range = _A1Range(
+            self._sheet_name,
+            _A1CellSelector.from_rc(1, self._first_row),
+            _A1CellSelector.from_rc(column=width),
+        )
+        values = self._wrapper.get_rows(self._spreadsheet_id, a1_range)
+
+        rows = []
+        for raw in values:
+            row = _to_row(raw, width)
+
+            # Rows that are cleared by deletes don't have _rid.
+            if row[0] is None:
+                continue
+
+            rows.append(row)
+
+        snapshot = _ReplicaSnapshot(rows=rows, loaded_at=time.monotonic())
+        for position, typ in self._indexes.items():
+            index_cls = _HashIndex if typ == _HASH_INDEX else _SortedIndex
+            snapshot.indexes[position] = index_cls(rows, position)
+
+        return snapshot
+
+
+def _to_row(raw: List[Any], width: int) -> Tuple[Any, ...]:
+    """Convert the row returned by the values API into the row that GViz would have returned."""
+    # The API omits the trailing empty cells and returns empty cells as "", GViz returns them as NULL.
+    return tuple([None if value == "" else value for value in raw] + [None] * (width - len(raw)))
+
+
+def _order_and_project(
+    rows: List[Tuple[Any, ...]], query: _GoogleSheetQueryBuilder, positions: Dict[str, int], columns: Sequence[str]
+) -> List[List[Any]]:
+    """Apply the ORDER BY, OFFSET and LIMIT of the query to the filtered rows, then select the given columns."""
+    for ordering in reversed(query._orderings):
+        position = positions[ordering._field_name]
+        rows.sort(key=lambda row: _sort_key(row[position]), reverse=ordering._value == "DESC")
+
+    rows = rows[query._offset :]
+    if query._limit:
+        rows = rows[: query._limit]
+
+    column_positions = [positions[column] for column in columns]
+    return [[row[position] for position in column_positions] for row in rows]
+
+
+def _sort_key(value: Any) -> Tuple[Any, ...]:
+    # NULL comes first in ascending order, values of different types are grouped by their type.
+    if value is None:
+        return (0,)
+
+    return (1, _kind(value), value)
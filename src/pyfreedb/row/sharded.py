@@ -0,0 +1,98 @@
+import zlib
+from typing import Any, Dict, List, Optional, Sequence
+
+from pyfreedb.row.expr import _indexable_predicates, _parse, _UnsupportedExpression
+from pyfreedb.row.fanout import T, _FanOutStore, _Where
+from pyfreedb.row.gsheet import GoogleSheetRowStore
+from pyfreedb.row.models import NotSet
+
+
+class ShardedRowStore(_FanOutStore[T]):
+    """A row store that spreads the rows of a table across multiple `GoogleSheetRowStore` by a shard key.
+
+    Each row is written into the shard picked by the hash of its shard key field. Statements whose WHERE condition
+    requires the shard key to be equal to a value only touch the shard that holds the value, the other statements
+    are executed on all shards concurrently and their results are merged.
+
+    >>> shards = [GoogleSheetRowStore(auth_client, spreadsheet_id, f"person_{i}", Person) for i in range(4)]
+    >>> store = ShardedRowStore(shards, shard_key="name")
+    >>> store.select().where("name = ?", "cat").execute()  # Only queries one of the shards.
+    [Person(name="cat", age=10)]
+    """
+
+    def __init__(self, shards: Sequence[GoogleSheetRowStore[T]], shard_key: str, max_workers: int = 8):
+        """Initialise the sharded row store on top of the given shards.
+
+        The shards must use the same model, and their order must never change once rows are written, since it
+        decides which shard each row belongs to.
+
+        Args:
+            shards: The row stores that hold the rows of each shard.
+            shard_key: The field used to pick the shard of each row.
+            max_workers: Maximum number of shards that are queried at the same time.
+        """
+        if not shards:
+            raise ValueError("at least one shard is required.")
+
+        self._shards = list(shards)
+        self._object_cls = self._shards[0]._object_cls
+        for shard in self._shards:
+            if shard._object_cls is not self._object_cls:
+                raise TypeError("all shards must use the same model.")
+
+        if shard_key not in self._object_cls._fields:
+            raise ValueError(f"{shard_key} field is not recognised.")
+
+        self._routing_key = shard_key
+        self._max_workers = max_workers
+
+    def _insert(self, rows: List[T]) -> None:
+        rows_by_shard: Dict[int, List[T]] = {}
+        for row in rows:
+            rows_by_shard.setdefault(self._shard_index(getattr(row, self._routing_key)), []).append(row)
+
+        self._fan_out(lambda idx: self._shards[idx].insert(rows_by_shard[idx]).execute(), list(rows_by_shard))
+
+    def _route(self, where: _Where) -> List[GoogleSheetRowStore[T]]:
+        value = self._shard_key_value(where)
+        if value is None:
+            return self._shards
+
+        return [self._shards[self._shard_index(value)]]
+
+    def _shard_key_value(self, where: _Where) -> Optional[Any]:
+        if where is None:
+            return None
+
+        condition, args = where
+        positions = self._shards[0]._positions
+        try:
+            node = _parse(condition, positions)
+        except _UnsupportedExpression:
+            return None
+
+        for position, op, value in _indexable_predicates(node, args):
+            if position == positions[self._routing_key] and op == "=" and value is not None:
+                return value
+
+        return None
+
+    def _shard_index(self, value: Any) -> int:
+        if value is None or value is NotSet:
+            raise ValueError(f"{self._routing_key} field must be set.")
+
+        return _shard_hash(value) % len(self._shards)
+
+
+def _shard_hash(value: Any) -> int:
+    # The hash must be stable across processes, and GViz returns the numbers as float, so 1 and 1.0 must be the same.
+    if isinstance(value, bool):
+        data = "b" + str(value)
+    elif isinstance(value, (int, float)) and float(value).is_integer():
+        data = "n" + str(int(value))
+    elif isinstance(value, float):
+        data = "n" + repr(value)
+    else:
+        data = "s" + str(value)
+
+    return zlib.crc32(data.encode("utf-8"))
@@ -0,0 +1,220 @@
+import contextlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+from array import array
+from typing import Any, Callable, Dict, Generic, Iterable, Iterator, List, Optional, Sequence, Tuple, Type, TypeVar
+
+from pyfreedb.row.models import Model
+
+T = TypeVar("T", bound=Model)
+
+_MAGIC = b"PFDBSNP1"
+_HEADER_LENGTH = struct.Struct("<I")
+_ALIGNMENT = 8
+# The typecode of the values of each field type, strings are stored as the end offsets of each string in a UTF-8 blob.
+_TYPECODES: Dict[type, Any] = {int: "q", float: "d", bool: "b", str: "q"}
+_TYPE_NAMES = {int: "int", float: "float", bool: "bool", str: "str"}
+
+
+class RowSnapshot(Generic[T]):
+    """A read only copy of rows in a local columnar file, written by `SelectStmt.execute_snapshot`.
+
+    The file is memory mapped, so all processes that open the same snapshot share a single copy of it through the page
+    cache and the rows are only decoded when they are accessed. A single process can refresh the snapshot by executing
+    the select again, the new file atomically replaces the old one and `reload_if_changed` switches to it.
+
+    >>> store.select().execute_snapshot("/var/run/myapp/person.snapshot")  # In the refresher process.
+    >>> snapshot = RowSnapshot("/var/run/myapp/person.snapshot", Person)  # In each worker process.
+    >>> snapshot[0]
+    Person(name="cat", age=10)
+    """
+
+    def __init__(self, path: str, object_cls: Type[T]) -> None:
+        """Open the snapshot file at `path`.
+
+        Args:
+            path: The path of the snapshot file.
+            object_cls: The row model definition, its fields must match the snapshot columns.
+        """
+        self._path = path
+        self._object_cls = object_cls
+        self._state = _open_snapshot(path, object_cls)
+
+    def __len__(self) -> int:
+        return self._state.rows
+
+    def __getitem__(self, idx: int) -> T:
+        state = self._state
+        if idx < 0:
+            idx += state.rows
+        if not 0 <= idx < state.rows:
+            raise IndexError("snapshot index out of range")
+
+        return state.row(idx)
+
+    def __iter__(self) -> Iterator[T]:
+        state = self._state
+        for idx in range(state.rows):
+            yield state.row(idx)
+
+    def reload_if_changed(self) -> bool:
+        """Switch to the latest snapshot if the file has been replaced since it was opened.
+
+        It only costs a `stat` call when the file hasn't changed, so it can be called before serving each request.
+        The rows already returned are plain model objects and stay valid.
+
+        Returns:
+            bool: Whether a new snapshot has been loaded.
+        """
+        stat = os.stat(self._path)
+        if (stat.st_ino, stat.st_mtime_ns) == self._state.identity:
+            return False
+
+        # The previous mapping is released once the readers on other threads are done with it.
+        self._state = _open_snapshot(self._path, self._object_cls)
+        return True
+
+
+class _SnapshotState(Generic[T]):
+    def __init__(
+        self,
+        identity: Tuple[int, int],
+        rows: int,
+        rids: "memoryview",
+        columns: List[Tuple[str, type, memoryview, memoryview, Optional[memoryview]]],
+        decode: Callable[[Sequence[Any]], T],
+    ) -> None:
+        self.identity = identity
+        self.rows = rows
+        self._rids = rids
+        # (name, type, validity, values, UTF-8 blob of the string columns)
+        self._columns = columns
+        self._decode = decode
+
+    def row(self, idx: int) -> T:
+        values: List[Any] = [self._rids[idx]]
+        for _, typ, validity, column, blob in self._columns:
+            if not validity[idx]:
+                values.append(None)
+            elif blob is not None:
+                start = column[idx - 1] if idx else 0
+                values.append(str(blob[start : column[idx]], "utf-8"))
+            elif typ is bool:
+                values.append(bool(column[idx]))
+            else:
+                values.append(column[idx])
+
+        return self._decode(values)
+
+
+def _write_snapshot(path: str, columns: List[Tuple[str, type]], rows: Iterable[Sequence[Any]]) -> int:
+    """Write the rows (the `_rid` followed by the values of the given columns) into a snapshot file at `path`.
+
+    The file is written next to `path` first and then renamed, so the readers never see a partially written snapshot.
+    Returns the number of written rows.
+    """
+    rids = array("q")
+    validity = [bytearray() for _ in columns]
+    values = [array(_TYPECODES[typ]) for _, typ in columns]
+    blobs = [bytearray() if typ is str else None for _, typ in columns]
+
+    for row in rows:
+        rids.append(int(row[0]))
+        for idx, (_, typ) in enumerate(columns):
+            value = row[idx + 1]
+            validity[idx].append(value is not None)
+
+            blob = blobs[idx]
+            if blob is not None:
+                blob.extend(b"" if value is None else str(value).encode("utf-8"))
+                values[idx].append(len(blob))
+            elif value is None:
+                values[idx].append(0)
+            else:
+                values[idx].append(typ(value))
+
+    buffers: List[bytes] = [rids.tobytes()]
+    header_columns = []
+    for (name, typ), column_validity, column, blob in zip(columns, validity, values, blobs):
+        header_columns.append({"name": name, "type": _TYPE_NAMES[typ]})
+        buffers.extend([bytes(column_validity), column.tobytes(), bytes(blob or b"")])
+
+    # The buffer offsets are relative to the end of the header, which is padded so that the buffers are aligned.
+    offsets = []
+    offset = 0
+    for buf in buffers:
+        offsets.append((offset, len(buf)))
+        offset += _aligned(len(buf))
+
+    header = json.dumps({"rows": len(rids), "columns": header_columns, "buffers": offsets}).encode("utf-8")
+    prefix = len(_MAGIC) + _HEADER_LENGTH.size
+    header += b" " * (_aligned(prefix + len(header)) - prefix - len(header))
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".pyfreedb-snapshot-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(_MAGIC + _HEADER_LENGTH.pack(len(header)) + header)
+            for buf in buffers:
+                f.write(buf)
+                f.write(b"\0" * (_aligned(len(buf)) - len(buf)))
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(tmp_path)
+        raise
+
+    return len(rids)
+
+
+def _open_snapshot(path: str, object_cls: Type[T]) -> _SnapshotState[T]:
+    with open(path, "rb") as f:
+        stat = os.fstat(f.fileno())
+        # Empty files can't be mapped, but a snapshot always has a header.
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if stat.st_size else b""
+
+    view = memoryview(data)
+    prefix = len(_MAGIC) + _HEADER_LENGTH.size
+    if bytes(view[: len(_MAGIC)]) != _MAGIC or len(view) < prefix:
+        raise ValueError(f"{path} is not a snapshot file.")
+
+    (header_length,) = _HEADER_LENGTH.unpack(view[len(_MAGIC) : prefix])
+    header = json.loads(bytes(view[prefix : prefix + header_length]))
+    base = prefix + header_length
+
+    buffers = [view[base + offset : base + offset + length] for offset, length in header["buffers"]]
+    rids = buffers[0].cast("q")
+
+    fields = object_cls._fields
+    columns: List[Tuple[str, type, memoryview, memoryview, Optional[memoryview]]] = []
+    for idx, column in enumerate(header["columns"]):
+        name = column["name"]
+        field = fields.get(name)
+        if field is None or _TYPE_NAMES[field._typ] != column["type"]:
+            raise ValueError(f"{name} column of the snapshot doesn't match the {object_cls.__name__} fields.")
+
+        validity, values, blob = buffers[1 + 3 * idx : 4 + 3 * idx]
+        columns.append(
+            (
+                name,
+                field._typ,
+                validity,
+                values.cast(_TYPECODES[field._typ]),
+                blob if field._typ is str else None,
+            )
+        )
+
+    decode = object_cls._row_decoder(tuple(column["name"] for column in header["columns"]), with_rid=True)
+    return _SnapshotState((stat.st_ino, stat.st_mtime_ns), header["rows"], rids, columns, decode)
+
+
+def _aligned(length: int) -> int:
+    return (length + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+
+__pdoc__ = {
+    "RowSnapshot": RowSnapshot.__init__.__doc__,
+}
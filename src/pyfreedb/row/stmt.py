@@ -1,13 +1,32 @@
-from typing import TYPE_CHECKING, Any, Dict, Generic, List, TypeVar
-
+from concurrent.futures import Executor, Future
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Generic,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+    Union,
+)
+
+from pyfreedb.futures import _submit
 from pyfreedb.providers.google.sheet.base import _A1CellSelector, _A1Range, _BatchUpdateRowsRequest
-from pyfreedb.row.base import Ordering
-from pyfreedb.row.models import Model
+from pyfreedb.row.base import Aggregate, Ordering
+from pyfreedb.row.columnar import ColumnarResult, _build_columns
+from pyfreedb.row.models import Model, NotSet
+from pyfreedb.row.query_builder import _GoogleSheetQueryBuilder
+from pyfreedb.row.snapshot import _write_snapshot
 
 if TYPE_CHECKING:
     from pyfreedb.row.gsheet import GoogleSheetRowStore
 
 T = TypeVar("T", bound=Model)
+R = TypeVar("R")
 
 
 class CountStmt(Generic[T]):
@@ -19,6 +38,7 @@ class CountStmt(Generic[T]):
 
         self._store = store
         self._query = store._new_query_builder()
+        self._in: Optional[Tuple[str, List[Any]]] = None
 
     def where(self, condition: str, *args: Any) -> "CountStmt[T]":
         """Filter the rows that we're going to count.
@@ -43,20 +63,204 @@ class CountStmt(Generic[T]):
         self._query.where(f"{self._store._WHERE_DEFAULT_CLAUSE} AND {condition}", *args)
         return self
 
+    def where_in(self, field_name: str, values: Sequence[Any]) -> "CountStmt[T]":
+        """Only count the rows whose `field_name` equals to one of the given `values`.
+
+        The filter is combined with the `where` condition. Long lists are split into multiple queries that are
+        executed concurrently, see `SelectStmt.where_in`.
+
+        Args:
+            field_name: The field that we want to match.
+            values: The values that we want to match.
+
+        Returns:
+            CountStmt: The count statement with the filter applied.
+        """
+        self._in = self._store._validate_in(field_name, values)
+        return self
+
     def execute(self) -> int:
         """Execute the count statement.
 
         Returns:
             int: Number of rows that matched with the given condition.
         """
-        query = self._query.build_select([f"COUNT({self._store._RID_COLUMN_NAME})"])
-        rows = self._store._wrapper.query(self._store._spreadsheet_id, self._store._sheet_name, query)
+        return self._execute(self._query)
+
+    def execute_async(self, executor: Optional[Executor] = None) -> "Future[int]":
+        """Execute the count statement on a background thread, see `execute`.
+
+        Args:
+            executor: The executor that runs the statement, the thread pool shared by all stores is used by default
+                      (see `pyfreedb.futures`).
+
+        Returns:
+            concurrent.futures.Future: The future of the number of matched rows.
+        """
+        return _submit(self.execute, executor)
+
+    def _execute(self, query: _GoogleSheetQueryBuilder) -> int:
+        if self._in is not None:
+            return self._store._count_rows_in(query, *self._in)
+
+        return self._store._count_rows(query)
 
-        # If the spreadsheet is empty, GViz will return empty rows instead.
-        if len(rows) == 0:
-            return 0
+    def _prepare(self) -> None:
+        self._query.build_select_template(self._store._COUNT_COLUMNS)
 
-        return int(rows[0][0])
+
+class AggregateStmt(Generic[T]):
+    def __init__(self, store: "GoogleSheetRowStore[T]", aggregates: List[Aggregate]):
+        """Initialise statement for aggregating rows.
+
+        Client should not instantiate this class directly, instead use `store.aggregate(...)` to instantiate it.
+        """
+        self._store = store
+        self._aggregates = aggregates
+        self._group_by: List[str] = []
+        self._pivot: List[str] = []
+        self._query = store._new_query_builder()
+
+        for aggregate in aggregates:
+            self._query.label(aggregate._expr(), aggregate._alias)
+
+    def where(self, condition: str, *args: Any) -> "AggregateStmt[T]":
+        """Filter the rows that we're going to aggregate.
+
+        The given `condition` will be used as the WHERE clause on the final query. You can use `"?"` placeholder
+        inside the condition and will be replaced with the actual value given in the `*args` variadic parameter
+        based on their appearance ordering.
+
+        Args:
+            condition: Conditions of the data that we're going to aggregate.
+            *args: List of arguments that will be used to fill in the placeholders in the given `condition`.
+
+        Returns:
+            AggregateStmt: The aggregate statement with the given WHERE condition applied.
+        """
+        self._query.where(f"{self._store._WHERE_DEFAULT_CLAUSE} AND {condition}", *args)
+        return self
+
+    def group_by(self, *field_names: str) -> "AggregateStmt[T]":
+        """Compute the aggregations for each distinct combination of the given columns.
+
+        Args:
+            *field_names: The columns that we want to group the rows by.
+
+        Returns:
+            AggregateStmt: The aggregate statement with the grouping applied.
+        """
+        self._ensure_fields(field_names)
+        self._group_by.extend(field_names)
+        self._query.group_by(*field_names)
+        return self
+
+    def pivot(self, *field_names: str) -> "AggregateStmt[T]":
+        """Compute the aggregations for each distinct value of the given columns as separate result columns.
+
+        The keys of the pivoted values in the result are the column labels returned by Google Sheets, which contain
+        the pivot values and the aggregate alias (e.g. `"ID sum_amount"`).
+
+        Args:
+            *field_names: The columns that we want to pivot on.
+
+        Returns:
+            AggregateStmt: The aggregate statement with the pivot applied.
+        """
+        self._ensure_fields(field_names)
+        self._pivot.extend(field_names)
+        self._query.pivot(*field_names)
+        return self
+
+    def order_by(self, *orderings: Ordering) -> "AggregateStmt[T]":
+        """Defines the ordering of the returned rows.
+
+        The field name of the orderings can either be one of the grouped columns or one of the aggregate aliases.
+
+        Args:
+            *orderings: The ordering that we want to apply.
+
+        Returns:
+            AggregateStmt: The aggregate statement with the ordering applied.
+        """
+        exprs = {aggregate._alias: aggregate._expr() for aggregate in self._aggregates}
+        for ordering in orderings:
+            ordering = ordering._copy()
+            ordering._field_name = exprs.get(ordering._field_name, ordering._field_name)
+            self._query.order_by(ordering)
+
+        return self
+
+    def limit(self, limit: int) -> "AggregateStmt[T]":
+        """Defines the maximum number of rows that we're going to return.
+
+        Args:
+            limit: Limit that we want to apply.
+
+        Returns:
+            AggregateStmt: The aggregate statement with the limit applied.
+        """
+        self._query.limit(limit)
+        return self
+
+    def offset(self, offset: int) -> "AggregateStmt[T]":
+        """Defines the offset of the returned rows.
+
+        Args:
+            offset: Offset that we want to apply.
+
+        Returns:
+            AggregateStmt: The aggregate statement with the offset applied.
+        """
+        self._query.offset(offset)
+        return self
+
+    def execute(self) -> List[Dict[str, Any]]:
+        """Execute the aggregate statement.
+
+        Returns:
+            list: List of the aggregated rows, each of them is a map of the grouped column names and the aggregate
+                  aliases to their values.
+        """
+        columns = self._group_by + [aggregate._expr() for aggregate in self._aggregates]
+        labels, rows = self._store._query_table(self._query.build_select(columns))
+
+        keys = list(self._group_by)
+        converters: List[Callable[[Any], Any]] = [
+            self._store._object_cls._fields[name]._decode for name in self._group_by
+        ]
+        if self._pivot:
+            # Each pivoted column is labelled with the pivot values followed by the aggregate alias.
+            for label in labels[len(self._group_by) :]:
+                keys.append(label)
+                converters.append(self._pivot_converter(label))
+        else:
+            for aggregate in self._aggregates:
+                keys.append(aggregate._alias)
+                converters.append(self._aggregate_converter(aggregate))
+
+        return [{key: convert(value) for key, convert, value in zip(keys, converters, row)} for row in rows]
+
+    def _pivot_converter(self, label: str) -> Callable[[Any], Any]:
+        for aggregate in self._aggregates:
+            if label.endswith(aggregate._alias):
+                return self._aggregate_converter(aggregate)
+
+        return _identity
+
+    def _aggregate_converter(self, aggregate: Aggregate) -> Callable[[Any], Any]:
+        if aggregate._function == "COUNT":
+            return _to_int
+        if aggregate._function == "AVG":
+            return _to_float
+
+        # SUM, MIN and MAX have the same type as the aggregated column.
+        return self._store._object_cls._fields[aggregate._field_name]._decode
+
+    def _ensure_fields(self, field_names: Tuple[str, ...]) -> None:
+        for name in field_names:
+            if name not in self._store._object_cls._fields:
+                raise ValueError(f"{name} field is not recognised.")
 
 
 class SelectStmt(Generic[T]):
@@ -67,7 +271,10 @@ class SelectStmt(Generic[T]):
         """
         self._store = store
         self._selected_columns = selected_columns
+        # The _rid is always fetched so that the returned objects can be saved later on.
+        self._fetched_columns = [store._RID_COLUMN_NAME] + selected_columns
         self._query = store._new_query_builder()
+        self._in: Optional[Tuple[str, List[Any]]] = None
 
     def where(self, condition: str, *args: Any) -> "SelectStmt[T]":
         """Filter the rows that we're going to get.
@@ -92,6 +299,29 @@ class SelectStmt(Generic[T]):
         self._query.where(f"{self._store._WHERE_DEFAULT_CLAUSE} AND {condition}", *args)
         return self
 
+    def where_in(self, field_name: str, values: Sequence[Any]) -> "SelectStmt[T]":
+        """Only get the rows whose `field_name` equals to one of the given `values`.
+
+        The filter is combined with the `where` condition. The query length is limited, so long lists are split into
+        as few queries as possible, which are executed concurrently and merged according to the ordering, offset and
+        limit of the statement.
+
+        Args:
+            field_name: The field that we want to match.
+            values: The values that we want to match.
+
+        Returns:
+            SelectStmt: The select statement with the filter applied.
+
+        Examples:
+            To get the rows of the given names that are older than 10:
+
+            >> store.select().where("age > ?", 10).where_in("name", names).execute()
+            [Person(name="cat", age=11)]
+        """
+        self._in = self._store._validate_in(field_name, values)
+        return self
+
     def limit(self, limit: int) -> "SelectStmt[T]":
         """Defines the maximum number of rows that we're going to return.
 
@@ -134,18 +364,143 @@ class SelectStmt(Generic[T]):
         Returns:
             list: List of rows that matched the given condition.
         """
-        query = self._query.build_select(self._selected_columns)
-        rows = self._store._wrapper.query(self._store._spreadsheet_id, self._store._sheet_name, query)
+        return self._execute(self._query)
+
+    def execute_async(self, executor: Optional[Executor] = None) -> "Future[List[T]]":
+        """Execute the select statement on a background thread, see `execute`.
+
+        Args:
+            executor: The executor that runs the statement, the thread pool shared by all stores is used by default
+                      (see `pyfreedb.futures`).
+
+        Returns:
+            concurrent.futures.Future: The future of the matched rows.
+        """
+        return _submit(self.execute, executor)
 
-        results = []
-        for row in rows:
-            raw = {}
-            for idx, col in enumerate(self._selected_columns):
-                raw[col] = row[idx]
+    def _execute(self, query: _GoogleSheetQueryBuilder) -> List[T]:
+        if self._in is not None:
+            rows = self._store._select_rows_in(query, self._fetched_columns, *self._in)
+        else:
+            rows = self._store._select_rows(query, self._fetched_columns)
 
-            results.append(self._store._object_cls(**raw))
+        decode = self._store._object_cls._row_decoder(tuple(self._selected_columns), with_rid=True)
+        return [decode(row) for row in rows]
 
-        return results
+    def _prepare(self) -> None:
+        self._query.build_select_template(self._fetched_columns)
+
+    def execute_stream(self) -> Iterator[T]:
+        """Execute the select statement and yield the rows while they are being downloaded.
+
+        Unlike `execute`, the whole result is never held in memory at once, which makes it suitable to export large
+        sheets. The query result cache is not used.
+
+        Returns:
+            Iterator: Iterator of rows that matched the given condition.
+
+        Examples:
+            To write all rows into a file:
+
+            >> for row in store.select().execute_stream():
+            ..     f.write(repr(row))
+        """
+        decode = self._store._object_cls._row_decoder(tuple(self._selected_columns), with_rid=True)
+        for row in self._iter_rows(self._fetched_columns):
+            yield decode(row)
+
+    def execute_columnar(self) -> ColumnarResult:
+        """Execute the select statement and return the result column by column.
+
+        The columns are built straight from the downloaded rows without creating a model object per row, which is
+        much cheaper when the result is going to be analysed as columns anyway (e.g. with pandas).
+
+        Returns:
+            pyfreedb.row.columnar.ColumnarResult: Map of field name to the values of the rows that matched the given
+                                                  condition.
+
+        Examples:
+            To load the result into a pandas DataFrame:
+
+            >> df = store.select("name", "age").execute_columnar().to_pandas()
+        """
+        return _build_columns(self._typed_columns(), self._iter_rows(self._selected_columns))
+
+    def execute_snapshot(self, path: str) -> int:
+        """Execute the select statement and write the result into a snapshot file, see `pyfreedb.row.RowSnapshot`.
+
+        The snapshot replaces the file at `path` atomically once it's fully written, so the processes reading the
+        previous snapshot are never disturbed.
+
+        Args:
+            path: The path of the snapshot file.
+
+        Returns:
+            int: The number of rows in the snapshot.
+
+        Examples:
+            To refresh the snapshot that the worker processes read from:
+
+            >> store.select().execute_snapshot("/var/run/myapp/person.snapshot")
+            1000
+        """
+        return _write_snapshot(path, self._typed_columns(), self._iter_rows(self._fetched_columns))
+
+    def _typed_columns(self) -> List[Tuple[str, type]]:
+        fields = self._store._object_cls._fields
+        columns: List[Tuple[str, type]] = []
+        for col in self._selected_columns:
+            if col not in fields:
+                raise ValueError(f"{col} field is not recognised.")
+            columns.append((col, fields[col]._typ))
+
+        return columns
+
+    def _iter_rows(self, columns: List[str]) -> Iterator[List[Any]]:
+        if self._in is not None:
+            # The chunks have to be merged before we know the final ordering, so there's nothing to stream.
+            return iter(self._store._select_rows_in(self._query, columns, *self._in))
+
+        return self._store._iter_rows(self._query, columns)
+
+
+class PreparedStmt(Generic[R]):
+    def __init__(self, stmt: Union[SelectStmt[Any], CountStmt[Any]]):
+        """Initialise a prepared statement.
+
+        Client should not instantiate this class directly, instead use `store.prepare(...)` to instantiate it.
+        """
+        self._stmt = stmt
+        self._placeholder_count = stmt._query._placeholder_count()
+        stmt._prepare()
+
+    def execute(self, *args: Any) -> R:
+        """Execute the prepared statement with the given arguments.
+
+        The query is compiled once when the statement is prepared, each execution only fills in the `"?"`
+        placeholders of the WHERE condition with the given `*args`.
+
+        Args:
+            *args: List of arguments that will be used to fill in the placeholders in the WHERE condition.
+
+        Returns:
+            The same value as the `execute` method of the prepared statement.
+
+        Examples:
+            >> stmt = store.prepare(store.select().where("age > ? AND name = ?"))
+            >> stmt.execute(10, "cat")
+            [Person(name="cat", age=11)]
+
+        Raises:
+            ValueError: If the number of arguments doesn't match the number of placeholders.
+        """
+        if len(args) != self._placeholder_count:
+            raise ValueError(
+                f"the prepared statement has {self._placeholder_count} placeholders, but {len(args)} arguments are given."
+            )
+
+        result: R = self._stmt._execute(self._stmt._query._with_args(args))  # type: ignore [assignment]
+        return result
 
 
 class InsertStmt(Generic[T]):
@@ -160,38 +515,182 @@ class InsertStmt(Generic[T]):
     def execute(self) -> None:
         """Execute the insert statement.
 
-        After a successful insert, all of the `rid` field of the passed in `rows` will be updated.
+        After a successful insert, the passed in `rows` remember the row they are written to, so that they can be
+        passed to `store.save(...)` later on.
 
         Examples:
-            Insert a row.
+            Insert a row, change it and save the change.
 
             >> row = Row(name="cat")
             >> store.insert([row]).execute()
-            >> row.rid
-            2
+            >> row.name = "dog"
+            >> store.save([row])
+            1
         """
-        self._store._wrapper.overwrite_rows(
-            self._store._spreadsheet_id,
-            _A1Range.from_notation(self._store._sheet_name),
-            self._get_raw_values(),
-        )
+        raw_values = self._get_raw_values()
+        rids: List[int] = []
+        if self._store._insert_strategy == self._store.REUSE_CLEARED_ROWS_INSERT_STRATEGY:
+            rids = self._store._take_free_rows(len(raw_values))
+            raw_values = self._fill_free_rows(raw_values, rids)
+
+        if raw_values:
+            result = self._store._wrapper.overwrite_rows(
+                self._store._spreadsheet_id,
+                _A1Range.from_notation(self._store._sheet_name),
+                raw_values,
+            )
+            if result.updated_range.start is not None:
+                first_row = result.updated_range.start.row
+                rids.extend(range(first_row, first_row + len(raw_values)))
+
+        for row, rid in zip(self._rows, rids):
+            row._rid = rid
+            row._dirty = None
+
+        if self._store._indexes and rids:
+            # The rows are only known once they are written, so the indexes need a separate request.
+            index_values = {
+                rid: {name: getattr(row, name) for name in self._store._indexes} for row, rid in zip(self._rows, rids)
+            }
+            self._store._wrapper.batch_update_rows(
+                self._store._spreadsheet_id, self._store._index_requests(index_values)
+            )
+
+        self._store._notify_write()
+
+    def execute_async(self, executor: Optional[Executor] = None) -> "Future[None]":
+        """Execute the insert statement on a background thread, see `execute`.
+
+        Args:
+            executor: The executor that runs the statement, the thread pool shared by all stores is used by default
+                      (see `pyfreedb.futures`).
+
+        Returns:
+            concurrent.futures.Future: The future that is resolved once the rows are inserted.
+        """
+        return _submit(self.execute, executor)
 
-    def _get_raw_values(self) -> List[List[str]]:
+    def _fill_free_rows(self, raw_values: List[List[Any]], free_rows: List[int]) -> List[List[Any]]:
+        last_column = len(raw_values[0]) if raw_values else 1
+
+        requests = []
+        start = 0
+        for first_row, last_row in _group_consecutive(free_rows):
+            end = start + last_row - first_row + 1
+            update_range = _A1Range(
+                self._store._sheet_name,
+                _A1CellSelector.from_rc(1, first_row),
+                _A1CellSelector.from_rc(last_column, last_row),
+            )
+            requests.append(_BatchUpdateRowsRequest(update_range, raw_values[start:end]))
+            start = end
+
+        if requests:
+            self._store._wrapper.batch_update_rows(self._store._spreadsheet_id, requests)
+
+        # The remaining rows don't fit into the free rows and need to be appended.
+        return raw_values[start:]
+
+    def _get_raw_values(self) -> List[List[Any]]:
         raw_values = []
 
         for row in self._rows:
+            encode = row._row_encoder(_escape_val)
             # Set _rid value according to the insert protocol.
-            raw = ["=ROW()"]
+            raw_values.append(["=ROW()"] + encode(row) + self._store._tracking_values())
 
-            for field_name, field in row._fields.items():
-                field_is_formula = field._is_formula
-                raw_value = getattr(row, field_name)
-                value = raw_value if field_is_formula else _escape_val(raw_value)
-                raw.append(value)
+        return raw_values
 
-            raw_values.append(raw)
 
-        return raw_values
+class UpsertStmt(Generic[T]):
+    def __init__(self, store: "GoogleSheetRowStore[T]", rows: List[T], key: str):
+        """Initialise statement for upserting rows.
+
+        Client should not instantiate this class directly, instead use `store.upsert(...)` to instantiate it.
+        """
+        self._store = store
+        self._rows = rows
+        self._key = key
+
+    def execute(self) -> List[int]:
+        """Execute the upsert statement.
+
+        The existing rows are looked up right before they are written, but the statement is not atomic: rows with the
+        same new key that are upserted concurrently by other clients might be inserted twice.
+
+        Returns:
+            list: `GoogleSheetRowStore.UPSERT_UPDATED` or `GoogleSheetRowStore.UPSERT_INSERTED` for each of the rows,
+                  in the same order as the given rows.
+        """
+        existing_rids = self._find_existing_rids()
+
+        requests = []
+        new_rows = []
+        updated_rows = []
+        outcomes = []
+        for row in self._rows:
+            value = getattr(row, self._key)
+            rids = existing_rids.get((isinstance(value, bool), value))
+            if rids:
+                requests.extend(self._update_requests(row, rids))
+                outcomes.append(self._store.UPSERT_UPDATED)
+                updated_rows.append((row, rids[0]))
+            else:
+                new_rows.append(row)
+                outcomes.append(self._store.UPSERT_INSERTED)
+
+        if requests:
+            self._store._wrapper.batch_update_rows(self._store._spreadsheet_id, requests)
+            self._store._notify_write()
+
+        for row, rid in updated_rows:
+            row._rid = rid
+            row._dirty = None
+
+        if new_rows:
+            InsertStmt(self._store, new_rows).execute()
+
+        return outcomes
+
+    def _find_existing_rids(self) -> Dict[Tuple[bool, Any], List[int]]:
+        if not self._rows:
+            return {}
+
+        keys = [getattr(row, self._key) for row in self._rows]
+        rows = self._store._select_rows_in(
+            self._store._new_query_builder(),
+            [self._store._RID_COLUMN_NAME, self._key],
+            self._key,
+            keys,
+            fresh=True,
+        )
+
+        existing_rids: Dict[Tuple[bool, Any], List[int]] = {}
+        for rid, value in rows:
+            existing_rids.setdefault((isinstance(value, bool), value), []).append(int(rid))
+
+        return existing_rids
+
+    def _update_requests(self, row: T, rids: List[int]) -> List[_BatchUpdateRowsRequest]:
+        values = row._row_encoder(_escape_val)(row)
+
+        # Fields that are not set are left untouched, the rest are written in as few ranges as possible.
+        column_groups = _group_consecutive([idx for idx, value in enumerate(values) if value is not NotSet])
+
+        requests = []
+        for rid in rids:
+            for first, last in column_groups:
+                update_range = _A1Range(
+                    self._store._sheet_name,
+                    _A1CellSelector.from_rc(first + 2, rid),
+                    _A1CellSelector.from_rc(last + 2, rid),
+                )
+                requests.append(_BatchUpdateRowsRequest(update_range, [values[first : last + 1]]))
+
+        set_values = {name: getattr(row, name) for name in self._store._indexes if getattr(row, name) is not NotSet}
+        requests.extend(self._store._index_requests({rid: set_values for rid in rids}))
+        requests.extend(self._store._tracking_requests(rids))
+        return requests
 
 
 class UpdateStmt(Generic[T]):
@@ -233,15 +732,31 @@ class UpdateStmt(Generic[T]):
         Returns:
             int: The number of updated rows.
         """
-        query = self._query.build_select([self._store._RID_COLUMN_NAME])
-        affected_rows = self._store._wrapper.query(self._store._spreadsheet_id, self._store._sheet_name, query)
-        update_candidate_indices = [int(row[0]) for row in affected_rows]
+        return self._apply(self._store._find_rids(self._query))
+
+    def execute_async(self, executor: Optional[Executor] = None) -> "Future[int]":
+        """Execute the update statement on a background thread, see `execute`.
+
+        Args:
+            executor: The executor that runs the statement, the thread pool shared by all stores is used by default
+                      (see `pyfreedb.futures`).
+
+        Returns:
+            concurrent.futures.Future: The future of the number of updated rows.
+        """
+        return _submit(self.execute, executor)
 
-        self._update_rows(update_candidate_indices)
+    def _apply(self, indices: List[int]) -> int:
+        if indices:
+            self._update_rows(indices)
+            self._store._notify_write()
 
-        return len(update_candidate_indices)
+        return len(indices)
 
     def _update_rows(self, indices: List[int]) -> None:
+        self._store._wrapper.batch_update_rows(self._store._spreadsheet_id, self._update_requests(indices))
+
+    def _update_requests(self, indices: List[int]) -> List[_BatchUpdateRowsRequest]:
         requests = []
         for row_idx in indices:
             for col_idx, col in enumerate(self._store._object_cls._fields.keys()):
@@ -254,7 +769,9 @@ class UpdateStmt(Generic[T]):
                 update_range = _A1Range(self._store._sheet_name, cell_selector, cell_selector)
                 requests.append(_BatchUpdateRowsRequest(update_range, [[value]]))
 
-        self._store._wrapper.batch_update_rows(self._store._spreadsheet_id, requests)
+        requests.extend(self._store._index_requests({row_idx: self._update_values for row_idx in indices}))
+        requests.extend(self._store._tracking_requests(indices))
+        return requests
 
 
 class DeleteStmt(Generic[T]):
@@ -296,20 +813,72 @@ class DeleteStmt(Generic[T]):
         Returns:
             int: Number of rows deleted.
         """
-        query = self._query.build_select([self._store._RID_COLUMN_NAME])
-        affected_rows = self._store._wrapper.query(self._store._spreadsheet_id, self._store._sheet_name, query)
-        affected_row_indices = [int(row[0]) for row in affected_rows]
+        return self._apply(self._store._find_rids(self._query))
+
+    def execute_async(self, executor: Optional[Executor] = None) -> "Future[int]":
+        """Execute the delete statement on a background thread, see `execute`.
+
+        Args:
+            executor: The executor that runs the statement, the thread pool shared by all stores is used by default
+                      (see `pyfreedb.futures`).
+
+        Returns:
+            concurrent.futures.Future: The future of the number of deleted rows.
+        """
+        return _submit(self.execute, executor)
+
+    def _apply(self, indices: List[int]) -> int:
+        if indices:
+            self._delete_rows(indices)
+            self._store._release_rows(indices)
+            self._store._notify_write()
 
-        self._delete_rows(affected_row_indices)
-        return len(affected_row_indices)
+        return len(indices)
 
     def _delete_rows(self, indices: List[int]) -> None:
-        requests = []
+        self._store._wrapper.clear(self._store._spreadsheet_id, self._delete_ranges(indices))
+
+        tombstones = self._store._tracking_requests(indices, deleted=True)
+        if tombstones:
+            self._store._wrapper.batch_update_rows(self._store._spreadsheet_id, tombstones)
+
+    def _delete_ranges(self, indices: List[int]) -> List[_A1Range]:
+        ranges = []
         for row_idx in indices:
-            row_selector = _A1CellSelector.from_rc(row=row_idx)
-            requests.append(_A1Range(self._store._sheet_name, start=row_selector, end=row_selector))
+            if self._store._change_tracking:
+                # The change tracking columns are kept, they hold the tombstone of the row.
+                start = _A1CellSelector.from_rc(1, row_idx)
+                end = _A1CellSelector.from_rc(len(self._store._columns) + 1, row_idx)
+            else:
+                start = end = _A1CellSelector.from_rc(row=row_idx)
+            ranges.append(_A1Range(self._store._sheet_name, start=start, end=end))
+
+        ranges.extend(self._store._index_clear_ranges(indices))
+        return ranges
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+def _to_int(value: Any) -> Any:
+    return None if value is None else int(value)
+
+
+def _to_float(value: Any) -> Any:
+    return None if value is None else float(value)
+
+
+def _group_consecutive(indices: List[int]) -> List[Tuple[int, int]]:
+    # Group the sorted indices into (first, last) inclusive ranges so that adjacent rows can be written together.
+    groups: List[Tuple[int, int]] = []
+    for idx in indices:
+        if groups and groups[-1][1] + 1 == idx:
+            groups[-1] = (groups[-1][0], idx)
+        else:
+            groups.append((idx, idx))
 
-        self._store._wrapper.clear(self._store._spreadsheet_id, requests)
+    return groups
 
 
 def _escape_val(val: Any) -> Any:
@@ -326,7 +895,10 @@ def _escape_val(val: Any) -> Any:
 __pdoc__ = {
     "CountStmt": CountStmt.__init__.__doc__,
     "SelectStmt": SelectStmt.__init__.__doc__,
+    "AggregateStmt": AggregateStmt.__init__.__doc__,
+    "PreparedStmt": PreparedStmt.__init__.__doc__,
     "InsertStmt": InsertStmt.__init__.__doc__,
     "DeleteStmt": DeleteStmt.__init__.__doc__,
     "UpdateStmt": UpdateStmt.__init__.__doc__,
+    "UpsertStmt": UpsertStmt.__init__.__doc__,
 }
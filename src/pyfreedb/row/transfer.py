@@ -0,0 +1,279 @@
+import contextlib
+import csv
+import functools
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, List, Optional, Set
+
+from googleapiclient.errors import HttpError
+
+from pyfreedb.futures import _submit
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # pragma: no cover
+    pyarrow = None
+
+JSONL_FILE_FORMAT = 0
+CSV_FILE_FORMAT = 1
+PARQUET_FILE_FORMAT = 2
+
+_FILE_FORMATS = (JSONL_FILE_FORMAT, CSV_FILE_FORMAT, PARQUET_FILE_FORMAT)
+# Number of rows kept in memory before they are written, only the parquet files need to buffer them.
+_BATCH_ROWS = 10000
+
+# The chunks rejected with 429 Too Many Requests are sent again after a delay that doubles on every attempt.
+_MAX_THROTTLED_RETRIES = 5
+_MIN_RETRY_DELAY = 1.0
+
+_Row = Dict[str, Any]
+
+
+def _validate_file_format(file_format: int) -> None:
+    if file_format not in _FILE_FORMATS:
+        raise ValueError("file_format must be JSONL_FILE_FORMAT, CSV_FILE_FORMAT or PARQUET_FILE_FORMAT.")
+    if file_format == PARQUET_FILE_FORMAT and pyarrow is None:
+        raise ImportError("pyarrow is required to read and write parquet files, install pyfreedb[parquet].")
+
+
+def _export_rows(path: str, file_format: int, types: Dict[str, type], rows: Iterable[List[Any]]) -> int:
+    """Write the rows into the file at `path`, returns the number of written rows.
+
+    The rows are written into a temporary file that replaces `path` once all of them are written, so an export that
+    fails halfway never leaves a truncated file behind.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".pyfreedb-export-")
+    try:
+        if file_format == PARQUET_FILE_FORMAT:
+            os.close(fd)
+            count = _write_parquet(tmp_path, types, rows)
+        else:
+            with open(fd, "w", encoding="utf-8", newline="") as f:
+                write = _write_jsonl if file_format == JSONL_FILE_FORMAT else _write_csv
+                count = write(f, list(types), rows)
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(tmp_path)
+        raise
+
+    return count
+
+
+def _write_jsonl(f: IO[str], columns: List[str], rows: Iterable[List[Any]]) -> int:
+    count = 0
+    for row in rows:
+        f.write(json.dumps(dict(zip(columns, row)), ensure_ascii=False))
+        f.write("\n")
+        count += 1
+    return count
+
+
+def _write_csv(f: IO[str], columns: List[str], rows: Iterable[List[Any]]) -> int:
+    writer = csv.writer(f)
+    writer.writerow(columns)
+
+    count = 0
+    for row in rows:
+        writer.writerow(["" if value is None else value for value in row])
+        count += 1
+    return count
+
+
+def _write_parquet(path: str, types: Dict[str, type], rows: Iterable[List[Any]]) -> int:
+    arrow_types = {bool: pyarrow.bool_(), int: pyarrow.int64(), float: pyarrow.float64(), str: pyarrow.string()}
+    schema = pyarrow.schema([(name, arrow_types[typ]) for name, typ in types.items()])
+
+    count = 0
+    with pyarrow.parquet.ParquetWriter(path, schema) as writer:
+        for batch in _batched(rows, _BATCH_ROWS):
+            columns = {name: [row[idx] for row in batch] for idx, name in enumerate(types)}
+            writer.write_table(pyarrow.Table.from_pydict(columns, schema=schema))
+            count += len(batch)
+    return count
+
+
+def _iter_file_rows(path: str, file_format: int, types: Dict[str, type]) -> Iterator[_Row]:
+    """Yields the rows of the file at `path` as a map of column name to value, one row at a time."""
+    if file_format == PARQUET_FILE_FORMAT:
+        for batch in pyarrow.parquet.ParquetFile(path).iter_batches(batch_size=_BATCH_ROWS):
+            yield from _validate_columns(batch.to_pylist(), types)
+        return
+
+    with open(path, encoding="utf-8", newline="") as f:
+        if file_format == JSONL_FILE_FORMAT:
+            rows: Iterable[_Row] = (json.loads(line) for line in f if line.strip())
+        else:
+            converters = {name: _csv_converter(typ) for name, typ in types.items()}
+            rows = (
+                {name: converters[name](text) if name in converters else text for name, text in row.items()}
+                for row in csv.DictReader(f)
+            )
+
+        yield from _validate_columns(rows, types)
+
+
+def _validate_columns(rows: Iterable[_Row], types: Dict[str, type]) -> Iterator[_Row]:
+    for row in rows:
+        unknown = [name for name in row if name not in types]
+        if unknown:
+            raise ValueError(f"{unknown[0]} field is not recognised.")
+        yield row
+
+
+def _csv_converter(typ: type) -> Callable[[str], Any]:
+    def convert(text: str) -> Any:
+        if text == "":
+            return None
+        if typ is bool:
+            return text.upper() == "TRUE"
+        return typ(text)
+
+    return convert
+
+
+def _iter_chunks(rows: Iterable[_Row], chunk_bytes: int) -> Iterator[List[_Row]]:
+    """Group the rows into chunks whose JSON encoded size stays under `chunk_bytes`."""
+    chunk: List[_Row] = []
+    size = 0
+    for row in rows:
+        row_size = len(json.dumps(row, ensure_ascii=False).encode("utf-8"))
+        if chunk and size + row_size > chunk_bytes:
+            yield chunk
+            chunk, size = [], 0
+
+        chunk.append(row)
+        size += row_size
+
+    if chunk:
+        yield chunk
+
+
+def _import_chunks(
+    chunks: Iterable[List[_Row]],
+    insert: Callable[[List[_Row]], None],
+    max_workers: int,
+    checkpoint: Optional["_ImportCheckpoint"],
+) -> int:
+    """Insert the chunks with at most `max_workers` of them in flight, returns the number of inserted rows.
+
+    The chunks are inserted on the shared thread pool, so its size also limits the chunks that are inserted at once.
+    A chunk that is rejected because the quota is exhausted is retried with exponential backoff, see `_insert_chunk`.
+
+    The chunks that are already done according to the checkpoint are skipped, and the checkpoint is updated after every
+    inserted chunk. If any chunk fails, the chunks in flight are still awaited and recorded before the error is raised.
+    """
+    done = checkpoint.done if checkpoint is not None else set()
+    pending: Dict["Future[None]", int] = {}
+    sizes: Dict[int, int] = {}
+    errors: List[BaseException] = []
+    count = 0
+
+    def collect(finished: Iterable["Future[None]"]) -> None:
+        nonlocal count
+        for future in finished:
+            idx = pending.pop(future)
+            error = future.exception()
+            if error is not None:
+                errors.append(error)
+                continue
+
+            done.add(idx)
+            count += sizes.pop(idx)
+            if checkpoint is not None:
+                checkpoint.save()
+
+    for idx, chunk in enumerate(chunks):
+        if idx in done:
+            continue
+
+        # Only a bounded number of chunks are kept in memory.
+        while len(pending) >= max_workers:
+            collect(wait(pending, return_when=FIRST_COMPLETED).done)
+        if errors:
+            break
+
+        sizes[idx] = len(chunk)
+        pending[_submit(functools.partial(_insert_chunk, insert, chunk))] = idx
+
+    collect(wait(pending).done)
+
+    if errors:
+        raise errors[0]
+
+    return count
+
+
+def _insert_chunk(insert: Callable[[List[_Row]], None], chunk: List[_Row]) -> None:
+    # Throttled requests are rejected before anything is written, so they can be sent again safely.
+    delay = _MIN_RETRY_DELAY
+    for _ in range(_MAX_THROTTLED_RETRIES):
+        try:
+            insert(chunk)
+            return
+        except HttpError as e:
+            if e.resp.status != 429:
+                raise
+
+        time.sleep(delay)
+        delay *= 2
+
+    insert(chunk)
+
+
+class _ImportCheckpoint:
+    """The chunks of an import that are already inserted, persisted in a JSON file to resume a failed import.
+
+    The chunk boundaries only depend on the file content and the chunk size, so they are the same on every run.
+    """
+
+    def __init__(self, path: str, source: Dict[str, Any]) -> None:
+        self._path = path
+        self._source = source
+        self.done: Set[int] = set()
+
+        try:
+            with open(path) as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return
+
+        if state.get("source") != source:
+            raise ValueError(f"the checkpoint {path} belongs to another import.")
+        self.done = set(state["done"])
+
+    def save(self) -> None:
+        state = {"source": self._source, "done": sorted(self.done)}
+
+        # Write into a temporary file first, so that a crash never leaves a partially written checkpoint.
+        directory = os.path.dirname(os.path.abspath(self._path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".pyfreedb-checkpoint-")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self._path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(tmp_path)
+            raise
+
+    def remove(self) -> None:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self._path)
+
+
+def _batched(rows: Iterable[List[Any]], size: int) -> Iterator[List[List[Any]]]:
+    batch: List[List[Any]] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+
+    if batch:
+        yield batch
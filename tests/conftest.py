@@ -0,0 +1,8 @@
+import pytest
+
+from tests.fakes import FakeSheetWrapper, install_fake_wrapper
+
+
+@pytest.fixture
+def wrapper(monkeypatch: pytest.MonkeyPatch) -> FakeSheetWrapper:
+    return install_fake_wrapper(monkeypatch, FakeSheetWrapper())
@@ -0,0 +1,203 @@
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import pytest
+
+from pyfreedb.providers.google.sheet.base import (
+    _A1CellSelector,
+    _A1Range,
+    _BatchAppendRowsRequest,
+    _BatchUpdateRowsRequest,
+    _InsertRowsResult,
+    _UpdateRowsResult,
+)
+
+
+class FakeSheetWrapper:
+    """An in-memory stand-in of `_GoogleSheetWrapper`.
+
+    The sheets keep their cells (the first row first), so writes and range reads behave like Google Sheets. GViz
+    queries are not evaluated, they return `results[(sheet_name, query)]`, `results[query]` or `query_rows`, in that
+    order. The calls are recorded so that the tests can assert on them.
+    """
+
+    def __init__(self, sheets: Optional[Dict[str, List[List[Any]]]] = None) -> None:
+        self.sheets: Dict[str, List[List[Any]]] = sheets or {}
+        self.sheet_ids = {name: idx for idx, name in enumerate(self.sheets)}
+        self.hidden: List[str] = []
+        self.deleted: List[List[int]] = []
+
+        self.results: Dict[Any, List[List[Any]]] = {}
+        self.query_rows: List[List[Any]] = []
+
+        # The name of every called method, and the details of the reads and writes.
+        self.calls: List[str] = []
+        self.queries: List[Tuple[str, str]] = []
+        self.read_ranges: List[str] = []
+        self.updates: List[Tuple[str, List[List[Any]]]] = []
+        self.clears: List[str] = []
+        self.appends: List[Tuple[str, List[List[Any]]]] = []
+        # Names of the methods that raise RuntimeError.
+        self.fail_on: List[str] = []
+
+        self._lock = threading.RLock()
+
+    def create_sheet(self, spreadsheet_id: str, sheet_name: str, hidden: bool = False) -> str:
+        self._record("create_sheet")
+        if sheet_name in self.sheets:
+            raise ValueError("sheet already exists")
+
+        self.sheets[sheet_name] = []
+        self.sheet_ids[sheet_name] = max(self.sheet_ids.values(), default=-1) + 1
+        if hidden:
+            self.hidden.append(sheet_name)
+        return str(self.sheet_ids[sheet_name])
+
+    def get_sheet_ids(self, spreadsheet_id: str) -> Dict[str, int]:
+        self._record("get_sheet_ids")
+        return dict(self.sheet_ids)
+
+    def delete_sheets(self, spreadsheet_id: str, sheet_ids: List[int]) -> None:
+        self._record("delete_sheets")
+        self.deleted.append(sheet_ids)
+        for name, sheet_id in list(self.sheet_ids.items()):
+            if sheet_id in sheet_ids:
+                del self.sheet_ids[name]
+                del self.sheets[name]
+
+    def get_row_count(self, spreadsheet_id: str, sheet_name: str) -> int:
+        self._record("get_row_count")
+        return len(self.sheets[sheet_name])
+
+    def get_rows(self, spreadsheet_id: str, a1_range: _A1Range) -> List[List[Any]]:
+        self._record("get_rows")
+        return self._read(a1_range)
+
+    def batch_get_rows(self, spreadsheet_id: str, ranges: List[_A1Range]) -> List[List[List[Any]]]:
+        self._record("batch_get_rows")
+        self.read_ranges.extend(str(a1_range) for a1_range in ranges)
+        return [self._read(a1_range) for a1_range in ranges]
+
+    def update_rows(self, spreadsheet_id: str, a1_range: _A1Range, values: List[List[Any]]) -> _UpdateRowsResult:
+        self._record("update_rows")
+        if a1_range.start is None:
+            a1_range = _A1Range(a1_range.sheet_name, _A1CellSelector("A", 1), _A1CellSelector("A", 1))
+        self._write(a1_range, values)
+        return _UpdateRowsResult(a1_range, len(values), len(values[0]), len(values) * len(values[0]), values)
+
+    def batch_update_rows(self, spreadsheet_id: str, requests: List[_BatchUpdateRowsRequest]) -> None:
+        self._record("batch_update_rows")
+        for request in requests:
+            self.updates.append((str(request.range), request.values))
+            self._write(request.range, request.values)
+
+    def overwrite_rows(self, spreadsheet_id: str, a1_range: _A1Range, values: List[List[Any]]) -> _InsertRowsResult:
+        self._record("overwrite_rows")
+        return self._append(a1_range.sheet_name, a1_range.start.column if a1_range.start else "A", values)
+
+    def insert_rows(self, spreadsheet_id: str, a1_range: _A1Range, values: List[List[Any]]) -> _InsertRowsResult:
+        self._record("insert_rows")
+        return self._append(a1_range.sheet_name, a1_range.start.column if a1_range.start else "A", values)
+
+    def batch_append_rows(self, spreadsheet_id: str, requests: List[_BatchAppendRowsRequest]) -> None:
+        self._record("batch_append_rows")
+        names = {sheet_id: name for name, sheet_id in self.sheet_ids.items()}
+        for request in requests:
+            self._append(names[request.sheet_id], "A", request.values)
+
+    def clear(self, spreadsheet_id: str, ranges: List[_A1Range]) -> None:
+        self._record("clear")
+        with self._lock:
+            for a1_range in ranges:
+                self.clears.append(str(a1_range))
+                assert a1_range.start is not None and a1_range.end is not None
+                rows = self.sheets[a1_range.sheet_name]
+                first_col, last_col = _column_bounds(a1_range)
+                for row in rows[max(a1_range.start.row, 1) - 1 : a1_range.end.row or len(rows)]:
+                    for col in range(first_col, min(last_col + 1, len(row))):
+                        row[col] = ""
+
+    def query(self, spreadsheet_id: str, sheet_name: str, query: str) -> List[List[Any]]:
+        self._record("query")
+        return self._query_result(sheet_name, query)
+
+    def iter_query(self, spreadsheet_id: str, sheet_name: str, query: str) -> Iterator[List[Any]]:
+        self._record("iter_query")
+        yield from self._query_result(sheet_name, query)
+
+    def _record(self, method: str) -> None:
+        self.calls.append(method)
+        if method in self.fail_on:
+            raise RuntimeError(f"{method} failed")
+
+    def _query_result(self, sheet_name: str, query: str) -> List[List[Any]]:
+        self.queries.append((sheet_name, query))
+        return self.results.get((sheet_name, query), self.results.get(query, self.query_rows))
+
+    def _read(self, a1_range: _A1Range) -> List[List[Any]]:
+        assert a1_range.start is not None and a1_range.end is not None
+        first_col, last_col = _column_bounds(a1_range)
+        rows = self.sheets[a1_range.sheet_name][max(a1_range.start.row, 1) - 1 : a1_range.end.row or None]
+
+        result = []
+        for row in rows:
+            values = [_unescape(value) for value in row[first_col : last_col + 1]]
+            # Google Sheets doesn't return the empty cells at the end of the rows.
+            while values and values[-1] == "":
+                values.pop()
+            result.append(values)
+        return result
+
+    def _write(self, a1_range: _A1Range, values: List[List[Any]]) -> None:
+        assert a1_range.start is not None
+        with self._lock:
+            rows = self.sheets.setdefault(a1_range.sheet_name, [])
+            first_col, _ = _column_bounds(a1_range)
+            for i, values_row in enumerate(values):
+                while len(rows) < a1_range.start.row + i:
+                    rows.append([])
+                row = rows[a1_range.start.row + i - 1]
+                for j, value in enumerate(values_row):
+                    while len(row) <= first_col + j:
+                        row.append("")
+                    row[first_col + j] = a1_range.start.row + i if value == "=ROW()" else value
+
+    def _append(self, sheet_name: str, column: str, values: List[List[Any]]) -> _InsertRowsResult:
+        # The rows are written after the last row that has a value in the given column.
+        with self._lock:
+            self.appends.append((sheet_name, values))
+            rows = self.sheets.setdefault(sheet_name, [])
+            col = _column_index(column)
+            first_row = 1 + max([0] + [idx + 1 for idx, row in enumerate(rows) if col < len(row) and row[col] != ""])
+
+            width = max(len(row) for row in values)
+            updated_range = _A1Range(
+                sheet_name,
+                _A1CellSelector(column, first_row),
+                _A1CellSelector(chr(ord(column) + width - 1), first_row + len(values) - 1),
+            )
+            self._write(updated_range, values)
+
+        return _InsertRowsResult(updated_range, len(values), width, len(values) * width, values)
+
+
+def install_fake_wrapper(monkeypatch: pytest.MonkeyPatch, wrapper: FakeSheetWrapper) -> FakeSheetWrapper:
+    """Make the stores created afterwards use the given fake wrapper."""
+    for module in ("pyfreedb.row.gsheet", "pyfreedb.row.partitioned", "pyfreedb.kv.gsheet"):
+        monkeypatch.setattr(f"{module}._GoogleSheetWrapper", lambda auth_client: wrapper)
+    return wrapper
+
+
+def _column_index(column: str) -> int:
+    return ord(column) - ord("A")
+
+
+def _column_bounds(a1_range: _A1Range) -> Tuple[int, int]:
+    # An empty column means that the range spans all columns.
+    start = a1_range.start.column if a1_range.start else ""
+    end = a1_range.end.column if a1_range.end else ""
+    return (_column_index(start) if start else 0), (_column_index(end) if end else 25)
+
+
+def _unescape(value: Any) -> Any:
+    return value[1:] if isinstance(value, str) and value.startswith("'") else value
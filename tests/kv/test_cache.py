@@ -0,0 +1,93 @@
+import pathlib
+from typing import Any, List
+
+import pytest
+
+from pyfreedb.kv import GoogleSheetKVStore, KeyNotFoundError
+from pyfreedb.providers.google.sheet.base import _A1Range, _UpdateRowsResult
+from tests.fakes import FakeSheetWrapper, install_fake_wrapper
+
+
+class LookupWrapper(FakeSheetWrapper):
+    """Answers every key lookup with `values`."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.values: List[List[Any]] = []
+        self.lookups = 0
+
+    def update_rows(self, spreadsheet_id: str, a1_range: _A1Range, values: List[List[Any]]) -> _UpdateRowsResult:
+        self.lookups += 1
+        return _UpdateRowsResult(a1_range, 1, 1, 1, self.values)
+
+
+@pytest.fixture
+def wrapper(monkeypatch: pytest.MonkeyPatch) -> LookupWrapper:
+    wrapper = LookupWrapper()
+    install_fake_wrapper(monkeypatch, wrapper)
+    return wrapper
+
+
+def new_store(path: pathlib.Path, max_age: float = 60) -> GoogleSheetKVStore:
+    return GoogleSheetKVStore(
+        None, "id", "kv", mode=GoogleSheetKVStore.APPEND_ONLY_MODE, cache_file=str(path), cache_max_age=max_age
+    )
+
+
+def test_persistent_cache(wrapper: LookupWrapper, tmp_path: pathlib.Path) -> None:
+    path = tmp_path / "kv.sqlite"
+    store = new_store(path)
+
+    wrapper.values = [["!v1"]]
+    assert store.get("k1") == b"v1"
+    assert store.get("k1") == b"v1"
+    assert wrapper.lookups == 1
+
+    # Missing keys are cached too.
+    wrapper.values = [["#N/A"]]
+    for _ in range(2):
+        with pytest.raises(KeyNotFoundError):
+            store.get("k2")
+    assert wrapper.lookups == 2
+
+    store.set("k2", b"v2")
+    store.delete("k1")
+    store.close()
+
+    # A new store (e.g. after a restart) starts with the cached values.
+    restarted = new_store(path)
+    assert restarted.get("k2") == b"v2"
+    with pytest.raises(KeyNotFoundError):
+        restarted.get("k1")
+    assert wrapper.lookups == 2
+
+    # Discarded keys are fetched again.
+    restarted._cache_discard("k2")
+    wrapper.values = [["!v2"]]
+    assert restarted.get("k2") == b"v2"
+    assert wrapper.lookups == 3
+
+    # Values older than the max age are fetched again.
+    expired = new_store(path, max_age=0)
+    wrapper.values = [["!v3"]]
+    assert expired.get("k2") == b"v3"
+    assert wrapper.lookups == 4
+
+    with pytest.raises(ValueError):
+        new_store(path, max_age=-1)
+
+
+def test_cache_discarded_on_failed_write(wrapper: LookupWrapper, tmp_path: pathlib.Path) -> None:
+    store = new_store(tmp_path / "kv.sqlite")
+    wrapper.values = [["!v1"]]
+    assert store.get("k1") == b"v1"
+
+    # The write may have been applied even though it failed (e.g. on a timeout), so the key is read from the sheet.
+    wrapper.fail_on = ["insert_rows"]
+    for write in (lambda: store.set("k1", b"v2"), lambda: store.delete("k1")):
+        with pytest.raises(RuntimeError):
+            write()
+
+        wrapper.values = [["!v2"]]
+        assert store.get("k1") == b"v2"
+    assert wrapper.lookups == 3
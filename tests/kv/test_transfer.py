@@ -0,0 +1,47 @@
+import json
+import pathlib
+
+import pytest
+
+from pyfreedb.kv import GoogleSheetKVStore
+from tests.fakes import FakeSheetWrapper
+
+
+@pytest.fixture
+def wrapper(wrapper: FakeSheetWrapper) -> FakeSheetWrapper:
+    # The second row belongs to a deleted key, and Google Sheets returns the numbers that look like keys as numbers.
+    wrapper.sheets["kv"] = [["k1", "!a", 1000], ["", "", ""], [12, "!b", 2000.0]]
+    return wrapper
+
+
+@pytest.mark.parametrize(
+    "file_format",
+    [
+        GoogleSheetKVStore.JSONL_FILE_FORMAT,
+        GoogleSheetKVStore.CSV_FILE_FORMAT,
+        GoogleSheetKVStore.PARQUET_FILE_FORMAT,
+    ],
+)
+def test_export_and_import(wrapper: FakeSheetWrapper, tmp_path: pathlib.Path, file_format: int) -> None:
+    store = GoogleSheetKVStore(None, "id", "kv")
+    path = str(tmp_path / "kv")
+
+    assert store.export_to(path, file_format=file_format) == 2
+
+    wrapper.sheets["kv"] = []
+    assert store.import_from(path, file_format=file_format) == 2
+    assert wrapper.sheets["kv"] == [["k1", "!a", 1000], ["12", "!b", 2000]]
+
+
+def test_export_jsonl(wrapper: FakeSheetWrapper, tmp_path: pathlib.Path) -> None:
+    store = GoogleSheetKVStore(None, "id", "kv", mode=GoogleSheetKVStore.APPEND_ONLY_MODE)
+    path = tmp_path / "kv.jsonl"
+
+    # The export reads the sheet page by page.
+    store._EXPORT_PAGE_ROWS = 2
+    store.export_to(str(path))
+    assert [json.loads(line) for line in path.read_text().splitlines()] == [
+        {"key": "k1", "value": "!a", "ts": 1000},
+        {"key": "12", "value": "!b", "ts": 2000},
+    ]
+    assert wrapper.calls.count("get_rows") == 2
@@ -0,0 +1,107 @@
+import time
+from typing import Any, Dict, List
+
+import httplib2
+import pytest
+import requests
+from requests.adapters import BaseAdapter
+
+from pyfreedb.providers.google.auth import GoogleAuthClient, PooledGoogleAuthClient
+from pyfreedb.providers.google.sheet.wrapper import _GoogleSheetWrapper
+
+
+class FakeCredentials:
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def before_request(self, request: Any, method: str, url: str, headers: Dict[str, str]) -> None:
+        headers["authorization"] = self.name
+
+
+class FakeAuthClient(GoogleAuthClient):
+    def __init__(self, name: str) -> None:
+        self._creds = FakeCredentials(name)
+
+    def credentials(self) -> Any:
+        return self._creds
+
+
+class FakeAdapter(BaseAdapter):
+    def __init__(self, statuses: Dict[str, int]) -> None:
+        super().__init__()
+        self.statuses = statuses
+        self.sent: List[str] = []
+
+    def send(self, request: requests.PreparedRequest, *args: Any, **kwargs: Any) -> requests.Response:
+        name = str(request.headers["authorization"])
+        self.sent.append(name)
+
+        response = requests.Response()
+        response.status_code = self.statuses.get(name, 200)
+        response.request = request
+        return response
+
+    def close(self) -> None:
+        pass
+
+
+def picked(auth_client: PooledGoogleAuthClient, n: int) -> List[str]:
+    names = []
+    for _ in range(n):
+        headers: Dict[str, str] = {}
+        auth_client.credentials().before_request(None, "GET", "url", headers)
+        names.append(headers["authorization"])
+    return names
+
+
+def test_strategies() -> None:
+    auth_client = PooledGoogleAuthClient([FakeAuthClient("a"), FakeAuthClient("b"), FakeAuthClient("c")])
+    assert picked(auth_client, 4) == ["a", "b", "c", "a"]
+
+    auth_client = PooledGoogleAuthClient(
+        [FakeAuthClient("a"), FakeAuthClient("b")], strategy=PooledGoogleAuthClient.LEAST_LOADED_STRATEGY
+    )
+    auth_client.credentials()._members[0].sent.extend([time.monotonic()] * 3)
+    assert picked(auth_client, 4) == ["b", "b", "b", "a"]
+
+    with pytest.raises(ValueError):
+        PooledGoogleAuthClient([])
+
+
+def test_backoff_on_throttled_requests() -> None:
+    auth_client = PooledGoogleAuthClient([FakeAuthClient("a"), FakeAuthClient("b")])
+    wrapper = _GoogleSheetWrapper(auth_client)
+
+    adapter = FakeAdapter({"a": 429})
+    wrapper._authed_session.mount("https://", adapter)
+    for _ in range(4):
+        wrapper._authed_session.get("https://sheets.example")
+
+    # "a" is skipped once it's throttled.
+    assert adapter.sent == ["a", "b", "b", "b"]
+    assert auth_client.credentials()._members[0].throttled == 1
+
+
+class FakeHttp:
+    def __init__(self, statuses: Dict[str, int]) -> None:
+        self.statuses = statuses
+        self.sent: List[str] = []
+
+    def request(self, uri: str, method: str = "GET", body: Any = None, headers: Any = None, **kwargs: Any) -> Any:
+        name = headers["authorization"]
+        self.sent.append(name)
+        return httplib2.Response({"status": self.statuses.get(name, 200)}), b""
+
+
+def test_backoff_on_throttled_api_requests() -> None:
+    auth_client = PooledGoogleAuthClient([FakeAuthClient("a"), FakeAuthClient("b")])
+    wrapper = _GoogleSheetWrapper(auth_client)
+
+    # The Sheets API requests go through httplib2 instead of the requests session.
+    http = FakeHttp({"a": 429})
+    wrapper._http().http = http
+    for _ in range(4):
+        wrapper._http().request("https://sheets.example")
+
+    assert http.sent == ["a", "b", "b", "b"]
+    assert auth_client.credentials()._members[0].throttled == 1
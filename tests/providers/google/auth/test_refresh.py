@@ -0,0 +1,89 @@
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional
+
+from pyfreedb.providers.google.auth.refresh import _TokenRefresher
+
+
+class FakeCredentials:
+    def __init__(self, expires_in: Optional[float]) -> None:
+        self.token: Optional[str] = "token" if expires_in is not None else None
+        self.expiry: Optional[datetime] = None
+        if expires_in is not None:
+            self.expiry = _now() + timedelta(seconds=expires_in)
+        self.scopes = ["scope"]
+        self.service_account_email = "a@b.c"
+        self.refreshes = 0
+        self.refreshed = threading.Event()
+
+    @property
+    def valid(self) -> bool:
+        return self.token is not None and (self.expiry is None or self.expiry > _now())
+
+    def refresh(self, request: Any) -> None:
+        self.refreshes += 1
+        self.token = f"token-{self.refreshes}"
+        self.expiry = _now() + timedelta(hours=1)
+        self.refreshed.set()
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def test_refresh_if_needed() -> None:
+    creds = FakeCredentials(expires_in=3600)
+    refresher = _TokenRefresher(creds, 60, None)
+    assert creds.refreshes == 0
+
+    # The token expires within the margin.
+    creds.expiry = _now() + timedelta(seconds=30)
+    refresher.refresh_if_needed()
+    assert creds.refreshes == 1
+    refresher.close()
+
+
+def test_background_refresh() -> None:
+    creds = FakeCredentials(expires_in=0.2)
+    refresher = _TokenRefresher(creds, 0.1, None)
+    assert creds.refreshes == 0
+
+    assert creds.refreshed.wait(5)
+    assert creds.token == "token-1"
+    refresher.close()
+
+
+def test_token_cache(tmp_path: Any) -> None:
+    cache_file = str(tmp_path / "token.json")
+
+    creds = FakeCredentials(expires_in=None)
+    _TokenRefresher(creds, None, cache_file)
+    assert creds.refreshes == 1
+
+    # Other clients reuse the cached token instead of calling the token endpoint.
+    other_creds = FakeCredentials(expires_in=None)
+    _TokenRefresher(other_creds, None, cache_file)
+    assert other_creds.refreshes == 0
+    assert other_creds.token == "token-1"
+    assert other_creds.expiry == creds.expiry
+
+    # Tokens of other credentials are ignored.
+    other_creds = FakeCredentials(expires_in=None)
+    other_creds.service_account_email = "d@e.f"
+    _TokenRefresher(other_creds, None, cache_file)
+    assert other_creds.refreshes == 1
+
+
+def test_token_cache_on_request(tmp_path: Any) -> None:
+    cache_file = str(tmp_path / "token.json")
+    creds = FakeCredentials(expires_in=None)
+    _TokenRefresher(creds, None, cache_file)
+    other_creds = FakeCredentials(expires_in=None)
+    _TokenRefresher(other_creds, None, cache_file)
+
+    # The refreshes done by google-auth when a request finds the token expired go through the cache too.
+    creds.refresh(None)
+    assert creds.refreshes == 2
+    other_creds.refresh(None)
+    assert other_creds.refreshes == 0
+    assert other_creds.token == "token-2"
@@ -0,0 +1,89 @@
+import csv
+import json
+from typing import Any, Iterator
+
+import pytest
+
+from pyfreedb.providers.google.sheet.wrapper import _cell_data, _GoogleSheetWrapper, _iter_lines_keepends
+
+
+def test_convert_query_result() -> None:
+    wrapper = _GoogleSheetWrapper.__new__(_GoogleSheetWrapper)
+    table = {
+        "cols": [{"type": "number"}, {"type": "string"}, {"type": "boolean"}],
+        "rows": [
+            {"c": [{"v": 2.0}, {"v": "a"}, {"v": True}]},
+            # Empty cells must not shift the cells after them.
+            {"c": [None, {"v": "b"}, {"v": None}]},
+        ],
+    }
+    response = "freeleh({});".format(json.dumps({"table": table})).encode()
+    assert wrapper._convert_query_result(response) == [[2.0, "a", True], [None, "b", None]]
+
+    table = {
+        "cols": [{"type": "date"}, {"type": "number"}],
+        "rows": [{"c": [{"v": "Date(2020,0,1)", "f": "2020-01-01"}, None]}, {"c": [None, {"v": 1}]}],
+    }
+    response = "freeleh({});".format(json.dumps({"table": table})).encode()
+    assert wrapper._convert_query_result(response) == [["2020-01-01", None], [None, 1]]
+
+
+def test_iter_lines_keepends() -> None:
+    chunks = ['"a","b', '\nc"\r', '\n"d",""\n"e', '","f"']
+    lines = list(_iter_lines_keepends(chunks))
+    assert lines == ['"a","b\n', 'c"\r\n', '"d",""\n', '"e","f"']
+    assert list(csv.reader(lines)) == [["a", "b\nc"], ["d", ""], ["e", "f"]]
+
+
+class CsvResponse:
+    encoding = "utf-8"
+
+    def __init__(self, body: str) -> None:
+        self._body = body
+
+    def __enter__(self) -> "CsvResponse":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        pass
+
+    def iter_content(self, chunk_size: int) -> Iterator[bytes]:
+        yield self._body.encode()
+
+
+def test_iter_query_csv(monkeypatch: pytest.MonkeyPatch) -> None:
+    wrapper = _GoogleSheetWrapper.__new__(_GoogleSheetWrapper)
+    response = CsvResponse('"name","age"\n"a","1"\n"","2"\n')
+    monkeypatch.setattr(wrapper, "_query_request", lambda spreadsheet_id, params, stream: response)
+
+    # Unlike JSON, CSV returns empty strings the same as NULL.
+    rows = list(wrapper.iter_query_csv("id", "sheet", "SELECT B, C", [str, float]))
+    assert rows == [["a", 1.0], [None, 2.0]]
+
+
+def test_iter_query_result() -> None:
+    wrapper = _GoogleSheetWrapper.__new__(_GoogleSheetWrapper)
+    table = {
+        "cols": [{"type": "number", "label": "rows"}, {"type": "string"}],
+        "rows": [{"c": [{"v": i}, None if i % 2 else {"v": "v%d,}]" % i}]} for i in range(20)],
+        "parsedNumHeaders": 1,
+    }
+    response = 'freeleh({"status": "ok", "table": ' + json.dumps(table, indent=1) + "});"
+
+    # The rows should be decoded correctly no matter where the chunk boundaries are.
+    for size in [1, 7, 64, len(response)]:
+        chunks = [response[i : i + size] for i in range(0, len(response), size)]
+        rows = list(wrapper._iter_query_result(chunks))
+        assert rows == wrapper._convert_query_result(response.encode())
+
+    with pytest.raises(ValueError):
+        list(wrapper._iter_query_result(['freeleh({"status": "error", "errors": []});']))
+
+
+def test_cell_data() -> None:
+    assert _cell_data(None) == {}
+    assert _cell_data(True) == {"userEnteredValue": {"boolValue": True}}
+    assert _cell_data(1.5) == {"userEnteredValue": {"numberValue": 1.5}}
+    assert _cell_data("'=1") == {"userEnteredValue": {"stringValue": "=1"}}
+    assert _cell_data("=ROW()") == {"userEnteredValue": {"formulaValue": "=ROW()"}}
+    assert _cell_data("abc") == {"userEnteredValue": {"stringValue": "abc"}}
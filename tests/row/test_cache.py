@@ -0,0 +1,66 @@
+import threading
+import time
+from typing import List
+
+import pytest
+
+from pyfreedb.row.cache import _QueryResultCache
+
+
+def test_cache_ttl_and_eviction() -> None:
+    cache: _QueryResultCache[int] = _QueryResultCache(ttl=0.05, max_size=2)
+    calls: List[str] = []
+
+    def loader(key: str) -> int:
+        calls.append(key)
+        return len(calls)
+
+    assert cache.get_or_load("a", lambda: loader("a")) == 1
+    assert cache.get_or_load("a", lambda: loader("a")) == 1
+
+    # "a" is the least recently used entry once "b" and "c" are loaded.
+    cache.get_or_load("b", lambda: loader("b"))
+    cache.get_or_load("c", lambda: loader("c"))
+    assert cache.get_or_load("a", lambda: loader("a")) == 4
+
+    time.sleep(0.06)
+    assert cache.get_or_load("a", lambda: loader("a")) == 5
+
+    cache.invalidate()
+    assert cache.get_or_load("a", lambda: loader("a")) == 6
+
+
+def test_cache_errors_are_not_cached() -> None:
+    cache: _QueryResultCache[int] = _QueryResultCache(ttl=60, max_size=10)
+
+    def failing_loader() -> int:
+        raise RuntimeError
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_load("a", failing_loader)
+
+    assert cache.get_or_load("a", lambda: 1) == 1
+
+
+def test_cache_coalesce_misses() -> None:
+    cache: _QueryResultCache[int] = _QueryResultCache(ttl=60, max_size=10)
+    release = threading.Event()
+    calls: List[int] = []
+
+    def slow_loader() -> int:
+        calls.append(1)
+        release.wait()
+        return 42
+
+    results: List[int] = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_load("a", slow_loader))) for _ in range(5)]
+    for t in threads:
+        t.start()
+
+    time.sleep(0.05)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert results == [42] * 5
+    assert len(calls) == 1
@@ -0,0 +1,73 @@
+import pytest
+
+from pyfreedb.base import InvalidOperationError
+from pyfreedb.row import GoogleSheetRowStore, models
+from tests.fakes import FakeSheetWrapper
+
+
+class Person(models.Model):
+    name = models.StringField()
+    age = models.IntegerField()
+
+
+@pytest.fixture
+def wrapper(wrapper: FakeSheetWrapper, monkeypatch: pytest.MonkeyPatch) -> FakeSheetWrapper:
+    monkeypatch.setattr("pyfreedb.row.gsheet._now_version", lambda: 1000)
+    monkeypatch.setattr("pyfreedb.row.changes._now_version", lambda: 20000)
+    return wrapper
+
+
+def test_tracked_writes(wrapper: FakeSheetWrapper) -> None:
+    store = GoogleSheetRowStore(None, "id", "sheet", Person, change_tracking=True)
+    assert wrapper.sheets["sheet"][0] == ["_rid", "name", "age", "_version", "_deleted_rid"]
+
+    store.insert([Person(name="a", age=1), Person(name="b", age=2)]).execute()
+    assert wrapper.appends == [("sheet", [["=ROW()", "'a", 1, 1000, None], ["=ROW()", "'b", 2, 1000, None]])]
+
+    store.update_by_rids([2, 3], {"age": 3})
+    assert wrapper.updates[-1] == ("sheet!D2:E3", [[1000, None], [1000, None]])
+
+    store.delete_by_rids([3])
+    assert wrapper.clears == ["sheet!A3:C3"]
+    assert wrapper.updates[-1] == ("sheet!D3:E3", [[1000, 3]])
+
+
+def test_changes(wrapper: FakeSheetWrapper) -> None:
+    store = GoogleSheetRowStore(None, "id", "sheet", Person, change_tracking=True)
+    wrapper.query_rows = [
+        [2.0, "a", 1.0, 5000.0, None],
+        [None, None, None, 7000.0, 3.0],
+        [None, None, None, None, None],
+        # An empty tombstone isn't a delete.
+        [None, None, None, 7500.0, ""],
+    ]
+
+    feed = store.changes(4000)
+    with pytest.raises(InvalidOperationError):
+        feed.token
+
+    changes = list(feed)
+    assert wrapper.queries == [("sheet", "SELECT A,B,C,D,E WHERE D > 4000 ORDER BY D")]
+    assert [(c.rid, c.row, c.version, c.deleted) for c in changes] == [
+        (2, Person(name="a", age=1), 5000, False),
+        (3, None, 7000, True),
+    ]
+    assert changes[0].row is not None and changes[0].row._rid == 2
+    assert feed.token == 7500
+
+    # The token never moves past the writes that might still be in flight.
+    wrapper.query_rows = [[2.0, "a", 1.0, 15000.0]]
+    feed = store.changes(0)
+    list(feed)
+    assert wrapper.queries[-1][1] == "SELECT A,B,C,D,E WHERE A IS NOT NULL ORDER BY D"
+    assert feed.token == 10000
+
+    # The settle window is configurable.
+    feed = store.changes(0, settle_window=2)
+    list(feed)
+    assert feed.token == 15000
+    with pytest.raises(ValueError):
+        store.changes(0, settle_window=-1)
+
+    with pytest.raises(InvalidOperationError):
+        GoogleSheetRowStore(None, "id", "sheet", Person).changes()
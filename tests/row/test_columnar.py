@@ -0,0 +1,39 @@
+import math
+from array import array
+from typing import Any, List
+
+import pytest
+
+from pyfreedb.row.columnar import _build_columns
+
+
+def test_build_columns() -> None:
+    columns = [("i", int), ("f", float), ("b", bool), ("nb", bool), ("s", str)]
+    rows: List[List[Any]] = [
+        [1.0, 1.5, True, None, "a"],
+        [None, 2.5, False, True, None],
+    ]
+    result = _build_columns(columns, rows)
+
+    assert list(result.keys()) == ["i", "f", "b", "nb", "s"]
+    assert result["i"].typecode == "d"
+    assert result["i"][0] == 1.0 and math.isnan(result["i"][1])
+    assert result["f"] == array("d", [1.5, 2.5])
+    assert result["b"] == array("b", [1, 0])
+    # Empty cells can't be represented in a bool array.
+    assert result["nb"] == [None, True]
+    assert result["s"] == ["a", None]
+
+    with pytest.raises(TypeError):
+        _build_columns([("i", int)], [["a"]])
+
+
+def test_to_pandas() -> None:
+    pytest.importorskip("pandas")
+
+    df = _build_columns([("i", int), ("b", bool), ("s", str)], [[1.0, True, "a"], [2.0, False, None]]).to_pandas()
+    assert list(df.columns) == ["i", "b", "s"]
+    assert df["i"].tolist() == [1.0, 2.0]
+    assert df["b"].tolist() == [True, False]
+    assert df["s"][0] == "a"
+    assert df["s"].isna().tolist() == [False, True]
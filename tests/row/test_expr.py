@@ -0,0 +1,60 @@
+from typing import Any, Tuple
+
+import pytest
+
+from pyfreedb.row.expr import _column_ranges, _compile, _indexable_predicates, _parse, _tokenize, _UnsupportedExpression
+
+COLUMNS = {"_rid": 0, "name": 1, "age": 2}
+
+
+def evaluate(condition: str, row: Tuple[Any, ...], *args: Any) -> bool:
+    return bool(_compile(_parse(condition, COLUMNS), args)(row))
+
+
+def test_tokenize() -> None:
+    tokens = _tokenize('name = "a b" AND `age`>=?')
+    assert [t.kind for t in tokens] == ["ident", "op", "string", "ident", "ident", "op", "placeholder"]
+    assert [t.text for t in tokens] == ["name", "=", '"a b"', "AND", "`age`", ">=", "?"]
+
+
+def test_evaluate() -> None:
+    row = (2, "cat", 10)
+    assert evaluate("name = ?", row, "cat")
+    assert evaluate("_rid IS NOT NULL AND age > ? AND age <= 10", row, 5)
+    assert evaluate("name = 'dog' OR NOT (age < 10)", row)
+    assert evaluate("age * 2 + 1 = 21", row)
+    assert evaluate("name starts with 'c' and name contains 'a' and name like '_a%' and name matches 'c.t'", row)
+    assert not evaluate("name <> ?", row, "cat")
+
+    # NULL and values of different types never match.
+    assert evaluate("age IS NULL", (2, "cat", None))
+    assert not evaluate("age > 1", (2, "cat", None))
+    assert not evaluate("name = 1", row)
+
+
+def test_unsupported() -> None:
+    for condition in ["year(name) = 1", "unknown = 1", "age = date '2020-01-01'", "(age = 1"]:
+        with pytest.raises(_UnsupportedExpression):
+            _parse(condition, COLUMNS)
+
+
+def test_indexable_predicates() -> None:
+    node = _parse("_rid IS NOT NULL AND name = ? AND 10 < age AND (age = 1 OR age = 2)", COLUMNS)
+    assert list(_indexable_predicates(node, ("cat",))) == [(1, "=", "cat"), (2, ">", 10)]
+
+
+def test_column_ranges() -> None:
+    def ranges(condition: str, *args: Any) -> Any:
+        return _column_ranges(_parse(condition, COLUMNS), args, 0)
+
+    inf = float("inf")
+    assert ranges("_rid IS NOT NULL AND _rid = ?", 5) == [(5, 5)]
+    assert ranges("_rid IS NOT NULL AND (_rid = 3 OR _rid = 7)") == [(3, 3), (7, 7)]
+    assert ranges("_rid > 3 AND 10 >= _rid") == [(3, 10)]
+    assert ranges("_rid < 3 AND _rid > 10") == []
+    assert ranges("_rid >= 3") == [(3, inf)]
+
+    # Anything that doesn't only compare _rid with numbers can't be served by range reads.
+    assert ranges("_rid = 3 AND age = 1") is None
+    assert ranges("_rid = ?", "3") is None
+    assert ranges("_rid != 3") is None
@@ -0,0 +1,179 @@
+import pytest
+
+from pyfreedb.futures import gather
+from pyfreedb.row import GoogleSheetRowStore, Ordering, models
+from pyfreedb.row.gsheet import _find_row_gaps, _to_row_ranges
+from tests.fakes import FakeSheetWrapper
+
+
+class Person(models.Model):
+    name = models.StringField()
+    age = models.IntegerField()
+
+
+@pytest.fixture
+def wrapper(wrapper: FakeSheetWrapper) -> FakeSheetWrapper:
+    wrapper.sheets["sheet"] = [["_rid", "name", "age"], [2, "a", 10], ["", ""], [4, "c", 30], [5, "d"]]
+    return wrapper
+
+
+def new_store() -> GoogleSheetRowStore[Person]:
+    return GoogleSheetRowStore(None, "id", "sheet", Person)
+
+
+def test_find_row_gaps() -> None:
+    assert _find_row_gaps([], 2) == []
+    assert _find_row_gaps([2, 3, 4], 2) == []
+
+    # Rows cleared at the top and in the middle of the sheet.
+    assert _find_row_gaps([4, 5, 8], 2) == [2, 3, 6, 7]
+
+
+def test_to_row_ranges() -> None:
+    inf = float("inf")
+    assert _to_row_ranges([(5, 5), (-inf, 3.5), (3, 4), (10.5, 11)], 2) == [(2, 5), (11, 11)]
+    assert _to_row_ranges([(5, 5), (3, inf)], 2) is None
+
+
+def test_select_by_rid(wrapper: FakeSheetWrapper) -> None:
+    store = new_store()
+
+    assert store.select().where("_rid = ? OR _rid = ?", 4, 5).execute() == [
+        Person(name="c", age=30),
+        Person(name="d", age=None),
+    ]
+    assert wrapper.read_ranges == ["sheet!A4:C5"]
+
+    rows = store.select("name").where("_rid <= 5").order_by(Ordering.DESC("age")).limit(2).execute()
+    assert rows == [Person(name="c"), Person(name="a")]
+    assert store.count().where("_rid > 2 AND _rid < 5").execute() == 1
+
+    # Other conditions and wide ranges still go through GViz.
+    store.count().where("_rid = 2 AND age = 10").execute()
+    store.count().where("_rid < ?", 100000).execute()
+    assert wrapper.queries == [
+        ("sheet", "SELECT COUNT(A) WHERE A IS NOT NULL AND A = 2 AND C = 10"),
+        ("sheet", "SELECT COUNT(A) WHERE A IS NOT NULL AND A < 100000"),
+    ]
+
+    # The range reads stay within the grid.
+    wrapper.read_ranges = []
+    assert store.count().where("_rid < ?", 1000).execute() == 3
+    assert wrapper.read_ranges == ["sheet!A2:C5"]
+
+
+def test_get_by_rids(wrapper: FakeSheetWrapper) -> None:
+    store = new_store()
+
+    assert store.get_by_rids([5, 3, 2]) == [Person(name="d", age=None), None, Person(name="a", age=10)]
+    assert wrapper.read_ranges == ["sheet!A2:C3", "sheet!A5:C5"]
+    assert store.get_by_rids([4, 6]) == [Person(name="c", age=30), None]
+    assert wrapper.read_ranges[-1] == "sheet!A4:C4"
+
+    with pytest.raises(ValueError):
+        store.get_by_rids([1])
+
+
+def test_select_where_in(wrapper: FakeSheetWrapper) -> None:
+    store = new_store()
+    # Only fits two values per query.
+    store._MAX_IN_QUERY_LENGTH = 125
+
+    prefix = "SELECT A,B,C WHERE (A IS NOT NULL AND C > 1) AND "
+    suffix = " ORDER BY C DESC LIMIT 3"
+    wrapper.results = {
+        prefix + '(B = "a" OR B = "b")' + suffix: [[2.0, "a", 10.0], [7.0, "b", 10.0]],
+        prefix + '(B = "c")' + suffix: [[4.0, "c", 30.0]],
+    }
+
+    stmt = store.select("name", "age").where("age > ?", 1).where_in("name", ["a", "b", "c", "a"])
+    rows = stmt.order_by(Ordering.DESC("age")).limit(2).offset(1).execute()
+    # Ties are kept in the sheet order.
+    assert rows == [Person(name="a", age=10), Person(name="b", age=10)]
+    assert sorted(query for _, query in wrapper.queries) == sorted(wrapper.results)
+
+    assert store.select().where_in("name", []).execute() == []
+    # The IN filter applies to the whole condition, not only to its last OR operand.
+    store.count().where("name = ? OR age = ?", "x", 1).where_in("age", [1]).execute()
+    assert wrapper.queries[-1][1] == 'SELECT COUNT(A) WHERE (A IS NOT NULL AND B = "x" OR C = 1) AND (C = 1)'
+    with pytest.raises(ValueError):
+        store.select().where_in("name", [None])
+
+
+def test_upsert(wrapper: FakeSheetWrapper) -> None:
+    store = new_store()
+    wrapper.results = {'SELECT A,B WHERE (A IS NOT NULL) AND (B = "b" OR B = "a")': [[2.0, "a"], [6.0, "a"]]}
+
+    outcomes = store.upsert([Person(name="b", age=1), Person(name="a", age=2)], key="name").execute()
+    assert outcomes == [store.UPSERT_INSERTED, store.UPSERT_UPDATED]
+    assert wrapper.updates == [("sheet!B2:C2", [["'a", 2]]), ("sheet!B6:C6", [["'a", 2]])]
+    assert wrapper.appends == [("sheet", [["=ROW()", "'b", 1]])]
+
+    # Fields that are not set are not overwritten.
+    wrapper.updates = []
+    wrapper.results = {'SELECT A,B WHERE (A IS NOT NULL) AND (B = "a")': [[2.0, "a"], [6.0, "a"]]}
+    store.upsert([Person(name="a")], key="name").execute()
+    assert wrapper.updates == [("sheet!B2:B2", [["'a"]]), ("sheet!B6:B6", [["'a"]])]
+
+    with pytest.raises(ValueError):
+        store.upsert([Person(name="a"), Person(name="a")], key="name")
+    with pytest.raises(ValueError):
+        store.upsert([Person(age=1)], key="name")
+
+
+def test_insert_reuse_cleared_rows(wrapper: FakeSheetWrapper) -> None:
+    store = GoogleSheetRowStore(
+        None, "id", "sheet", Person, insert_strategy=GoogleSheetRowStore.REUSE_CLEARED_ROWS_INSERT_STRATEGY
+    )
+    # The GViz scan is stale: row 4 is reported as cleared, but another client has written to it since.
+    wrapper.query_rows = [[2.0], [5.0]]
+
+    rows = [Person(name="x", age=1), Person(name="y", age=2)]
+    store.insert(rows).execute()
+    assert [row._rid for row in rows] == [3, 6]
+    assert wrapper.sheets["sheet"][2:] == [[3, "'x", 1], [4, "c", 30], [5, "d"], [6, "'y", 2]]
+
+
+def test_save(wrapper: FakeSheetWrapper) -> None:
+    store = new_store()
+    rows = [row for row in store.get_by_rids([2, 4, 5]) if row is not None]
+    new_row = Person(name="e", age=1)
+    store.insert([new_row]).execute()
+    assert new_row._rid == 6
+
+    for row in rows + [new_row]:
+        row.age = 7
+    rows[0].name = "x"
+
+    assert store.save(rows + [new_row]) == 4
+    assert wrapper.updates == [
+        ("sheet!B2:C2", [["'x", 7]]),
+        ("sheet!C4:C6", [[7], [7], [7]]),
+    ]
+
+    # Nothing has changed since the last save.
+    assert store.save(rows) == 0
+    with pytest.raises(ValueError):
+        store.save([Person(name="f")])
+
+
+def test_execute_async(wrapper: FakeSheetWrapper) -> None:
+    store = new_store()
+
+    rows = store.select().where("_rid = ?", 2).execute_async()
+    count = store.count().where("_rid >= ? AND _rid <= ?", 4, 5).execute_async()
+    assert gather(rows, count) == [[Person(name="a", age=10)], 2]
+
+
+def test_prepared_stmt_argument_count(wrapper: FakeSheetWrapper) -> None:
+    store = new_store()
+    wrapper.query_rows = [[1.0]]
+
+    stmt = store.prepare(store.count().where("name = ? AND age > ?"))
+    with pytest.raises(ValueError):
+        stmt.execute("a")
+    with pytest.raises(ValueError):
+        store.prepare(store.count()).execute(1)
+    assert wrapper.queries == []
+
+    assert stmt.execute("a", 1) == 1
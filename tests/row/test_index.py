@@ -0,0 +1,104 @@
+import re
+from typing import Any, List
+
+import pytest
+
+from pyfreedb.batch import WriteBatch
+from pyfreedb.providers.google.sheet.base import _A1Range, _InsertRowsResult
+from pyfreedb.row import GoogleSheetRowStore, models
+from pyfreedb.row.index import _match_formula
+from tests.fakes import FakeSheetWrapper, install_fake_wrapper
+
+
+class Person(models.Model):
+    email = models.StringField()
+    age = models.IntegerField()
+
+
+class IndexWrapper(FakeSheetWrapper):
+    """Evaluates the index lookup formulas written by the store."""
+
+    def __init__(self) -> None:
+        super().__init__({"person": [["_rid", "email", "age"]]})
+        self.lookups: List[str] = []
+
+    def overwrite_rows(self, spreadsheet_id: str, a1_range: _A1Range, values: List[List[Any]]) -> _InsertRowsResult:
+        if str(values[0][0]).startswith("=TEXTJOIN"):
+            values = [[self._lookup(a1_range.sheet_name, values[0][0])]]
+        return super().overwrite_rows(spreadsheet_id, a1_range, values)
+
+    def _lookup(self, sheet_name: str, formula: str) -> str:
+        self.lookups.append(formula)
+        match = re.search(r'EXACT\(A2:A, "(.*?)"\)', formula)
+        assert match is not None
+        rows = self.sheets[sheet_name]
+        return ",".join(str(idx + 1) for idx, row in enumerate(rows[1:], 1) if row and row[0] == "'" + match.group(1))
+
+
+@pytest.fixture
+def wrapper(monkeypatch: pytest.MonkeyPatch) -> IndexWrapper:
+    wrapper = IndexWrapper()
+    wrapper.sheets["person"].extend([[2, "'a@x.com", 10], [3, "'b@x.com", 20], ["", "", ""], [5, "'a@x.com", 30]])
+    install_fake_wrapper(monkeypatch, wrapper)
+    return wrapper
+
+
+def index_column(wrapper: IndexWrapper) -> List[Any]:
+    return [row[0] if row else "" for row in wrapper.sheets["person_idx_email"][1:]]
+
+
+def test_index_lookup(wrapper: IndexWrapper) -> None:
+    store = GoogleSheetRowStore(None, "id", "person", Person, secondary_indexes=["email"])
+    assert wrapper.hidden == ["person_idx_email"]
+    assert index_column(wrapper) == ["'a@x.com", "'b@x.com", "", "'a@x.com"]
+
+    rows = store.select().where("email = ? AND age > ?", "a@x.com", 15).execute()
+    assert rows == [Person(email="a@x.com", age=30)]
+    assert store.count().where("email = ?", 'b"@x.com').execute() == 0
+    assert wrapper.lookups[-1] == '=TEXTJOIN(",", TRUE, IFNA(FILTER(ROW(A2:A), EXACT(A2:A, "b""@x.com")), ""))'
+    assert "query" not in wrapper.calls
+    # The cells of the lookups are cleared afterwards.
+    assert wrapper.clears[-2:] == ["person_idx_email!B1:B1", "person_idx_email!B1:B1"]
+    assert all(len(row) < 2 or row[1] == "" for row in wrapper.sheets["person_idx_email"])
+
+    # Conditions that don't require an indexed field to be equal to a value still go through GViz, and so do empty
+    # strings that can't be told apart from the blank cells.
+    store.select().where("email = ? OR age = ?", "a@x.com", 10).execute()
+    store.count().where("email = ?", "").execute()
+    assert len(wrapper.queries) == 2
+
+    with pytest.raises(ValueError):
+        GoogleSheetRowStore(None, "id", "person", Person, secondary_indexes=["name"])
+
+
+def test_match_formula() -> None:
+    # Blank cells equal to 0 and FALSE.
+    assert _match_formula("A2:A", 0) == "(A2:A = 0) * (LEN(A2:A) > 0)"
+    assert _match_formula("A2:A", False) == "(A2:A = FALSE) * (LEN(A2:A) > 0)"
+    assert _match_formula("A2:A", 'a"b') == 'EXACT(A2:A, "a""b")'
+
+
+def test_index_maintenance(wrapper: IndexWrapper) -> None:
+    store = GoogleSheetRowStore(None, "id", "person", Person, secondary_indexes=["email"])
+
+    row = Person(email="c@x.com", age=40)
+    store.insert([row]).execute()
+    assert row._rid == 6
+    assert index_column(wrapper)[-1] == "'c@x.com"
+
+    store.update_by_rids([2], {"email": "d@x.com"})
+    row.email = "e@x.com"
+    store.save([row])
+    store.delete_by_rids([3])
+    assert index_column(wrapper) == ["'d@x.com", "", "", "'a@x.com", "'e@x.com"]
+    assert store.select().where("email = ?", "e@x.com").execute() == [Person(email="e@x.com", age=40)]
+
+    with WriteBatch() as batch:
+        inserted = batch.insert(store, [Person(email="f@x.com")])
+    assert inserted.result == 1
+    assert index_column(wrapper)[-1] == "'f@x.com"
+
+    # Writes done by other clients are picked up by rebuilding the index.
+    wrapper.sheets["person"][1][1] = "'g@x.com"
+    store.rebuild_index("email")
+    assert index_column(wrapper) == ["'g@x.com", "", "", "'a@x.com", "'e@x.com", "'f@x.com"]
@@ -1,3 +1,6 @@
+import weakref
+from typing import Any
+
 import pytest
 
 from pyfreedb.row import models
@@ -100,3 +103,58 @@ def test_field_is_formula() -> None:
     f = FormulaTest(string_no_formula="", string_with_formula="")
     assert not f._fields["string_no_formula"]._is_formula
     assert f._fields["string_with_formula"]._is_formula
+
+
+def test_row_decoder() -> None:
+    decode = A._row_decoder(("integer_field", "string_field", "bool_field"))
+    obj = decode([1.0, "abcd", None])
+    assert obj == A(integer_field=1, string_field="abcd", bool_field=None)
+    assert type(obj.integer_field) is int
+    assert obj.float_field is models.NotSet
+
+    # The decoder is generated once per class and columns.
+    assert A._row_decoder(("integer_field", "string_field", "bool_field")) is decode
+    assert B._row_decoder(("another_field",))([None]) == B(another_field=None)
+
+    # Values with unexpected types still go through the validation.
+    with pytest.raises(TypeError):
+        decode([1.0, "abcd", "hello"])
+
+    with pytest.raises(ValueError):
+        A._row_decoder(("unknown_field",))
+
+
+def test_dirty_fields() -> None:
+    obj = A(integer_field=1)
+    assert obj._rid is None and obj._dirty is None
+
+    obj.integer_field = 2
+    obj.string_field = "a"
+    assert obj._dirty == {"integer_field", "string_field"}
+
+    obj = A._row_decoder(("integer_field",), with_rid=True)([5.0, 1.0])
+    assert obj._rid == 5 and obj._dirty is None
+
+
+def test_row_encoder() -> None:
+    def escape(value: Any) -> Any:
+        return ("escaped", value)
+
+    encode = FormulaTest._row_encoder(escape)
+    assert encode(FormulaTest(string_no_formula="a", string_with_formula="=ROW()")) == [("escaped", "a"), "=ROW()"]
+    assert FormulaTest._row_encoder(escape) is encode
+
+
+def test_model_slots() -> None:
+    # The data object doesn't carry a per instance __dict__.
+    obj = B(integer_field=1, another_field="a")
+    assert not hasattr(obj._data, "__dict__")
+
+    # The subclasses still behave like regular classes.
+    obj.extra = 1
+    assert obj.extra == 1
+    assert weakref.ref(obj)() is obj
+
+    # Defaults should still work after the data class is recreated with __slots__.
+    assert obj.float_field is models.NotSet
+    assert obj == B(integer_field=1, another_field="a")
@@ -0,0 +1,66 @@
+from datetime import datetime, timezone
+from typing import Any, List
+
+import pytest
+
+from pyfreedb.row import PartitionedRowStore, models
+from tests.fakes import FakeSheetWrapper
+
+
+class Event(models.Model):
+    ts = models.IntegerField()
+    name = models.StringField()
+
+
+@pytest.fixture
+def wrapper(wrapper: FakeSheetWrapper) -> FakeSheetWrapper:
+    for name in ["events_2026_08", "events_2026_09", "events_2026_10", "other", "events_2026_1"]:
+        wrapper.create_sheet("id", name)
+    return wrapper
+
+
+def ts(year: int, month: int, day: int, hour: int = 0) -> int:
+    return int(datetime(year, month, day, hour, tzinfo=timezone.utc).timestamp())
+
+
+def test_route(wrapper: FakeSheetWrapper) -> None:
+    store = PartitionedRowStore(None, "id", "events", Event, partition_key="ts")
+    assert store.refresh_partitions() == ["events_2026_08", "events_2026_09", "events_2026_10"]
+
+    def queried(condition: str, *args: Any) -> List[str]:
+        wrapper.queries = []
+        store.count().where(condition, *args).execute()
+        return [sheet for sheet, _ in wrapper.queries]
+
+    assert queried("ts >= ? AND name = ?", ts(2026, 10, 18), "login") == ["events_2026_10"]
+    assert queried("ts < ?", ts(2026, 9, 1)) == ["events_2026_08"]
+    assert queried("ts >= ? AND ts <= ?", ts(2026, 8, 31), ts(2026, 9, 1)) == ["events_2026_08", "events_2026_09"]
+    assert queried("ts = ?", ts(2025, 1, 1)) == []
+    assert len(queried("ts > ? OR name = ?", ts(2026, 10, 1), "login")) == 3
+
+
+def test_insert_and_drop(wrapper: FakeSheetWrapper) -> None:
+    store = PartitionedRowStore(
+        None, "id", "events", Event, partition_key="ts", partition_period=PartitionedRowStore.DAILY_PARTITION
+    )
+    assert store.refresh_partitions() == []
+
+    store.insert([Event(ts=ts(2026, 10, 18, 23), name="a"), Event(ts=ts(2026, 10, 19), name="b")]).execute()
+    assert dict(wrapper.appends) == {
+        "events_2026_10_18": [["=ROW()", ts(2026, 10, 18, 23), "'a"]],
+        "events_2026_10_19": [["=ROW()", ts(2026, 10, 19), "'b"]],
+    }
+    assert store.refresh_partitions() == ["events_2026_10_18", "events_2026_10_19"]
+
+    sheet_id = wrapper.sheet_ids["events_2026_10_18"]
+    assert store.drop_partitions_before(ts(2026, 10, 19, 12)) == ["events_2026_10_18"]
+    assert wrapper.deleted == [[sheet_id]]
+    assert "events_2026_10_18" not in wrapper.sheets
+    assert store.drop_partitions_before(ts(2026, 10, 19, 12)) == []
+
+    with pytest.raises(ValueError):
+        store.insert([Event(name="c")])
+    with pytest.raises(ValueError):
+        store.update({"ts": 1})
+    with pytest.raises(TypeError):
+        PartitionedRowStore(None, "id", "events", Event, partition_key="name")
@@ -1,5 +1,7 @@
+import pytest
+
 from pyfreedb.row import models
-from pyfreedb.row.base import Ordering
+from pyfreedb.row.base import InvalidQuery, Ordering
 from pyfreedb.row.query_builder import _ColumnReplacer, _GoogleSheetQueryBuilder
 
 
@@ -24,6 +26,24 @@ def test_replacer() -> None:
     assert replacer.replace("_rid field1 field2 field1") == "A B C B"
 
 
+class PrefixModel(models.Model):
+    a = models.StringField()
+    name = models.StringField()
+
+
+def test_replacer_tokens() -> None:
+    replacer = _ColumnReplacer("_rid", PrefixModel)
+
+    # Only whole identifiers are replaced, even if a field name is a prefix of another field name.
+    assert replacer.replace("name = a") == "C = B"
+
+    # String literals are left as is.
+    assert (
+        replacer.replace("name = 'a' OR a = \"name\" OR `name` contains 'x'")
+        == "C = 'a' OR B = \"name\" OR C contains 'x'"
+    )
+
+
 def test_query_builder_mapping() -> None:
     replacer = _ColumnReplacer("_rid", DummyModel)
     query_builder = _GoogleSheetQueryBuilder(replacer)
@@ -62,5 +82,56 @@ def test_query_builder() -> None:
     assert query == 'SELECT B,C WHERE B == "hello" LIMIT 10 OFFSET 5'
 
 
+def test_query_builder_args() -> None:
+    # "?" inside a string literal is not a placeholder.
+    query = new_query_builder().where("B = '?' AND C = ?", 1).build_select(["B"])
+    assert query == "SELECT B WHERE B = '?' AND C = 1"
+
+    query = new_query_builder().where("B = ? OR B = ? OR C = ?", 'say "hi"', "it's", True).build_select(["B"])
+    assert query == 'SELECT B WHERE B = \'say "hi"\' OR B = "it\'s" OR C = true'
+
+    with pytest.raises(InvalidQuery):
+        new_query_builder().where("B = ?", "\"'").build_select(["B"])
+
+    with pytest.raises(InvalidQuery):
+        new_query_builder().where("B = ? AND C = ?", 1)
+
+
+def test_query_builder_template() -> None:
+    builder = new_query_builder().where("B = ? AND C > ?").order_by(Ordering.ASC("B")).limit(10)
+    template = builder.build_select_template(["B", "C"])
+
+    assert template.bind(["x", 1]) == 'SELECT B,C WHERE B = "x" AND C > 1 ORDER BY B ASC LIMIT 10'
+    assert builder._with_args(("y", 2)).build_select(["B", "C"]) == (
+        'SELECT B,C WHERE B = "y" AND C > 2 ORDER BY B ASC LIMIT 10'
+    )
+
+    # The template is compiled once and reused by the bound copies.
+    assert builder._with_args(("y", 2)).build_select_template(["B", "C"]) is template
+
+    with pytest.raises(InvalidQuery):
+        builder.build_select(["B", "C"])
+
+
+def test_query_builder_group_by() -> None:
+    query = (
+        new_query_builder()
+        .where("A IS NOT NULL")
+        .group_by("B")
+        .pivot("C")
+        .order_by(Ordering.DESC("SUM(D)"))
+        .limit(5)
+        .label("SUM(D)", "sum_d")
+        .build_select(["B", "SUM(D)"])
+    )
+    assert (
+        query
+        == "SELECT B,SUM(D) WHERE A IS NOT NULL GROUP BY B PIVOT C ORDER BY SUM(D) DESC LIMIT 5 LABEL SUM(D) 'sum_d'"
+    )
+
+    with pytest.raises(InvalidQuery):
+        new_query_builder().label("SUM(D)", "it's")
+
+
 def new_query_builder() -> _GoogleSheetQueryBuilder:
     return _GoogleSheetQueryBuilder(DummyReplacer())
@@ -0,0 +1,54 @@
+import pytest
+
+from pyfreedb.row.base import InvalidQuery, Ordering
+from pyfreedb.row.query_builder import _GoogleSheetQueryBuilder
+from pyfreedb.row.replica import _HASH_INDEX, _SORTED_INDEX, _RowReplica
+from tests.fakes import FakeSheetWrapper
+
+
+class DummyReplacer:
+    def replace(self, val: str) -> str:
+        return val
+
+
+def new_replica(wrapper: FakeSheetWrapper, **indexes: int) -> _RowReplica:
+    return _RowReplica(wrapper, "id", "sheet", ["_rid", "name", "age"], 2, 60, indexes)
+
+
+def new_query() -> _GoogleSheetQueryBuilder:
+    return _GoogleSheetQueryBuilder(DummyReplacer())
+
+
+def test_replica_select() -> None:
+    wrapper = FakeSheetWrapper(
+        {"sheet": [["_rid", "name", "age"], [2, "a", 30], [3, "b"], ["", ""], [5, "c", 10], [6, "d", 20]]}
+    )
+    replica = new_replica(wrapper)
+
+    # Cleared rows are skipped and missing trailing cells are NULL.
+    assert replica.select(new_query(), ["name", "age"]) == [["a", 30], ["b", None], ["c", 10], ["d", 20]]
+
+    query = new_query().where("age > ?", 10).order_by(Ordering.ASC("age")).limit(1).offset(1)
+    assert replica.select(query, ["_rid"]) == [[2]]
+    assert replica.count(new_query().where("age IS NULL")) == 1
+
+    # The arguments of prepared statements must be bound before the condition is evaluated.
+    with pytest.raises(InvalidQuery):
+        replica.count(new_query().where("age > ?"))
+
+    # The snapshot is reused until invalidated.
+    assert wrapper.calls.count("get_rows") == 1
+    replica.invalidate()
+    replica.count(new_query())
+    assert wrapper.calls.count("get_rows") == 2
+
+
+def test_replica_indexes() -> None:
+    wrapper = FakeSheetWrapper(
+        {"sheet": [["_rid", "name", "age"], [2, "a", 30], [3, "b", 10], [4, "a", 20], [5, "c", "x"]]}
+    )
+    replica = new_replica(wrapper, name=_HASH_INDEX, age=_SORTED_INDEX)
+
+    assert replica.select(new_query().where("name = ? AND age > 20", "a"), ["_rid"]) == [[2]]
+    assert replica.select(new_query().where("age >= ?", 20), ["_rid"]) == [[2], [4]]
+    assert replica.select(new_query().where("age = ? OR name = ?", 10, "c"), ["_rid"]) == [[3], [5]]
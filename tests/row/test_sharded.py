@@ -0,0 +1,85 @@
+from typing import List
+
+import pytest
+
+from pyfreedb.row import GoogleSheetRowStore, Ordering, ShardedRowStore, models
+from pyfreedb.row.base import InvalidQuery
+from pyfreedb.row.fanout import _FanOutStore, _merge
+from pyfreedb.row.sharded import _shard_hash
+from tests.fakes import FakeSheetWrapper
+
+
+class Person(models.Model):
+    name = models.StringField()
+    age = models.IntegerField()
+
+
+def new_store() -> ShardedRowStore[Person]:
+    shards = [GoogleSheetRowStore(None, "id", f"shard_{i}", Person) for i in range(3)]
+    return ShardedRowStore(shards, shard_key="name")
+
+
+def test_shard_hash() -> None:
+    assert _shard_hash(1) == _shard_hash(1.0)
+    assert _shard_hash(1) != _shard_hash("1")
+    assert _shard_hash(True) != _shard_hash(1)
+    assert _shard_hash("cat") == _shard_hash("cat")
+
+
+def test_merge() -> None:
+    results = [[[2, "a", 3], [3, "b", 1]], [[2, "c", 2], [3, "d", None]]]
+    assert list(_merge(results, [(2, True)])) == [[2, "a", 3], [2, "c", 2], [3, "b", 1], [3, "d", None]]
+    assert list(_merge(results, [])) == results[0] + results[1]
+
+
+def test_fan_out_store_is_abstract() -> None:
+    class Incomplete(_FanOutStore[Person]):
+        def _insert(self, rows: List[Person]) -> None:
+            pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_select_pruned_by_shard_key(wrapper: FakeSheetWrapper) -> None:
+    store = new_store()
+    sheet = f"shard_{_shard_hash('cat') % 3}"
+    query = 'SELECT A,B,C WHERE A IS NOT NULL AND B = "cat" AND C > 1'
+    wrapper.results[(sheet, query)] = [[2.0, "cat", 10.0]]
+
+    assert store.select().where("name = ? AND age > ?", "cat", 1).execute() == [Person(name="cat", age=10)]
+    assert wrapper.queries == [(sheet, query)]
+
+    # OR conditions can match rows of any shard.
+    wrapper.queries = []
+    store.count().where("name = ? OR age > ?", "cat", 1).execute()
+    assert sorted(sheet for sheet, _ in wrapper.queries) == ["shard_0", "shard_1", "shard_2"]
+
+    with pytest.raises(InvalidQuery):
+        store.select().where("name = ?")
+
+
+def test_select_merged(wrapper: FakeSheetWrapper) -> None:
+    store = new_store()
+    query = "SELECT A,B,C WHERE A IS NOT NULL AND C > 1 ORDER BY C DESC LIMIT 3"
+    wrapper.results = {
+        ("shard_0", query): [[2.0, "a", 30.0], [5.0, "b", 10.0]],
+        ("shard_1", query): [[3.0, "c", 20.0]],
+        ("shard_2", query): [[2.0, "d", 25.0], [3.0, "e", 5.0]],
+    }
+
+    rows = store.select("name").where("age > ?", 1).order_by(Ordering.DESC("age")).limit(2).offset(1).execute()
+    assert rows == [Person(name="d"), Person(name="c")]
+    assert rows[0]._rid == 2
+
+
+def test_count_and_insert(wrapper: FakeSheetWrapper) -> None:
+    store = new_store()
+    for i in range(3):
+        wrapper.results[(f"shard_{i}", "SELECT COUNT(A) WHERE A IS NOT NULL")] = [[float(i + 1)]]
+    assert store.count().execute() == 6
+
+    with pytest.raises(ValueError):
+        store.insert([Person(age=10)])
+    with pytest.raises(ValueError):
+        store.update({"name": "cat"})
@@ -0,0 +1,95 @@
+import os
+import pathlib
+
+import pytest
+
+from pyfreedb.row import GoogleSheetRowStore, RowSnapshot, models
+from tests.fakes import FakeSheetWrapper
+
+
+class Person(models.Model):
+    name = models.StringField()
+    age = models.IntegerField()
+    height = models.FloatField()
+    active = models.BoolField()
+
+
+class Pet(models.Model):
+    name = models.StringField()
+    age = models.FloatField()
+
+
+@pytest.fixture
+def wrapper(wrapper: FakeSheetWrapper) -> FakeSheetWrapper:
+    # GViz returns the numbers as floats.
+    wrapper.query_rows = [
+        [2.0, "kucing", 10.0, 1.5, True],
+        [3.0, "", None, None, False],
+        [5.0, None, 3.0, 0.25, None],
+        [6.0, "ünicode ✓", -1.0, 2.0, True],
+    ]
+    return wrapper
+
+
+def test_snapshot(wrapper: FakeSheetWrapper, tmp_path: pathlib.Path) -> None:
+    store = GoogleSheetRowStore(None, "id", "sheet", Person)
+    path = str(tmp_path / "person.snapshot")
+
+    assert store.select().execute_snapshot(path) == 4
+    assert [p.name for p in tmp_path.iterdir()] == ["person.snapshot"]
+
+    snapshot = RowSnapshot(path, Person)
+    expected = [
+        Person(name="kucing", age=10, height=1.5, active=True),
+        Person(name="", age=None, height=None, active=False),
+        Person(name=None, age=3, height=0.25, active=None),
+        Person(name="ünicode ✓", age=-1, height=2.0, active=True),
+    ]
+    assert len(snapshot) == 4
+    assert list(snapshot) == expected
+    assert snapshot[-1] == expected[-1]
+    assert [row._rid for row in snapshot] == [2, 3, 5, 6]
+
+    with pytest.raises(IndexError):
+        snapshot[4]
+
+
+def test_snapshot_subset_of_columns(wrapper: FakeSheetWrapper, tmp_path: pathlib.Path) -> None:
+    store = GoogleSheetRowStore(None, "id", "sheet", Person)
+    path = str(tmp_path / "person.snapshot")
+
+    wrapper.query_rows = [[2.0, 10.0, "a"]]
+    store.select("age", "name").execute_snapshot(path)
+    assert list(RowSnapshot(path, Person)) == [Person(name="a", age=10)]
+
+
+def test_reload_if_changed(wrapper: FakeSheetWrapper, tmp_path: pathlib.Path) -> None:
+    store = GoogleSheetRowStore(None, "id", "sheet", Person)
+    path = str(tmp_path / "person.snapshot")
+    store.select().execute_snapshot(path)
+
+    snapshot = RowSnapshot(path, Person)
+    assert not snapshot.reload_if_changed()
+
+    wrapper.query_rows = [[2.0, "anjing", 5.0, 1.0, False]]
+    store.select().execute_snapshot(path)
+    # Make sure the replaced file is detected even on file systems with a coarse mtime.
+    os.utime(path, ns=(0, 0))
+
+    first = snapshot[0]
+    assert snapshot.reload_if_changed()
+    assert list(snapshot) == [Person(name="anjing", age=5, height=1.0, active=False)]
+    assert first == Person(name="kucing", age=10, height=1.5, active=True)
+
+
+def test_snapshot_mismatch(wrapper: FakeSheetWrapper, tmp_path: pathlib.Path) -> None:
+    store = GoogleSheetRowStore(None, "id", "sheet", Person)
+    path = tmp_path / "person.snapshot"
+    store.select().execute_snapshot(str(path))
+
+    with pytest.raises(ValueError):
+        RowSnapshot(str(path), Pet)
+
+    path.write_bytes(b"not a snapshot")
+    with pytest.raises(ValueError):
+        RowSnapshot(str(path), Person)
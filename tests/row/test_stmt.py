@@ -0,0 +1,55 @@
+from typing import Any, List, Tuple
+
+from pyfreedb.row import models
+from pyfreedb.row.base import Aggregate
+from pyfreedb.row.gsheet import GoogleSheetRowStore
+from pyfreedb.row.query_builder import _ColumnReplacer, _GoogleSheetQueryBuilder
+from pyfreedb.row.stmt import AggregateStmt, _group_consecutive
+
+
+class Sale(models.Model):
+    region = models.StringField()
+    product = models.StringField()
+    amount = models.IntegerField()
+
+
+class FakeStore:
+    _WHERE_DEFAULT_CLAUSE = GoogleSheetRowStore._WHERE_DEFAULT_CLAUSE
+    _object_cls = Sale
+
+    def __init__(self, labels: List[str], rows: List[List[Any]]) -> None:
+        self._labels = labels
+        self._rows = rows
+        self.queries: List[str] = []
+
+    def _new_query_builder(self) -> _GoogleSheetQueryBuilder:
+        return _GoogleSheetQueryBuilder(_ColumnReplacer("_rid", Sale))
+
+    def _query_table(self, query: str) -> Tuple[List[str], List[List[Any]]]:
+        self.queries.append(query)
+        return self._labels, self._rows
+
+
+def test_group_consecutive() -> None:
+    assert _group_consecutive([]) == []
+    assert _group_consecutive([2]) == [(2, 2)]
+    assert _group_consecutive([2, 3, 4, 7, 9, 10]) == [(2, 4), (7, 7), (9, 10)]
+
+
+def test_aggregate_stmt() -> None:
+    store = FakeStore(["region", "sum_amount", "n"], [["a", 10.0, 2.0], ["b", None, 0.0]])
+    aggregates = [Aggregate.SUM("amount"), Aggregate.COUNT("amount", alias="n")]
+    rows = AggregateStmt(store, aggregates).where("amount > ?", 0).group_by("region").execute()
+
+    assert store.queries == [
+        "SELECT B,SUM(D),COUNT(D) WHERE A IS NOT NULL AND D > 0 GROUP BY B LABEL SUM(D) 'sum_amount', COUNT(D) 'n'"
+    ]
+    assert rows == [{"region": "a", "sum_amount": 10, "n": 2}, {"region": "b", "sum_amount": None, "n": 0}]
+    assert isinstance(rows[0]["sum_amount"], int)
+
+
+def test_aggregate_stmt_pivot() -> None:
+    store = FakeStore(["region", "x sum_amount", "y sum_amount"], [["a", 1.0, None]])
+    stmt = AggregateStmt(store, [Aggregate.SUM("amount")]).group_by("region").pivot("product")
+
+    assert stmt.execute() == [{"region": "a", "x sum_amount": 1, "y sum_amount": None}]
@@ -0,0 +1,130 @@
+import json
+import pathlib
+from typing import Any, List
+
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+
+from pyfreedb.providers.google.sheet.base import _A1Range, _InsertRowsResult
+from pyfreedb.row import GoogleSheetRowStore, models
+from tests.fakes import FakeSheetWrapper, install_fake_wrapper
+
+
+class Person(models.Model):
+    name = models.StringField()
+    age = models.IntegerField()
+    active = models.BoolField()
+
+
+class TransferWrapper(FakeSheetWrapper):
+    """Fails the appends of the chunks that start with one of the `failing_names`, and throttles the first
+    `throttled` appends."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.failing_names: List[str] = []
+        self.throttled = 0
+
+    def overwrite_rows(self, spreadsheet_id: str, a1_range: _A1Range, values: List[List[Any]]) -> _InsertRowsResult:
+        if values[0][1] in self.failing_names:
+            raise RuntimeError("append failed")
+        if self.throttled:
+            self.throttled -= 1
+            raise HttpError(httplib2.Response({"status": 429}), b"")
+        return super().overwrite_rows(spreadsheet_id, a1_range, values)
+
+
+@pytest.fixture
+def wrapper(monkeypatch: pytest.MonkeyPatch) -> TransferWrapper:
+    wrapper = TransferWrapper()
+    # GViz returns the numbers as floats.
+    wrapper.query_rows = [["a", 10.0, True], ['b,"c"', None, False], ["", 3.0, None]]
+    install_fake_wrapper(monkeypatch, wrapper)
+    return wrapper
+
+
+@pytest.mark.parametrize(
+    "file_format",
+    [
+        GoogleSheetRowStore.JSONL_FILE_FORMAT,
+        GoogleSheetRowStore.CSV_FILE_FORMAT,
+        GoogleSheetRowStore.PARQUET_FILE_FORMAT,
+    ],
+)
+def test_export_and_import(wrapper: TransferWrapper, tmp_path: pathlib.Path, file_format: int) -> None:
+    store = GoogleSheetRowStore(None, "id", "sheet", Person)
+    path = str(tmp_path / "person")
+
+    assert store.export_to(path, file_format=file_format) == 3
+    assert [p.name for p in tmp_path.iterdir()] == ["person"]
+
+    assert store.import_from(path, file_format=file_format) == 3
+    appended = [row for _, chunk in wrapper.appends for row in chunk]
+    # CSV can't tell empty strings and None apart.
+    empty_name = None if file_format == GoogleSheetRowStore.CSV_FILE_FORMAT else "'"
+    assert appended == [
+        ["=ROW()", "'a", 10, True],
+        ["=ROW()", '\'b,"c"', None, False],
+        ["=ROW()", empty_name, 3, None],
+    ]
+
+
+def test_export_jsonl(wrapper: TransferWrapper, tmp_path: pathlib.Path) -> None:
+    store = GoogleSheetRowStore(None, "id", "sheet", Person)
+    path = tmp_path / "person.jsonl"
+
+    store.export_to(str(path))
+    assert [json.loads(line) for line in path.read_text().splitlines()] == [
+        {"name": "a", "age": 10, "active": True},
+        {"name": 'b,"c"', "age": None, "active": False},
+        {"name": "", "age": 3, "active": None},
+    ]
+
+
+def test_import_resume(wrapper: TransferWrapper, tmp_path: pathlib.Path) -> None:
+    store = GoogleSheetRowStore(None, "id", "sheet", Person)
+    path = tmp_path / "person.jsonl"
+    path.write_text("".join(json.dumps({"name": str(i), "age": i}) + "\n" for i in range(10)))
+    checkpoint = str(tmp_path / "checkpoint")
+
+    # Each row is about 25 bytes, so every chunk holds 2 rows.
+    wrapper.failing_names = ["'4"]
+    with pytest.raises(RuntimeError):
+        store.import_from(str(path), chunk_bytes=50, max_workers=1, checkpoint_file=checkpoint)
+    assert [[row[1] for row in chunk] for _, chunk in wrapper.appends] == [["'0", "'1"], ["'2", "'3"]]
+
+    wrapper.failing_names = []
+    with pytest.raises(ValueError):
+        store.import_from(str(path), chunk_bytes=100, checkpoint_file=checkpoint)
+
+    assert store.import_from(str(path), chunk_bytes=50, checkpoint_file=checkpoint) == 6
+    assert sorted(row[1] for _, chunk in wrapper.appends for row in chunk) == [f"'{i}" for i in range(10)]
+    assert not pathlib.Path(checkpoint).exists()
+
+    path.write_text(json.dumps({"nickname": "a"}) + "\n")
+    with pytest.raises(ValueError):
+        store.import_from(str(path))
+
+
+def test_import_retries_throttled_chunks(
+    wrapper: TransferWrapper, tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    store = GoogleSheetRowStore(None, "id", "sheet", Person)
+    path = tmp_path / "person.jsonl"
+    path.write_text(json.dumps({"name": "a", "age": 1}) + "\n")
+
+    delays: List[float] = []
+    monkeypatch.setattr("pyfreedb.row.transfer.time.sleep", delays.append)
+
+    wrapper.throttled = 2
+    assert store.import_from(str(path)) == 1
+    assert delays == [1.0, 2.0]
+    assert len(wrapper.appends) == 1
+
+    # The import gives up once the chunk is still throttled after the last retry.
+    wrapper.throttled = 10
+    with pytest.raises(HttpError):
+        store.import_from(str(path))
+    assert delays[2:] == [1.0, 2.0, 4.0, 8.0, 16.0]
+    assert wrapper.throttled == 4
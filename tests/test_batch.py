@@ -0,0 +1,86 @@
+from typing import List
+
+import pytest
+
+from pyfreedb.base import InvalidOperationError
+from pyfreedb.batch import WriteBatch
+from pyfreedb.kv import GoogleSheetKVStore
+from pyfreedb.row import GoogleSheetRowStore, models
+from tests.fakes import FakeSheetWrapper
+
+
+class Person(models.Model):
+    name = models.StringField()
+    age = models.IntegerField()
+
+
+def test_write_batch(wrapper: FakeSheetWrapper) -> None:
+    person_store = GoogleSheetRowStore(None, "id", "person", Person)
+    kv_store = GoogleSheetKVStore(None, "id", "kv", mode=GoogleSheetKVStore.APPEND_ONLY_MODE)
+    wrapper.calls = []
+    wrapper.appends = []
+
+    with WriteBatch() as batch:
+        inserted = batch.insert(person_store, [Person(name="a", age=1), Person(name="b")])
+        updated = batch.update_by_rids(person_store, [3, 2], {"age": 10})
+        deleted = batch.delete_by_rids(person_store, [5])
+        batch.set(kv_store, "k", b"v")
+
+        with pytest.raises(InvalidOperationError):
+            inserted.result
+
+    assert wrapper.calls == ["batch_update_rows", "clear", "get_sheet_ids", "get_sheet_ids", "batch_append_rows"]
+    assert [a1_range for a1_range, _ in wrapper.updates] == ["person!C2:C2", "person!C3:C3"]
+    assert wrapper.clears == ["person!5:5"]
+    assert wrapper.appends[0] == ("person", [["=ROW()", "'a", 1], ["=ROW()", "'b", None]])
+    assert wrapper.appends[1][0] == "kv" and wrapper.appends[1][1][0][:2] == ["k", "!v"]
+
+    assert (inserted.result, updated.result, deleted.result) == (2, 2, 1)
+    with pytest.raises(InvalidOperationError):
+        batch.insert(person_store, [])
+
+    # The sheet IDs are remembered by the stores.
+    wrapper.calls = []
+    with WriteBatch() as batch:
+        batch.insert(person_store, [Person(name="c")])
+        batch.set(kv_store, "k", b"v")
+    assert wrapper.calls == ["batch_append_rows"]
+
+
+def test_write_batch_error(wrapper: FakeSheetWrapper) -> None:
+    person_store = GoogleSheetRowStore(None, "id", "person", Person)
+
+    # Nothing is written if the block fails.
+    wrapper.calls = []
+    with pytest.raises(RuntimeError):
+        with WriteBatch() as batch:
+            batch.delete_by_rids(person_store, [2])
+            raise RuntimeError
+
+    assert wrapper.calls == []
+
+
+def test_write_batch_request_error(wrapper: FakeSheetWrapper, monkeypatch: pytest.MonkeyPatch) -> None:
+    person_store = GoogleSheetRowStore(None, "id", "person", Person)
+    notified: List[bool] = []
+    monkeypatch.setattr(person_store, "_notify_write", lambda: notified.append(True))
+    wrapper.fail_on = ["clear"]
+    wrapper.calls = []
+
+    batch = WriteBatch()
+    updated = batch.update_by_rids(person_store, [2], {"age": 10})
+    deleted = batch.delete_by_rids(person_store, [3])
+    inserted = batch.insert(person_store, [Person(name="a")])
+    with pytest.raises(RuntimeError):
+        batch.flush()
+
+    # The update has been sent, the delete failed and the insert has never been sent.
+    assert wrapper.calls == ["batch_update_rows", "clear"]
+    assert updated.result == 1
+    assert isinstance(deleted.error, RuntimeError)
+    with pytest.raises(RuntimeError):
+        deleted.result
+    assert not inserted.done
+
+    # The caches are invalidated regardless.
+    assert notified
@@ -0,0 +1,61 @@
+import concurrent.futures
+import threading
+from concurrent.futures import Future
+
+import pytest
+
+from pyfreedb.futures import _map, _submit, gather, set_max_workers
+
+
+def test_gather() -> None:
+    futures = [_submit(lambda i=i: i * 2) for i in range(5)]
+    assert gather(*futures) == [0, 2, 4, 6, 8]
+    assert gather() == []
+
+
+def test_gather_error() -> None:
+    blocked = threading.Event()
+    pending = _submit(blocked.wait)
+
+    def fail() -> None:
+        raise ValueError("failed")
+
+    # The error is raised without waiting for the pending future.
+    with pytest.raises(ValueError):
+        gather(pending, _submit(fail))
+
+    with pytest.raises(concurrent.futures.TimeoutError):
+        gather(pending, timeout=0.01)
+
+    blocked.set()
+    assert gather(pending) == [True]
+
+
+def test_map() -> None:
+    assert _map(lambda i: i * 2, list(range(7)), 3) == [0, 2, 4, 6, 8, 10, 12]
+
+    def fail(i: int) -> int:
+        if i == 1:
+            raise ValueError("failed")
+        return i
+
+    with pytest.raises(ValueError):
+        _map(fail, [0, 1, 2], 2)
+
+
+def test_map_on_shared_pool() -> None:
+    # The nested calls don't wait for a free thread of the single threaded pool, the calling thread runs them instead.
+    set_max_workers(1)
+    future = _submit(lambda: _map(lambda i: i + 1, [1, 2, 3], 2))
+    assert gather(future, timeout=5) == [[2, 3, 4]]
+    set_max_workers(8)
+
+
+def test_set_max_workers() -> None:
+    with pytest.raises(ValueError):
+        set_max_workers(0)
+
+    set_max_workers(1)
+    future: "Future[str]" = _submit(lambda: threading.current_thread().name)
+    assert gather(future)[0].startswith("pyfreedb")
+    set_max_workers(8)